@@ -1,36 +1,155 @@
-from flask import Flask, request, jsonify, abort
+import os
+from functools import wraps
+
+from flask import Flask, Response, request, jsonify, abort
 
 from lib.activities import Sport, Event, Selection
-from lib.activity_mgr import ActivityMgr
+from lib.activity_mgr import ActivityMgr, EVENT, SPORT
+from lib.backends import MEMORY, get_backend
+from lib.bulk_loader import BulkLoader, parse_ndjson
+from lib.cache import LRUCache
+from lib.change_feed import ChangeFeed, iter_feed_ndjson, iter_sse
 from lib.db import DBConnection
-from lib.db_setup import setup_db, SPORTS_TABLE, EVENTS_TABLE, SELECTIONS_TABLE
+from lib.db_setup import SPORTS_TABLE, EVENTS_TABLE, SELECTIONS_TABLE, EVENT_ID, SPORT_ID
+from lib.hierarchy import build_tree, tree_query
+from lib.metrics import Metrics
+from lib.migrations import MigrationRunner
+from lib.pagination import BOOLEAN_ARGS, InvalidPageRequest, fetch_page, is_page_request
+from lib.price_updater import PriceUpdater
+from lib.scheduler import EventScheduler
+from lib.search import SEARCH_LIMIT, query_builder
+from lib.serializers import ROW_ENCODERS, encode_json_object, iter_json_object, iter_ndjson
+from lib.settlement import Settlement
+from lib.versions import TableVersions
 
 app = Flask(__name__)
 
 DB_NAME = "application"
-conn = DBConnection(DB_NAME, table=SPORTS_TABLE)
+POOL_CONFIG = {'size': 10, 'max_overflow': 20, 'idle_timeout': 300, 'checkout_timeout': 30, 'health_check': True}
+CACHE_CONFIG = {'max_size': 2048, 'ttl': 30}
+# Ids never change, entries only expire so deletes made by other processes are eventually seen
+NAME_ID_CACHE_CONFIG = {'max_size': 10000, 'ttl': 300}
+# DB_BACKEND=sqlite serves from an in-process SQLite database, on a temporary file unless SQLITE_PATH is set
+DB_BACKEND = os.environ.get('DB_BACKEND', 'mysql')
+BACKEND_CONFIG = {'sqlite': {'path': os.environ.get('SQLITE_PATH', MEMORY),
+                             'read_only': os.environ.get('SQLITE_READ_ONLY') == '1'}}
+# SLOW_QUERY_MS prints every query slower than the threshold with its params
+SLOW_QUERY_MS = os.environ.get('SLOW_QUERY_MS')
+metrics = Metrics(slow_query_threshold=float(SLOW_QUERY_MS) / 1e3 if SLOW_QUERY_MS else None)
+# ETags stop matching after the read cache TTL, so writes made by other workers are seen as soon as in cached reads
+versions = TableVersions(max_age=CACHE_CONFIG['ttl'])
+conn = DBConnection(DB_NAME, pool_config=POOL_CONFIG, cache=LRUCache(**CACHE_CONFIG),
+                    backend=get_backend(DB_BACKEND, **BACKEND_CONFIG.get(DB_BACKEND, {})), metrics=metrics,
+                    versions=versions, name_ids=LRUCache(**NAME_ID_CACHE_CONFIG))
+sports = conn.repository(SPORTS_TABLE)
+events = conn.repository(EVENTS_TABLE)
+selections = conn.repository(SELECTIONS_TABLE)
+feed = ChangeFeed()
+# EVENT_SCHEDULER=0 leaves events to be started by POST /start only
+scheduler = EventScheduler(conn, feed=feed)
+SCHEDULER_ENABLED = os.environ.get('EVENT_SCHEDULER', '1') != '0'
 GET = 'GET'
 POST = 'POST'
-filter_one = "(t.name REGEXP '{0}') OR (t1.name REGEXP '{0}') OR (t2.name REGEXP '{0}')"
-filter_two = "t1.scheduled_start >= now() - INTERVAL 24 HOUR"
-filter_three = "t2.outcome= 3"
-FILTERS = {0: filter_one, 1: filter_two, 2: filter_three}
 
 
 class OperationNotPermittedException(Exception):
     pass
 
 
+def conditional_get(*tables):
+    """
+    Decorator tagging the GET responses of a route with the versions of the tables they are read from, and
+    answering 304 Not Modified without reading the DB when the client already holds the current version
+
+    :param tables: Names of the tables the route reads
+    :type tables: str
+
+    :return: Route decorator
+    :rtype: callable
+    """
+    def decorator(route):
+        @wraps(route)
+        def wrapper(*args, **kwargs):
+            if request.method != GET:
+                return route(*args, **kwargs)
+            # Tagged before the read, so a write committed meanwhile leaves an older tag and is fetched next time
+            etag = versions.etag(*tables)
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = app.make_response(route(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def list_response(msg, repository):
+    """
+    Function to build the response listing every row of a table, encoding rows straight from the DB
+    and streaming them as they are read when the stream arg is given
+        - stream=ndjson: one JSON object per line
+        - stream=json: the same {msg: [rows]} body as the buffered response
+
+    :param msg: Key of the row list in the JSON body
+    :type msg: str
+    :param repository: DB connection bound to the table to list
+    :type repository: `DBConnection`
+
+    :return: 200 Response object
+    :rtype: `flask.Response`
+    """
+    encode = ROW_ENCODERS[repository.table].encode
+    stream = request.args.get('stream')
+    if stream == 'ndjson':
+        return Response(iter_ndjson(repository.stream_all_from_table(), encode=encode), mimetype='application/x-ndjson')
+    if stream:
+        return Response(iter_json_object(msg, repository.stream_all_from_table(), encode=encode),
+                        mimetype='application/json')
+    return Response(encode_json_object(msg, repository.select_all_from_table(), encode=encode),
+                    mimetype='application/json')
+
+
 @app.before_first_request
 def at_start_up(*args):
     """
-    Start up function to create database objects
+    Start up function to apply any missing schema migrations, skipped for a read only SQLite database, and start
+    the event scheduler. An up to date schema is checked with one query.
     """
+    if getattr(conn.backend, 'read_only', False):
+        return
     try:
-        print(f"Creating database with: {args}")
-        setup_db(DB_NAME)
+        MigrationRunner(conn).migrate()
     except Exception as e:
-        print(f"Failed to set up database correctly. Error encountered: {str(e)}")
+        print(f"Failed to migrate database correctly. Error encountered: {str(e)}")
+    if SCHEDULER_ENABLED:
+        scheduler.start()
+
+
+@app.before_request
+def start_request_metrics():
+    """
+    Before request function to start counting the queries of the request
+    """
+    metrics.start_request()
+
+
+@app.after_request
+def end_request_metrics(response):
+    """
+    After request function to record the latency and query count of the request, labelled by its route rule
+
+    :param response: Response object
+    :type response: `flask.Response`
+
+    :return: The same response
+    :rtype: `flask.Response`
+    """
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.end_request(request.method, route, response.status_code)
+    return response
 
 
 @app.route('/')
@@ -46,118 +165,248 @@ def home():
     return "Index Page"
 
 
+@app.route('/pool')
+def pool_stats():
+    """
+    Route to GET connection pool statistics
+
+    :return: 200 Response object
+    :rtype: `requests.Response`
+    """
+    return jsonify({"Pool": conn.pool_stats()})
+
+
+@app.route('/cache')
+def cache_stats():
+    """
+    Route to GET read cache and name to id cache statistics
+
+    :return: 200 Response object
+    :rtype: `requests.Response`
+    """
+    return jsonify({"Cache": conn.cache_stats(), "Name ids": conn.name_id_stats()})
+
+
+@app.route('/metrics')
+def export_metrics():
+    """
+    Route to GET query, connection and route metrics in the Prometheus text format, with the pool and
+    read cache counters as gauges
+
+    :return: 200 Response object
+    :rtype: `flask.Response`
+    """
+    gauges = {f"db_pool_{key}": value for key, value in (conn.pool_stats() or {}).items()}
+    gauges.update({f"db_cache_{key}": value for key, value in (conn.cache_stats() or {}).items()})
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/feed')
+def change_feed():
+    """
+    Route to GET a stream of the changes committed from now, or after a sequence number, instead of polling
+    - optional:
+        since: int, resume after this sequence number, also read from the Last-Event-ID header
+        sport: str, only changes of this sport
+        event: str, only changes of this event and of its sport
+        format: sse|ndjson, defaults to server-sent events
+
+    :raises HTTPException: 400 raised if since is not a sequence number
+
+    :return: 200 streaming Response object
+    :rtype: `flask.Response`
+    """
+    since = request.args.get('since', request.headers.get('Last-Event-ID'))
+    try:
+        since = int(since) if since not in (None, '') else None
+        if since is not None and since < 0:
+            raise ValueError(since)
+    except ValueError:
+        abort(400, f"Invalid since sequence number: {since}")
+    sport = request.args.get('sport')
+    event = request.args.get('event')
+    if event and not sport:
+        sport = ActivityMgr.lookup(events, event, SPORT)
+    changes = feed.subscribe(since, sport=sport, event=event)
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    if request.args.get('format') == 'ndjson':
+        return Response(iter_feed_ndjson(changes), mimetype='application/x-ndjson', headers=headers)
+    return Response(iter_sse(changes), mimetype='text/event-stream', headers=headers)
+
+
 @app.route('/sports', methods=[GET, POST])
+@conditional_get(SPORTS_TABLE)
 def get_sports():
     """
     Route to GET to Sports
 
+    GET:
+        - optional:
+            stream: json|ndjson, encode the rows as they are read from the DB
+            limit: int, after: str, active: bool, fields: str, return one keyset page with a next cursor
+
     POST:
         - required:
             name: str
         - optional:
             events: bool
 
-    :raises HTTPException: 500 raised if POST request fails
+    :raises HTTPException: 400 raised if the paging arguments are invalid, 500 raised if POST request fails
 
     :return: 200 Response object
     :rtype: `requests.Response`
     """
-    conn.table = SPORTS_TABLE
     msg = "All Sports"
     try:
-        if request.method == GET:
-            result = [Sport(**sport).__dict__ for sport in conn.select_all_from_table()]
+        if request.method == GET and is_page_request(request.args):
+            result, next_cursor = fetch_page(sports, request.args)
+            return jsonify({msg: result, 'next': next_cursor})
+        elif request.method == GET:
+            return list_response(msg, sports)
         else:
             data = request.get_json()
             event = True if data.get('events') == "true" else False
             name = data.get('name')
             if all([event, name]):
-                conn.table = EVENTS_TABLE
-                result = [Event(**event).__dict__ for event in conn.select_all_from_table_by_key_value('sport', name)]
+                result = [Event(**row).to_dict() for row in
+                          events.select_all_from_table_by_key_value(SPORT_ID, sports.id_by_name(name))]
                 msg = f"All Events of {name}: "
             elif name:
-                result = [Sport(**sport).__dict__ for sport in conn.select_all_from_table_by_key_value('name', name)]
+                result = [Sport(**sport).to_dict() for sport in sports.select_all_from_table_by_key_value('name', name)]
                 msg = f"Sport: {name}"
             else:
                 msg, result = 'Invalid POST requirements.', data
         return jsonify({msg: result})
+    except InvalidPageRequest as e:
+        abort(400, str(e))
     except Exception as e:
         abort(500, f"Error fetching sport information:: {str(e)}")
 
 
 @app.route('/events', methods=[GET, POST])
+@conditional_get(EVENTS_TABLE, SPORTS_TABLE)
 def get_events():
     """
     Route to GET to Events
 
+    GET:
+        - optional:
+            stream: json|ndjson, encode the rows as they are read from the DB
+            limit: int, after: str, active: bool, fields: str, return one keyset page with a next cursor
+            order: name|scheduled_start, keyset ordering of the pages
+
     POST:
         - required:
             name: str
         - optional:
             selections: bool
 
-    :raises HTTPException: 500 raised if POST request fails
+    :raises HTTPException: 400 raised if the paging arguments are invalid, 500 raised if POST request fails
 
     :return: 200 Response object
     :rtype: `requests.Response`
     """
-    conn.table = EVENTS_TABLE
     msg = "All Events"
     try:
-        if request.method == GET:
-            result = [Event(**event).__dict__ for event in conn.select_all_from_table()]
+        if request.method == GET and is_page_request(request.args):
+            result, next_cursor = fetch_page(events, request.args)
+            return jsonify({msg: result, 'next': next_cursor})
+        elif request.method == GET:
+            return list_response(msg, events)
         else:
             data = request.get_json()
-            selections = True if data.get('selections') == "true" else False
+            with_selections = True if data.get('selections') == "true" else False
             name = data.get('name')
-            if all([selections, name]):
-                conn.table = SELECTIONS_TABLE
-                result = [Selection(**selection).__dict__ for selection in
-                          conn.select_all_from_table_by_key_value('event', name)]
+            if all([with_selections, name]):
+                result = [Selection(**selection).to_dict() for selection in
+                          selections.select_all_from_table_by_key_value(EVENT_ID, events.id_by_name(name))]
                 msg = f"Selections for {name}: "
             elif name:
-                result = [Event(**event).__dict__ for event in conn.select_all_from_table_by_key_value('name', name)]
+                result = [Event(**event).to_dict() for event in events.select_all_from_table_by_key_value('name', name)]
                 msg = f"Event: {name}"
             else:
                 msg, result = 'Invalid POST requirements.', data
         return jsonify({msg: result})
+    except InvalidPageRequest as e:
+        abort(400, str(e))
     except Exception as e:
         abort(500, f"Error fetching event information:: {str(e)}")
 
 
 @app.route('/selections', methods=[GET, POST])
+@conditional_get(SELECTIONS_TABLE, EVENTS_TABLE)
 def get_selections():
     """
     Route to GET to Selections
 
+    GET:
+        - optional:
+            stream: json|ndjson, encode the rows as they are read from the DB
+            limit: int, after: str, active: bool, fields: str, return one keyset page with a next cursor
+
     POST:
         - required:
             name: str
 
-    :raises HTTPException: 500 raised if POST request fails
+    :raises HTTPException: 400 raised if the paging arguments are invalid, 500 raised if POST request fails
 
     :return: 200 Response object
     :rtype: `requests.Response`
     """
-    conn.table = SELECTIONS_TABLE
     msg = "All Selections"
     try:
-        if request.method == GET:
-            result = [Selection(**selection).__dict__ for selection in conn.select_all_from_table()]
+        if request.method == GET and is_page_request(request.args):
+            result, next_cursor = fetch_page(selections, request.args)
+            return jsonify({msg: result, 'next': next_cursor})
+        elif request.method == GET:
+            return list_response(msg, selections)
         else:
             data = request.get_json()
             name = data.get('name')
             if name:
-                result = [Selection(**selection).__dict__ for selection in
-                          conn.select_all_from_table_by_key_value('name', name)]
+                result = [Selection(**selection).to_dict() for selection in
+                          selections.select_all_from_table_by_key_value('name', name)]
                 msg = f"Selection: {name}"
             else:
                 msg, result = 'Invalid POST requirements.', data
         return jsonify({msg: result})
+    except InvalidPageRequest as e:
+        abort(400, str(e))
     except Exception as e:
         abort(500, f"Error fetching selection information:: {str(e)}")
 
 
+@app.route('/tree')
+@conditional_get(SPORTS_TABLE, EVENTS_TABLE, SELECTIONS_TABLE)
+def get_tree():
+    """
+    Route to GET sports with their events and the selections of each event, read in a single query
+    - optional:
+        sport: str, only this sport
+        event: str, only this event, under its sport
+        active: bool, only active sports, events and selections
+
+    :raises HTTPException: 400 raised if active is not a boolean, 404 raised if the sport or event is unknown,
+        500 raised if the tree cannot be read
+
+    :return: 200 Response object
+    :rtype: `flask.Response`
+    """
+    sport = request.args.get('sport')
+    event = request.args.get('event')
+    active = request.args.get('active', 'false').lower()
+    if active not in BOOLEAN_ARGS:
+        abort(400, f"Invalid active: {request.args.get('active')}")
+    try:
+        query, params = tree_query(sport, event, active=bool(BOOLEAN_ARGS[active]))
+        result = build_tree(conn.execute_query(query, database=conn.database, result_req=True, params=params))
+    except Exception as e:
+        abort(500, f"Error fetching tree:: {str(e)}")
+    if not result and (sport or event):
+        abort(404, f"Unknown activity: {event or sport}")
+    return jsonify({"Tree": result})
+
+
 @app.route('/create', methods=[POST])
 def create_activity():
     """
@@ -195,11 +444,67 @@ def create_activity():
         mgr.set_activity_type()
         activity_type = mgr.activity_type
         mgr.create_activity()
+        feed.publish('create', activity_type, mgr.all_args.get('name'), **mgr.lineage())
+        if activity_type == EVENT:
+            scheduler.track(mgr.all_args.get('name'))
         return jsonify({'Success': f"{activity_type } Created."})
     except Exception as e:
         abort(500, f"Error creating {activity_type}:: {str(e)}")
 
 
+@app.route('/create/bulk', methods=[POST])
+def create_activities():
+    """
+    Route to POST many new activities at once
+    - required:
+        JSON list of activities, or newline delimited JSON (Content-Type: application/x-ndjson),
+        each taking the same fields as /create
+    Each activity created is published to the change feed and created events are scheduled.
+
+    :raises HTTPException: 400 raised if the body is not a list, 500 raised if POST request fails
+
+    :return: 200 Response object with the created count and per row errors
+    :rtype: `requests.Response`
+    """
+    if request.mimetype == 'application/x-ndjson':
+        items = parse_ndjson(request.get_data(as_text=True))
+    else:
+        items = request.get_json()
+    if not isinstance(items, list):
+        abort(400, "Expected a list of activities.")
+    try:
+        loader = BulkLoader(conn)
+        result = loader.load(items)
+        for change in loader.changes:
+            feed.publish('create', **change)
+        scheduler.track(*[change['name'] for change in loader.changes if change['activity'] == EVENT])
+        return jsonify({'Success': f"{result['created']} activities created.", **result})
+    except Exception as e:
+        abort(500, f"Error creating activities:: {str(e)}")
+
+
+@app.route('/prices', methods=[POST])
+def update_prices():
+    """
+    Route to POST many selection prices at once, applied in one transaction
+    - required:
+        JSON object of selection name: price pairs, e.g. {"Norway Win": "2.50"}
+
+    :raises HTTPException: 400 raised if the body is not an object, 500 raised if POST request fails
+
+    :return: 200 Response object with the accepted count and per selection errors
+    :rtype: `requests.Response`
+    """
+    prices = request.get_json()
+    if not isinstance(prices, dict):
+        abort(400, "Expected an object of selection prices.")
+    try:
+        result = PriceUpdater(conn, feed=feed).update(prices)
+        return jsonify({'Success': f"{result['accepted']} prices updated.", **result})
+    except Exception as e:
+        abort(500, f"Error updating prices:: {str(e)}")
+
+
 @app.route('/start', methods=[POST])
 def start_event():
     """
@@ -215,8 +520,10 @@ def start_event():
     try:
         data = request.get_json()
         event_name = data.get('name')
-        conn.table = EVENTS_TABLE
-        conn.update_row({'status': 1, 'type': 1}, 'name', data.get('name'))
+        events.update_row({'status': 1, 'type': 1}, 'name', data.get('name'))
+        scheduler.cancel(event_name)
+        feed.publish('start', EVENT, event_name, sport=ActivityMgr.lookup(events, event_name, SPORT), event=event_name,
+                     status=1)
         return jsonify({"Success": f"{event_name } started."})
     except Exception as e:
         abort(500, f"Error starting event:: {str(e)}")
@@ -250,12 +557,52 @@ def disable_activity():
         mgr = ActivityMgr(conn, **request.get_json())
         mgr.set_activity_type()
         activity_type = mgr.activity_type
+        lineage = mgr.lineage()
         mgr.end_activity()
+        feed.publish('inactive', activity_type, mgr.all_args.get('name'), **lineage,
+                     **{key: mgr.all_args[key] for key in ('status', 'outcome') if key in mgr.all_args})
+        for change in mgr.changes:
+            feed.publish('inactive', **change)
         return jsonify({"Success": f"{activity_type } Inactive."})
     except Exception as e:
         abort(500, f"Error disabling {activity_type}:: {str(e)}")
 
 
+@app.route('/settle', methods=[POST])
+def settle_event():
+    """
+    Route to POST the outcomes of many selections of an event, applied in one transaction with the event and
+    sport roll-up
+    - required:
+        event: str
+        outcomes: JSON object of selection name: outcome pairs, outcome as a value or name, e.g. {"No 10 Win": "WIN"}
+    - optional:
+        status: int, status the event is closed with once all of its selections are settled
+
+    :raises HTTPException: 400 raised if the event, a selection or an outcome is invalid, 500 raised if POST
+        request fails
+
+    :return: 200 Response object with the settled count and the time taken per phase
+    :rtype: `requests.Response`
+    """
+    data = request.get_json()
+    event_name = data.get('event') if isinstance(data, dict) else None
+    outcomes = data.get('outcomes') if isinstance(data, dict) else None
+    if not event_name or not isinstance(outcomes, dict):
+        abort(400, "Expected an event and an object of selection outcomes.")
+    try:
+        result = Settlement(conn).settle(event_name, outcomes, **{key: data[key] for key in ('status',) if key in data})
+    except ValueError as e:
+        abort(400, str(e))
+    except Exception as e:
+        abort(500, f"Error settling {event_name}:: {str(e)}")
+    feed.publish('settle', EVENT, event_name, sport=result['sport'], event=event_name,
+                 outcomes=result.pop('outcomes'))
+    for change in result.pop('changes'):
+        feed.publish('inactive', **change)
+    return jsonify({'Success': f"{result['settled']} selections of {event_name} settled.", **result})
+
+
 @app.route('/delete', methods=[POST])
 def delete_activity():
     """
@@ -273,7 +620,16 @@ def delete_activity():
         mgr = ActivityMgr(conn, **request.get_json())
         mgr.set_activity_type()
         activity_type = mgr.activity_type
+        lineage = mgr.lineage()
         mgr.delete_activity()
+        feed.publish('delete', activity_type, mgr.all_args.get('name'), **lineage)
+        for change in mgr.changes:
+            feed.publish('delete', **change)
+        if activity_type == EVENT:
+            scheduler.cancel(mgr.all_args.get('name'))
+        for change in mgr.changes:
+            if change['activity'] == EVENT:
+                scheduler.cancel(change['name'])
         return jsonify({"Success": f"{activity_type} Deleted."})
     except Exception as e:
         abort(500, f"Error deleting {activity_type}:: {str(e)}")
@@ -286,7 +642,8 @@ def search_activity():
     - optional:
         regex: str
         filters: list
-        expression: str
+        search_term: str
+        limit: int, maximum results of a filtered search
 
     :raises HTTPException: 500 raised if POST request fails
 
@@ -302,51 +659,14 @@ def search_activity():
         restricted = ["drop", "delete"]
         if any(val in query.lower() for val in restricted) or any(val in regex.lower() for val in restricted):
             raise OperationNotPermittedException(f"Restricted keywords found, search not permitted")
+        params = None
         if req_filters:
-            query = query_builder(regex, req_filters, query)
-        result = conn.execute_query(query, database=conn.database, result_req=True)
+            query, params = query_builder(regex, req_filters, query, data.get('limit', SEARCH_LIMIT))
+        result = conn.execute_query(query, database=conn.database, result_req=True, params=params)
         return jsonify({"Filter results": result})
     except Exception as e:
         abort(500, f"Error Searching with Query {query}:: {str(e)}")
 
 
-def query_builder(regex, filters, expression):
-    """
-    Function to build the search query
-
-    :param regex: Regex pattern string
-    :type regex: str
-    :param filters: List of filters to be selected
-    :type filters: list
-    :param expression: MySQL expression to query
-    :type expression: str
-
-    :raises RuntimeError: raised is the search criteria produces None
-    :return: Query built
-    :rtype: str
-    """
-    base_query = "select t.name, t1.name, t2.name from sports t, events t1, selections t2 WHERE"
-    selected_filters = []
-    if expression:
-        selected_filters = [expression]
-    filters = [int(_) for _ in filters]
-    for _ in filters:
-        if not _:
-            selected_filter = FILTERS.get(_).format(regex)
-            selected_filters.append(selected_filter)
-            continue
-        selected_filters.append(FILTERS.get(_))
-    if not selected_filters:
-        raise RuntimeError("No matching search criteria found.")
-    if len(selected_filters) == 1:
-        return f"{base_query} {selected_filters[0]}"
-    query = ""
-    for index, _ in enumerate(selected_filters):
-        if not index:
-            query = "{0} {1}".format(base_query, _)
-        query += " AND {0}".format(_)
-    return query
-
-
 if __name__ == "__main__":
     app.run(debug=True, host='0.0.0.0')
@@ -0,0 +1,344 @@
+from quart import Quart, Response, request, jsonify, abort
+from quart.utils import run_sync
+
+from lib.activities import Sport, Event, Selection
+from lib.activity_mgr import ActivityMgr
+from lib.async_db import AsyncDBConnection
+from lib.cache import LRUCache
+from lib.db import DBConnection
+from lib.db_setup import SPORTS_TABLE, EVENTS_TABLE, SELECTIONS_TABLE, EVENT_ID, SPORT_ID
+from lib.migrations import MigrationRunner
+from lib.pagination import InvalidPageRequest, build_page, is_page_request, parse_page_args
+from lib.search import SEARCH_LIMIT, query_builder
+from lib.serializers import ROW_ENCODERS, STREAM_CHUNK_ROWS, dumps, encode_json_object
+
+app = Quart(__name__)
+
+DB_NAME = "application"
+ASYNC_POOL_CONFIG = {'minsize': 5, 'maxsize': 50, 'pool_recycle': 300}
+POOL_CONFIG = {'size': 5, 'max_overflow': 10, 'idle_timeout': 300, 'checkout_timeout': 30, 'health_check': True}
+NAME_ID_CACHE_CONFIG = {'max_size': 10000, 'ttl': 300}
+aconn = AsyncDBConnection(DB_NAME, pool_config=ASYNC_POOL_CONFIG)
+# Cascading writes run ActivityMgr and parent names are resolved to ids on the blocking pool in a worker thread
+conn = DBConnection(DB_NAME, pool_config=POOL_CONFIG, name_ids=LRUCache(**NAME_ID_CACHE_CONFIG))
+GET = 'GET'
+POST = 'POST'
+RESTRICTED = ["drop", "delete"]
+
+
+async def stream_rows(msg, rows, encode, ndjson):
+    """
+    Async generator encoding rows as they are read from the DB
+        - ndjson: one JSON object per line
+        - otherwise: the same {msg: [rows]} body as the buffered response
+
+    :param msg: Key of the row list in the JSON body
+    :type msg: str
+    :param rows: Async iterable of rows
+    :type rows: async_generator
+    :param encode: Callable encoding one row to JSON text
+    :type encode: callable
+    :param ndjson: Boolean indicating newline delimited output
+    :type ndjson: bool
+
+    :return: Async generator of body fragments
+    :rtype: async_generator
+    """
+    if not ndjson:
+        yield '{' + dumps(msg) + ':['
+    chunk = []
+    separator = ''
+    async for row in rows:
+        chunk.append(encode(row) + '\n' if ndjson else encode(row))
+        if len(chunk) >= STREAM_CHUNK_ROWS:
+            yield ''.join(chunk) if ndjson else separator + ','.join(chunk)
+            separator = ','
+            chunk = []
+    if chunk:
+        yield ''.join(chunk) if ndjson else separator + ','.join(chunk)
+    if not ndjson:
+        yield ']}'
+
+
+async def list_response(msg, table):
+    """
+    Function to build the response listing one keyset page, or every row of a table
+
+    :param msg: Key of the row list in the JSON body
+    :type msg: str
+    :param table: Name of the table to list
+    :type table: str
+
+    :raises InvalidPageRequest: raised if the paging arguments are invalid
+
+    :return: 200 Response object
+    :rtype: `quart.Response`
+    """
+    if is_page_request(request.args):
+        page = parse_page_args(table, request.args)
+        rows = await aconn.select_page(table, page['columns'], page['order_by'], page['limit'] + 1,
+                                       after=page['after'], filters=page['filters'])
+        result, next_cursor = build_page(page, rows)
+        return jsonify({msg: result, 'next': next_cursor})
+    encode = ROW_ENCODERS[table].encode
+    stream = request.args.get('stream')
+    if stream:
+        mimetype = 'application/x-ndjson' if stream == 'ndjson' else 'application/json'
+        return Response(stream_rows(msg, aconn.stream_all_from_table(table), encode, stream == 'ndjson'),
+                        mimetype=mimetype)
+    rows = await aconn.select_all_from_table(table)
+    return Response(encode_json_object(msg, rows, encode=encode), mimetype='application/json')
+
+
+@app.before_serving
+async def at_start_up():
+    """
+    Start up function to apply any missing schema migrations and open the async connection pool
+    """
+    try:
+        await run_sync(MigrationRunner(conn).migrate)()
+    except Exception as e:
+        print(f"Failed to migrate database correctly. Error encountered: {str(e)}")
+    await aconn.get_pool()
+
+
+@app.after_serving
+async def at_shut_down():
+    """
+    Shut down function to close the connection pools
+    """
+    await aconn.close()
+    conn.pool.close_all()
+
+
+@app.route('/')
+async def home():
+    """
+    Route to GET to Index
+
+    :return: 200 Response object
+    :rtype: `quart.Response`
+    """
+    return "Index Page"
+
+
+@app.route('/sports', methods=[GET, POST])
+async def get_sports():
+    """
+    Route to GET to Sports, takes the same arguments as the Flask app
+
+    :raises HTTPException: 400 raised if the paging arguments are invalid, 500 raised if the request fails
+
+    :return: 200 Response object
+    :rtype: `quart.Response`
+    """
+    msg = "All Sports"
+    try:
+        if request.method == GET:
+            return await list_response(msg, SPORTS_TABLE)
+        data = await request.get_json()
+        event = True if data.get('events') == "true" else False
+        name = data.get('name')
+        if all([event, name]):
+            sport_id = await run_sync(conn.repository(SPORTS_TABLE).id_by_name)(name)
+            rows = await aconn.select_all_from_table_by_key_value(EVENTS_TABLE, SPORT_ID, sport_id)
+            result = [Event(**row).to_dict() for row in rows]
+            msg = f"All Events of {name}: "
+        elif name:
+            rows = await aconn.select_all_from_table_by_key_value(SPORTS_TABLE, 'name', name)
+            result = [Sport(**row).to_dict() for row in rows]
+            msg = f"Sport: {name}"
+        else:
+            msg, result = 'Invalid POST requirements.', data
+        return jsonify({msg: result})
+    except InvalidPageRequest as e:
+        abort(400, str(e))
+    except Exception as e:
+        abort(500, f"Error fetching sport information:: {str(e)}")
+
+
+@app.route('/events', methods=[GET, POST])
+async def get_events():
+    """
+    Route to GET to Events, takes the same arguments as the Flask app
+
+    :raises HTTPException: 400 raised if the paging arguments are invalid, 500 raised if the request fails
+
+    :return: 200 Response object
+    :rtype: `quart.Response`
+    """
+    msg = "All Events"
+    try:
+        if request.method == GET:
+            return await list_response(msg, EVENTS_TABLE)
+        data = await request.get_json()
+        selections = True if data.get('selections') == "true" else False
+        name = data.get('name')
+        if all([selections, name]):
+            event_id = await run_sync(conn.repository(EVENTS_TABLE).id_by_name)(name)
+            rows = await aconn.select_all_from_table_by_key_value(SELECTIONS_TABLE, EVENT_ID, event_id)
+            result = [Selection(**row).to_dict() for row in rows]
+            msg = f"Selections for {name}: "
+        elif name:
+            rows = await aconn.select_all_from_table_by_key_value(EVENTS_TABLE, 'name', name)
+            result = [Event(**row).to_dict() for row in rows]
+            msg = f"Event: {name}"
+        else:
+            msg, result = 'Invalid POST requirements.', data
+        return jsonify({msg: result})
+    except InvalidPageRequest as e:
+        abort(400, str(e))
+    except Exception as e:
+        abort(500, f"Error fetching event information:: {str(e)}")
+
+
+@app.route('/selections', methods=[GET, POST])
+async def get_selections():
+    """
+    Route to GET to Selections, takes the same arguments as the Flask app
+
+    :raises HTTPException: 400 raised if the paging arguments are invalid, 500 raised if the request fails
+
+    :return: 200 Response object
+    :rtype: `quart.Response`
+    """
+    msg = "All Selections"
+    try:
+        if request.method == GET:
+            return await list_response(msg, SELECTIONS_TABLE)
+        data = await request.get_json()
+        name = data.get('name')
+        if name:
+            rows = await aconn.select_all_from_table_by_key_value(SELECTIONS_TABLE, 'name', name)
+            result = [Selection(**row).to_dict() for row in rows]
+            msg = f"Selection: {name}"
+        else:
+            msg, result = 'Invalid POST requirements.', data
+        return jsonify({msg: result})
+    except InvalidPageRequest as e:
+        abort(400, str(e))
+    except Exception as e:
+        abort(500, f"Error fetching selection information:: {str(e)}")
+
+
+@app.route('/start', methods=[POST])
+async def start_event():
+    """
+    Route to POST event start
+    - required:
+        name: str
+
+    :raises HTTPException: 500 raised if POST request fails
+
+    :return: 200 Response object
+    :rtype: `quart.Response`
+    """
+    try:
+        data = await request.get_json()
+        event_name = data.get('name')
+        await aconn.update_row(EVENTS_TABLE, {'status': 1, 'type': 1}, 'name', event_name)
+        return jsonify({"Success": f"{event_name} started."})
+    except Exception as e:
+        abort(500, f"Error starting event:: {str(e)}")
+
+
+async def run_activity_mgr(action, data):
+    """
+    Function to run an ActivityMgr action in a worker thread
+
+    :param action: Name of the ActivityMgr method to call
+    :type action: str
+    :param data: Activity fields of the request
+    :type data: dict
+
+    :return: Type of the activity
+    :rtype: str
+    """
+    def run():
+        mgr = ActivityMgr(conn, **data)
+        mgr.set_activity_type()
+        getattr(mgr, action)()
+        return mgr.activity_type
+    return await run_sync(run)()
+
+
+@app.route('/create', methods=[POST])
+async def create_activity():
+    """
+    Route to POST new activity, takes the same fields as the Flask app
+
+    :raises HTTPException: 500 raised if POST request fails
+
+    :return: 200 Response object
+    :rtype: `quart.Response`
+    """
+    try:
+        activity_type = await run_activity_mgr('create_activity', await request.get_json())
+        return jsonify({'Success': f"{activity_type} Created."})
+    except Exception as e:
+        abort(500, f"Error creating activity:: {str(e)}")
+
+
+@app.route('/inactive', methods=[POST])
+async def disable_activity():
+    """
+    Route to POST disable activity, takes the same fields as the Flask app
+
+    :raises HTTPException: 500 raised if POST request fails
+
+    :return: 200 Response object
+    :rtype: `quart.Response`
+    """
+    try:
+        activity_type = await run_activity_mgr('end_activity', await request.get_json())
+        return jsonify({"Success": f"{activity_type} Inactive."})
+    except Exception as e:
+        abort(500, f"Error disabling activity:: {str(e)}")
+
+
+@app.route('/delete', methods=[POST])
+async def delete_activity():
+    """
+    Route to POST delete activity, takes the same fields as the Flask app
+
+    :raises HTTPException: 500 raised if POST request fails
+
+    :return: 200 Response object
+    :rtype: `quart.Response`
+    """
+    try:
+        activity_type = await run_activity_mgr('delete_activity', await request.get_json())
+        return jsonify({"Success": f"{activity_type} Deleted."})
+    except Exception as e:
+        abort(500, f"Error deleting activity:: {str(e)}")
+
+
+@app.route('/search', methods=[POST])
+async def search_activity():
+    """
+    Route to POST search activities, takes the same fields as the Flask app
+
+    :raises HTTPException: 500 raised if POST request fails
+
+    :return: 200 Response object
+    :rtype: `quart.Response`
+    """
+    query = None
+    try:
+        data = await request.get_json()
+        regex = data.get('regex', '^N')
+        query = data.get('search_term', "")
+        req_filters = data.get('filters', [])
+        if any(val in query.lower() for val in RESTRICTED) or any(val in regex.lower() for val in RESTRICTED):
+            raise RuntimeError(f"Restricted keywords found, search not permitted")
+        params = None
+        if req_filters:
+            query, params = query_builder(regex, req_filters, query, data.get('limit', SEARCH_LIMIT))
+        result = await aconn.execute_query(query, result_req=True, params=params)
+        return jsonify({"Filter results": result})
+    except Exception as e:
+        abort(500, f"Error Searching with Query {query}:: {str(e)}")
+
+
+if __name__ == "__main__":
+    app.run(debug=True, host='0.0.0.0')
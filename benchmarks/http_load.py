@@ -0,0 +1,204 @@
+import argparse
+import json
+import os
+import subprocess
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from lib.backends import BACKENDS, MySQLBackend, SQLiteBackend, get_backend
+from lib.db import DBConnection
+from lib.db_setup import setup_db, seed_dataset
+from lib.migrations import MigrationRunner
+
+PERCENTILES = (50, 95, 99)
+
+
+def build_scenarios(sports, events, selections, run_id):
+    """
+    Function to build the request scenarios, in run order, for a seeded sports x events x selections dataset.
+    Writes run last and only touch rows of their own run or distinct seeded selections, so reads see the
+    seeded dataset and a scenario can be rerun against the same database.
+
+    :param sports: Number of seeded sports
+    :type sports: int
+    :param events: Number of seeded events per sport
+    :type events: int
+    :param selections: Number of seeded selections per event
+    :type selections: int
+    :param run_id: Unique id of the run, used to name created activities
+    :type run_id: str
+
+    :return: Scenario name, request builder pairs, the builder taking the request number and returning
+        the method, path and JSON body of the request
+    :rtype: list
+    """
+    def selection(number):
+        sp, rest = divmod(number % (sports * events * selections), events * selections)
+        ev, se = divmod(rest, selections)
+        return f"Sel {sp}-{ev}-{se}"
+
+    return [
+        ('sports', lambda n: ('GET', '/sports', None)),
+        ('sports_lookup', lambda n: ('POST', '/sports', {'name': f"Sport {n % sports}", 'events': 'true'})),
+        ('events_page', lambda n: ('GET', '/events?limit=100&order=scheduled_start', None)),
+        ('events_lookup', lambda n: ('POST', '/events', {'name': f"Event {n % sports}-{n % events}",
+                                                         'selections': 'true'})),
+        ('selections_page', lambda n: ('GET', '/selections?limit=100&active=true', None)),
+        ('selections_stream', lambda n: ('GET', '/selections?stream=ndjson', None)),
+        ('selections_lookup', lambda n: ('POST', '/selections', {'name': selection(n)})),
+        ('search', lambda n: ('POST', '/search', {'filters': ['0', '1'], 'regex': f"^Sel {n % sports}-",
+                                                  'limit': 100})),
+        ('create', lambda n: ('POST', '/create', {'name': f"Bench {run_id}-{n}"})),
+        ('inactive', lambda n: ('POST', '/inactive', {'name': selection(n * 7919), 'outcome': 1})),
+        ('delete', lambda n: ('POST', '/delete', {'name': f"Bench {run_id}-{n}"}))]
+
+
+def send(url, method, path, body, timeout):
+    """
+    Function to send one request and time it
+
+    :param url: Base URL of the app
+    :type url: str
+    :param method: HTTP method
+    :type method: str
+    :param path: Path and query string of the route
+    :type path: str
+    :param body: JSON body, None for GET
+    :type body: dict
+    :param timeout: Seconds to wait for the response
+    :type timeout: float
+
+    :return: Latency in seconds and a Boolean indicating a 2xx response
+    :rtype: tuple
+    """
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'} if data else {})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            ok = 200 <= response.status < 300
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def percentile(latencies, pct):
+    """
+    Function to pick the nearest rank percentile of sorted latencies
+
+    :param latencies: Sorted latencies
+    :type latencies: list
+    :param pct: Percentile, 0 to 100
+    :type pct: float
+
+    :return: Latency at the percentile
+    :rtype: float
+    """
+    if not latencies:
+        return None
+    rank = max(1, -(-len(latencies) * pct // 100))
+    return latencies[int(rank) - 1]
+
+
+def run_scenario(url, build, requests, concurrency, timeout):
+    """
+    Function to drive one scenario with a fixed number of concurrent clients
+
+    :param url: Base URL of the app
+    :type url: str
+    :param build: Callable taking the request number and returning the method, path and body
+    :type build: callable
+    :param requests: Number of requests to send
+    :type requests: int
+    :param concurrency: Number of requests kept in flight
+    :type concurrency: int
+    :param timeout: Seconds to wait for each response
+    :type timeout: float
+
+    :return: Request count, errors, throughput and latency percentiles in milliseconds
+    :rtype: dict
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda n: send(url, *build(n), timeout), range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency for latency, _ in results)
+    summary = {'requests': requests, 'errors': sum(1 for _, ok in results if not ok),
+               'throughput_rps': round(requests / elapsed, 1) if elapsed else None,
+               'mean_ms': round(sum(latencies) / len(latencies) * 1e3, 3) if latencies else None,
+               'max_ms': round(latencies[-1] * 1e3, 3) if latencies else None}
+    for pct in PERCENTILES:
+        value = percentile(latencies, pct)
+        summary[f"p{pct}_ms"] = round(value * 1e3, 3) if value is not None else None
+    return summary
+
+
+def git_commit():
+    """
+    Function to read the commit the benchmark runs against, so results of different commits can be compared
+
+    :return: Commit hash, or None outside a git checkout
+    :rtype: str|None
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    """
+    Function to load test every route of a running app and write throughput and latency percentiles as JSON
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--database', default='application')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default=MySQLBackend.name,
+                        help="storage engine the app serves from, used to set up and seed the database")
+    parser.add_argument('--sqlite-path', default=os.environ.get('SQLITE_PATH'),
+                        help="database file of a SQLite app, defaults to SQLITE_PATH")
+    parser.add_argument('--setup', action='store_true', help="drop and recreate the database before seeding")
+    parser.add_argument('--seed', nargs=3, type=int, metavar=('SPORTS', 'EVENTS', 'SELECTIONS'), default=None,
+                        help="load a synthetic dataset before the run")
+    parser.add_argument('--dataset', nargs=3, type=int, metavar=('SPORTS', 'EVENTS', 'SELECTIONS'),
+                        default=[10, 100, 10], help="shape of the already seeded dataset, defaults to --seed")
+    parser.add_argument('--requests', type=int, default=200, help="requests per route")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--routes', default=None, help="comma separated scenarios to run, defaults to all")
+    parser.add_argument('--output', default=None, help="file to write the JSON results to")
+    args = parser.parse_args(argv)
+    if args.backend == SQLiteBackend.name and not args.sqlite_path:
+        parser.error("--backend sqlite needs --sqlite-path, the database file the app serves")
+    backend = get_backend(args.backend, **({'path': args.sqlite_path} if args.backend == SQLiteBackend.name else {}))
+    if args.setup:
+        setup_db(args.database, backend=backend)
+    if args.seed:
+        # Brings a database the app has not started on yet to the current schema before loading it
+        MigrationRunner(DBConnection(args.database, backend=backend)).migrate()
+        seed_dataset(args.database, *args.seed, backend=backend)
+    dataset = args.seed or args.dataset
+    run_id = datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')
+    selected = args.routes.split(',') if args.routes else None
+    results = {}
+    for name, build in build_scenarios(*dataset, run_id):
+        if selected and name not in selected:
+            continue
+        results[name] = run_scenario(args.url, build, args.requests, args.concurrency, args.timeout)
+        summary = results[name]
+        print(f"{name:18} {summary['throughput_rps']:>9} req/s p50={summary['p50_ms']}ms "
+              f"p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms errors={summary['errors']}")
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'commit': git_commit(), 'url': args.url, 'timestamp': run_id, 'concurrency': args.concurrency,
+                       'requests': args.requests, 'dataset': dict(zip(('sports', 'events', 'selections'), dataset)),
+                       'routes': results}, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import argparse
+import json
+import timeit
+from datetime import datetime
+from decimal import Decimal
+
+from lib.activities import Sport, Event, Selection
+from lib.enums import Status, Outcome, EventType
+from lib.serializers import ROW_ENCODERS, dumps, encode_json_object
+
+
+class LegacySport(object):
+
+    def __init__(self, name, slug, active=True):
+        self.name = name
+        self.slug = slug
+        self.active = True if active == 1 else False
+
+
+class LegacyEvent(object):
+
+    def __init__(self, **kwargs):
+        self.name = kwargs.get('name')
+        self.slug = kwargs.get('slug')
+        self.active = True if kwargs.get('active') == 1 else False
+        self.sport = kwargs.get('sport')
+        self.actual_start = kwargs.get('actual_start')
+        self.scheduled_start = kwargs.get('scheduled_start')
+        self.status = str(Status(kwargs.get('status')))
+        self.type = str(EventType(kwargs.get('type')))
+
+
+class LegacySelection(object):
+
+    def __init__(self, **kwargs):
+        self.name = kwargs.get('name')
+        self.active = True if kwargs.get('active') == 1 else False
+        self.event = kwargs.get('event')
+        self.price = kwargs.get('price', '00.00')
+        self.outcome = str(Outcome(kwargs.get('outcome')))
+
+
+def build_rows(count):
+    """
+    Function to build synthetic DB rows for every table
+
+    :param count: Number of rows per table
+    :type count: int
+
+    :return: Table name, rows pairs
+    :rtype: dict
+    """
+    start = datetime(2021, 10, 15, 19, 30, 39)
+    starts = [start.replace(minute=_) for _ in range(60)]
+    return {
+        'sports': [{'name': f"Sport {_}", 'slug': f"sport-{_}", 'active': 1} for _ in range(count)],
+        'events': [{'name': f"Event {_}", 'slug': f"event-{_}", 'active': _ % 2, 'type': _ % 2, 'status': _ % 4,
+                    'scheduled_start': starts[_ % 60], 'actual_start': None, 'sport': 'Sport 1'} for _ in range(count)],
+        'selections': [{'name': f"Sel {_}", 'active': 1, 'price': Decimal('10.50'), 'outcome': _ % 4,
+                        'event': 'Event 1'} for _ in range(count)]}
+
+
+def legacy_encode(table, rows):
+    """
+    Function to serialize rows the way the list routes did before: model per row, its __dict__, then one dumps
+    """
+    model = {'sports': LegacySport, 'events': LegacyEvent, 'selections': LegacySelection}[table]
+    return dumps({'All': [model(**row).__dict__ for row in rows]})
+
+
+def model_encode(table, rows):
+    """
+    Function to serialize rows through the slotted models and one dumps
+    """
+    model = {'sports': Sport, 'events': Event, 'selections': Selection}[table]
+    return dumps({'All': [model(**row).to_dict() for row in rows]})
+
+
+def direct_encode(table, rows):
+    """
+    Function to serialize rows with the direct row encoder used by the list routes
+    """
+    return encode_json_object('All', rows, encode=ROW_ENCODERS[table].encode)
+
+
+def main(argv=None):
+    """
+    Function to compare the per row cost of each serialization path and write the results as JSON
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default=None, help="file to write the JSON results to")
+    args = parser.parse_args(argv)
+    results = {}
+    for table, rows in build_rows(args.rows).items():
+        expected = json.loads(legacy_encode(table, rows))
+        results[table] = {}
+        for name, encode in [('legacy', legacy_encode), ('models', model_encode), ('direct', direct_encode)]:
+            assert json.loads(encode(table, rows)) == expected, f"{name} output differs for {table}"
+            best = min(timeit.repeat(lambda: encode(table, rows), number=1, repeat=args.repeat))
+            results[table][name] = round(best / args.rows * 1e6, 3)
+        speedup = results[table]['legacy'] / results[table]['direct']
+        print(f"{table:10} us/row legacy={results[table]['legacy']:.3f} models={results[table]['models']:.3f} "
+              f"direct={results[table]['direct']:.3f} speedup={speedup:.1f}x")
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'rows': args.rows, 'us_per_row': results}, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
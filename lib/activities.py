@@ -1,15 +1,26 @@
-from .enums import Status, Outcome, EventType
+from .enums import STATUS_NAMES, OUTCOME_NAMES, EVENT_TYPE_NAMES
 
 
 class Sport(object):
+    __slots__ = ('name', 'slug', 'active')
 
-    def __init__(self, name, slug, active=True):
+    def __init__(self, name, slug, active=True, **kwargs):
         self.name = name
         self.slug = slug
         self.active = True if active == 1 else False
 
+    def to_dict(self):
+        """
+        Function to return the fields of the activity
+
+        :return: Field, Value pairs
+        :rtype: dict
+        """
+        return {'name': self.name, 'slug': self.slug, 'active': self.active}
+
 
 class Event(object):
+    __slots__ = ('name', 'slug', 'active', 'sport', 'actual_start', 'scheduled_start', 'status', 'type')
 
     def __init__(self, **kwargs):
         self.name = kwargs.get('name')
@@ -18,15 +29,57 @@ class Event(object):
         self.sport = kwargs.get('sport')
         self.actual_start = kwargs.get('actual_start')
         self.scheduled_start = kwargs.get('scheduled_start')
-        self.status = str(Status(kwargs.get('status')))
-        self.type = str(EventType(kwargs.get('type')))
+        self.status = STATUS_NAMES[kwargs.get('status')]
+        self.type = EVENT_TYPE_NAMES[kwargs.get('type')]
+
+    def to_dict(self):
+        """
+        Function to return the fields of the activity
+
+        :return: Field, Value pairs
+        :rtype: dict
+        """
+        return {'name': self.name, 'slug': self.slug, 'active': self.active, 'sport': self.sport,
+                'actual_start': self.actual_start, 'scheduled_start': self.scheduled_start, 'status': self.status,
+                'type': self.type}
 
 
 class Selection(object):
+    __slots__ = ('name', 'active', 'event', 'price', 'outcome')
 
     def __init__(self, **kwargs):
         self.name = kwargs.get('name')
         self.active = True if kwargs.get('active') == 1 else False
         self.event = kwargs.get('event')
         self.price = kwargs.get('price', '00.00')
-        self.outcome = str(Outcome(kwargs.get('outcome')))
+        self.outcome = OUTCOME_NAMES[kwargs.get('outcome')]
+
+    def to_dict(self):
+        """
+        Function to return the fields of the activity
+
+        :return: Field, Value pairs
+        :rtype: dict
+        """
+        return {'name': self.name, 'active': self.active, 'event': self.event, 'price': self.price,
+                'outcome': self.outcome}
+
+
+FIELD_FORMATTERS = {
+    'active': lambda value: True if value == 1 else False,
+    'status': STATUS_NAMES.__getitem__,
+    'type': EVENT_TYPE_NAMES.__getitem__,
+    'outcome': OUTCOME_NAMES.__getitem__}
+
+
+def format_fields(row):
+    """
+    Function to format the columns of a full or partial row the same way the activity models do
+
+    :param row: Column, Value pairs of a table row
+    :type row: dict
+
+    :return: Formatted row
+    :rtype: dict
+    """
+    return {key: FIELD_FORMATTERS[key](value) if key in FIELD_FORMATTERS else value for key, value in row.items()}
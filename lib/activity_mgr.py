@@ -2,19 +2,29 @@ from datetime import datetime
 
 from slugify import slugify
 
+from .db_setup import with_parent_ids, EVENT_ID, SPORT_ID
+
 SPORT = "sport"
 EVENT = "event"
 SELECTION = "selection"
+SPORT_COLUMNS = ['name', 'slug', 'active']
+EVENT_COLUMNS = ['name', 'slug', 'active', 'scheduled_start', 'sport']
+SELECTION_COLUMNS = ['name', 'active', 'price', 'event']
 
 
 class ActivityMgr(object):
 
     def __init__(self, db, **kwargs):
         self.db = db
+        self.sports = db.repository('sports')
+        self.events = db.repository('events')
+        self.selections = db.repository('selections')
         self.activity_type = None
         self.status = None
         self.outcome = None
         self.all_args = kwargs
+        # Activities changed by cascades and roll-ups, published by the caller once the transaction commits
+        self.changes = []
 
     def set_activity_type(self):
         """
@@ -29,56 +39,71 @@ class ActivityMgr(object):
 
     def end_activity(self):
         """
-        Function to end any activity
+        Function to end any activity, cascading to related activities in a single transaction. The activities
+        changed by the cascade and roll-ups are recorded in changes.
         """
-        if self.activity_type == SELECTION:
-            self.disable_selection()
-        elif self.activity_type == EVENT:
-            self.disable_event()
-        else:
-            self.disable_sport()
+        with self.db.transaction():
+            if self.activity_type == SELECTION:
+                self.disable_selection()
+            elif self.activity_type == EVENT:
+                self.disable_event()
+            else:
+                self.disable_sport()
 
-    def disable_sport(self, event_triggered=False):
+    def disable_sport(self):
         """
-        Function to disable a sport
-
-        :param event_triggered: Boolean indicating if all child events are inactive
-        :type event_triggered: bool
+        Function to disable a sport and all of its active events and selections
         """
         sport_name = self.all_args.get('name')
-        if not event_triggered:
-            self.disable_all_events_by_sport(sport_name)
-        self.db.table = 'sports'
-        self.db.update_rows_inactive('name', sport_name)
+        self.disable_all_events_by_sport(sport_name)
+        self.sports.update_rows_inactive('name', sport_name)
 
     def disable_event(self):
         """
-        Function to disable an event and and update parent sport if all events inactive
+        Function to disable an event and its selections, and its parent sport if all of its events are inactive
         """
-        self.db.table = 'events'
         event_name = self.all_args.get('name')
         status = self.all_args.get('status', 3)
-        self.db.update_row({'active': 0, 'status': status}, 'name', event_name)
-        sport_name = self.db.select_all_from_table_by_key_value('name', event_name)[0].get(SPORT)
-        events = self.get_all_events_by_sport(sport_name)
-        self.disable_all_selections_by_event(event_name)
-        if not any([event.get('active') for event in events]):
-            self.all_args['name'] = sport_name
-            self.disable_sport(event_triggered=True)
+        sport_name = self.lookup(self.events, event_name, SPORT)
+        self.events.update_row({'active': 0, 'status': status}, 'name', event_name)
+        self.disable_all_selections_by_event(event_name, sport_name)
+        self.roll_up(self.sports, SPORT, sport_name, lambda: self.sports.update_parent_if_children_inactive(
+            {'active': 0}, 'events', SPORT_ID, 'name', event_name))
 
     def disable_all_events_by_sport(self, sport_name):
         """
-        Function to disable all child events of a sport
+        Function to disable all active child events of a sport and their active selections
 
         :param sport_name: Name of the parent sport
         :type sport_name: str
         """
-        self.db.table = 'events'
         status = self.all_args.get('status', 3)
-        self.db.update_row({'active': 0, 'status': status}, 'sport', sport_name)
-        events = self.get_all_events_by_sport(sport_name)
+        sport_id = self.sports.id_by_name(sport_name)
+        events, selections = self.children_of_sport(sport_id, filters={'active': 1})
+        self.events.update_active_rows({'active': 0, 'status': status}, SPORT_ID, sport_id)
+        self.selections.update_active_rows_by_parent(
+            {'active': 0, 'outcome': 1}, EVENT_ID, 'events', SPORT_ID, sport_id)
         for event in events:
-            self.disable_all_selections_by_event(event.get('name'))
+            self.record(EVENT, event['name'], sport_name, event['name'], status=status)
+        for selection in selections:
+            self.record(SELECTION, selection['name'], sport_name, selection[EVENT], outcome=1)
+
+    def children_of_sport(self, sport_id, filters=None):
+        """
+        Function to read the names of the events of a sport and of the selections of all of its events, matching
+        the rows the cascades by sport update or delete
+
+        :param sport_id: Id of the parent sport
+        :type sport_id: int
+        :param filters: Column, Value pairs the events and, independently of their event, selections must equal
+        :type filters: dict
+
+        :return: Id and name of each event, name and event of each selection
+        :rtype: tuple
+        """
+        events = self.events.select_by_key_values(['id', 'name'], SPORT_ID, [sport_id], filters=filters)
+        return events, self.selections.select_by_parent(
+            ['name', EVENT], EVENT_ID, 'events', SPORT_ID, sport_id, filters=filters)
 
     def get_all_events_by_sport(self, sport_name):
         """
@@ -90,33 +115,80 @@ class ActivityMgr(object):
         :return: List of child events
         :rtype: list
         """
-        self.db.table = 'events'
-        return self.db.select_all_from_table_by_key_value(SPORT, sport_name)
+        return self.events.select_all_from_table_by_key_value(SPORT_ID, self.sports.id_by_name(sport_name))
 
     def disable_selection(self):
         """
-        Function to disable a selection and update parent event if all selections inactive
+        Function to disable a selection, its parent event if all of its selections are inactive and then the
+        parent sport if all of its events are inactive
         """
-        self.db.table = 'selections'
         name = self.all_args.get('name')
         outcome = self.all_args.get('outcome', 1)
-        self.db.update_row({'active': 0, 'outcome': outcome}, 'name', name)
-        event_name = self.db.select_all_from_table_by_key_value('name', name)[0].get(EVENT)
-        selections = self.get_all_selections_by_event(event_name)
-        if not any([selection.get('active') for selection in selections]):
-            self.all_args['name'] = event_name
-            self.disable_event()
+        self.selections.update_row({'active': 0, 'outcome': outcome}, 'name', name)
+        event_name = self.selections.select_all_from_table_by_key_value('name', name)[0].get(EVENT)
+        sport_name = self.lookup(self.events, event_name, SPORT)
+        status = self.all_args.get('status', 3)
+        self.roll_up(self.events, EVENT, event_name, lambda: self.events.update_parent_if_children_inactive(
+            {'active': 0, 'status': status}, 'selections', EVENT_ID, 'name', name), sport_name, status=status)
+        self.roll_up(self.sports, SPORT, sport_name, lambda: self.sports.update_parent_if_children_inactive(
+            {'active': 0}, 'events', SPORT_ID, 'name', event_name))
 
-    def disable_all_selections_by_event(self, event_name):
+    def disable_all_selections_by_event(self, event_name, sport_name=None):
         """
-        Function to disable all selections of an event
+        Function to disable all active selections of an event
 
         :param event_name: Name of the parent event
         :type event_name: str
+        :param sport_name: Name of the sport of the event, recorded with the selections disabled
+        :type sport_name: str
         """
-        self.db.table = 'selections'
         outcome = 1
-        self.db.update_row({'active': 0, 'outcome': outcome}, EVENT, event_name)
+        event_id = self.events.id_by_name(event_name)
+        selections = self.selections.select_by_key_values(['name'], EVENT_ID, [event_id], filters={'active': 1})
+        self.selections.update_active_rows({'active': 0, 'outcome': outcome}, EVENT_ID, event_id)
+        for selection in selections:
+            self.record(SELECTION, selection['name'], sport_name, event_name, outcome=outcome)
+
+    def roll_up(self, repository, activity, name, update, sport_name=None, **data):
+        """
+        Function to run the statement closing a parent once all of its children are inactive, recording the
+        parent when the statement closed it
+
+        :param repository: DB connection bound to the parent table
+        :type repository: `DBConnection`
+        :param activity: Activity type of the parent, sport or event
+        :type activity: str
+        :param name: Name of the parent
+        :type name: str
+        :param update: Callable running the roll-up statement
+        :type update: callable
+        :param sport_name: Name of the sport of an event parent
+        :type sport_name: str
+        :param data: Values set on the parent, recorded with it
+        """
+        was_active = self.lookup(repository, name, 'active')
+        update()
+        if was_active and not self.lookup(repository, name, 'active'):
+            if activity == SPORT:
+                self.record(SPORT, name, name, None, **data)
+            else:
+                self.record(EVENT, name, sport_name, name, **data)
+
+    def record(self, activity, name, sport_name, event_name, **data):
+        """
+        Function to record an activity changed by a cascade or roll-up
+
+        :param activity: Activity type changed
+        :type activity: str
+        :param name: Name of the activity
+        :type name: str
+        :param sport_name: Name of the sport the activity belongs to
+        :type sport_name: str
+        :param event_name: Name of the event the activity belongs to
+        :type event_name: str
+        :param data: Changed values, e.g. status or outcome
+        """
+        self.changes.append({'activity': activity, 'name': name, SPORT: sport_name, EVENT: event_name, **data})
 
     def get_all_selections_by_event(self, event_name):
         """
@@ -128,66 +200,121 @@ class ActivityMgr(object):
         :return: List of matching selections
         :rtype: list
         """
-        self.db.table = 'selections'
-        return self.db.select_all_from_table_by_key_value(EVENT, event_name)
+        return self.selections.select_all_from_table_by_key_value(EVENT_ID, self.events.id_by_name(event_name))
+
+    def lineage(self):
+        """
+        Function to look up the sport and event an activity belongs to, from the request or its stored rows
+
+        :return: Sport, Event names, None where unknown
+        :rtype: dict
+        """
+        name = self.all_args.get('name')
+        if self.activity_type == SPORT:
+            return {SPORT: name, EVENT: None}
+        event_name = name if self.activity_type == EVENT else (
+            self.all_args.get(EVENT) or self.lookup(self.selections, name, EVENT))
+        sport_name = self.all_args.get(SPORT) if self.activity_type == EVENT else None
+        return {SPORT: sport_name or self.lookup(self.events, event_name, SPORT), EVENT: event_name}
+
+    @staticmethod
+    def lookup(repository, name, column):
+        """
+        Function to read one column of an activity by name
+
+        :param repository: DB connection bound to the activity table
+        :type repository: `DBConnection`
+        :param name: Name of the activity
+        :type name: str
+        :param column: Name of the column to read
+        :type column: str
+
+        :return: Column value, None if the activity does not exist
+        :rtype: object
+        """
+        if not name:
+            return None
+        rows = repository.select_all_from_table_by_key_value('name', name)
+        return rows[0].get(column) if rows else None
 
     def create_activity(self):
         """
         Function to create an activity
 
+        :raises ValueError: raised if the parent activity does not exist
+        """
+        table, columns, row = self.build_activity_row()
+        self.db.repository(table).insert_into_table(*with_parent_ids(self.db, table, columns, [row]))
+
+    def validate_activity(self):
+        """
+        Function to check an activity carries the fields required for its type
+
+        :raises ValueError: raised if the name or parent activity is missing
+        """
+        if not self.all_args.get('name'):
+            raise ValueError(f"{self.activity_type} requires a name")
+        if self.activity_type == EVENT and not self.all_args.get(SPORT):
+            raise ValueError(f"{self.activity_type} requires a sport")
+        if self.activity_type == SELECTION and not self.all_args.get(EVENT):
+            raise ValueError(f"{self.activity_type} requires an event")
+
+    def build_activity_row(self):
+        """
+        Function to build the table, columns and row values used to insert an activity
+
+        :raises ValueError: raised if the price or scheduled start cannot be parsed
+
+        :return: Table name, list of columns and tuple of values
+        :rtype: tuple
         """
         name = self.all_args.get('name', '')
-        slug = slugify(name)
         if self.activity_type == SELECTION:
-            self.db.table = 'selections'
             price = "{:.2f}".format(float(self.all_args.get('price', '0.00')))
-            self.db.insert_into_table(
-                ['name', 'active', 'price', 'event'],
-                [(name, 1, price, self.all_args.get('event'))])
-        elif self.activity_type == EVENT:
-            self.db.table = 'events'
+            return 'selections', SELECTION_COLUMNS, (name, 1, price, self.all_args.get('event'))
+        slug = slugify(name)
+        if self.activity_type == EVENT:
             ts = f"{self.all_args.get('scheduled_start', '2021/10/15, 19:30:39')}+00:00"
             scheduled_start = datetime.strptime(ts, "%Y/%m/%d, %H:%M:%S%z").isoformat()
-            self.db.insert_into_table(
-                ['name', 'slug', 'active', 'scheduled_start', 'sport'],
-                [(name, slug, 1, scheduled_start, self.all_args.get('sport'))])
-        else:
-            self.db.table = 'sports'
-            self.db.insert_into_table(['name', 'slug', 'active'], [(name, slug, 1)])
+            return 'events', EVENT_COLUMNS, (name, slug, 1, scheduled_start, self.all_args.get('sport'))
+        return 'sports', SPORT_COLUMNS, (name, slug, 1)
 
     def delete_activity(self):
         """
-        Function to delete an activity
+        Function to delete an activity and its children in a single transaction, one statement per table. The
+        children deleted are recorded in changes.
         """
-        if self.activity_type == SELECTION:
-            self.db.table = 'selections'
-            selection_name = self.all_args.get('name')
-            self.db.delete_row('name', selection_name)
-        elif self.activity_type == EVENT:
-            event_name = self.all_args.get('name')
-            self.delete_selections_by_event(event_name)
-            self.db.table = 'events'
-            self.db.delete_row('name', event_name)
-        else:
-            sport_name = self.all_args.get('name')
-            events = self.get_all_events_by_sport(sport_name)
-            for event in events:
-                event_name = event.get('name')
-                self.delete_selections_by_event(event_name)
-                self.db.table = 'events'
-                self.db.delete_row('name', event_name)
-            self.db.table = 'sports'
-            self.db.delete_row('name', sport_name)
-
-    def delete_selections_by_event(self, event_name):
+        with self.db.transaction():
+            if self.activity_type == SELECTION:
+                selection_name = self.all_args.get('name')
+                self.selections.delete_row('name', selection_name)
+            elif self.activity_type == EVENT:
+                event_name = self.all_args.get('name')
+                self.delete_selections_by_event(event_name, self.lookup(self.events, event_name, SPORT))
+                self.events.delete_row('name', event_name)
+            else:
+                sport_name = self.all_args.get('name')
+                sport_id = self.sports.id_by_name(sport_name)
+                events, selections = self.children_of_sport(sport_id)
+                self.selections.delete_rows_by_parent(EVENT_ID, 'events', SPORT_ID, sport_id)
+                self.events.delete_row(SPORT_ID, sport_id)
+                self.sports.delete_row('name', sport_name)
+                for event in events:
+                    self.record(EVENT, event['name'], sport_name, event['name'])
+                for selection in selections:
+                    self.record(SELECTION, selection['name'], sport_name, selection[EVENT])
+
+    def delete_selections_by_event(self, event_name, sport_name=None):
         """
         Function to delete selections of an event
 
         :param event_name: Name of the parent event
         :type event_name: str
+        :param sport_name: Name of the sport of the event, recorded with the selections deleted
+        :type sport_name: str
         """
-        self.db.table = 'selections'
-        selections = self.get_all_selections_by_event(event_name)
+        event_id = self.events.id_by_name(event_name)
+        selections = self.selections.select_by_key_values(['name'], EVENT_ID, [event_id])
+        self.selections.delete_row(EVENT_ID, event_id)
         for selection in selections:
-            selection_name = selection.get('name')
-            self.db.delete_row('name', selection_name)
+            self.record(SELECTION, selection['name'], sport_name, event_name)
@@ -0,0 +1,260 @@
+import contextvars
+from contextlib import asynccontextmanager
+
+try:
+    import aiomysql
+except ImportError:
+    aiomysql = None
+
+from .backends import _host, _user, _password
+from .db import STREAM_BATCH_SIZE, page_query, read_source
+
+
+class AsyncDBConnection(object):
+
+    def __init__(self, database, pool_config=None, pool=None):
+        """
+        Asyncio variant of DBConnection backed by an aiomysql connection pool. Every method takes the table it
+        works on, so one instance can be shared by any number of concurrent requests.
+
+        :param database: Name of the DB to connect to
+        :type database: str
+        :param pool_config: aiomysql.create_pool keyword arguments, e.g. minsize, maxsize, pool_recycle
+        :type pool_config: dict
+        :param pool: Already created pool, or an in-process stand-in exposing the same acquire() interface
+        :type pool: `aiomysql.Pool`
+        """
+        self.database = database
+        self.pool_config = pool_config or {}
+        self.pool = pool
+        self._transaction = contextvars.ContextVar(f"transaction_{id(self)}", default=None)
+
+    async def get_pool(self):
+        """
+        Function to return the connection pool, creating it on first use
+
+        :raises RuntimeError: raised if aiomysql is not installed
+
+        :return: Connection pool
+        :rtype: `aiomysql.Pool`
+        """
+        if self.pool is None:
+            if aiomysql is None:
+                raise RuntimeError("Async mode requires aiomysql, install requirements-async.txt")
+            config = dict({'minsize': 1, 'maxsize': 10, 'pool_recycle': 300}, **self.pool_config)
+            self.pool = await aiomysql.create_pool(
+                host=_host, user=_user, password=_password, db=self.database, autocommit=True, **config)
+        return self.pool
+
+    async def close(self):
+        """
+        Function to close every connection of the pool
+        """
+        if self.pool is not None:
+            self.pool.close()
+            await self.pool.wait_closed()
+            self.pool = None
+
+    async def execute_query(self, query, result_req=False, params=None, many=False):
+        """
+        Function to execute a Query, on the current transaction's connection if one is open
+
+        :param query: MySQl query to be executed
+        :type query: str
+        :param result_req: Boolean indicating if the result of the query should be returned
+        :type result_req: bool
+        :param params: Values bound to the %s placeholders of the query, or a list of them when many is set
+        :type params: tuple|list
+        :param many: Boolean indicating if the query is executed once per entry of params
+        :type many: bool
+
+        :raise Error: raised if the query execution fails
+
+        :return: Optional return of the result list
+        :rtype: list|None
+        """
+        connection = self._transaction.get()
+        if connection is not None:
+            return await self._execute_on(connection, query, result_req, params, many)
+        pool = await self.get_pool()
+        async with pool.acquire() as connection:
+            return await self._execute_on(connection, query, result_req, params, many)
+
+    @staticmethod
+    async def _execute_on(connection, query, result_req, params, many):
+        """
+        Function to execute a Query on an open connection
+
+        :return: Optional return of the result list
+        :rtype: list|None
+        """
+        try:
+            async with connection.cursor() as cursor:
+                if many:
+                    await cursor.executemany(query, params)
+                else:
+                    await cursor.execute(query, params)
+                if result_req:
+                    headers = [_[0] for _ in cursor.description]
+                    return [dict(zip(headers, row)) for row in await cursor.fetchall()]
+        except Exception as e:
+            print(f"Failed to execute query: {query}. Error encountered: {e}")
+            raise
+
+    async def stream_query(self, query, params=None, batch_size=STREAM_BATCH_SIZE):
+        """
+        Async generator to execute a Query on an unbuffered server side cursor and yield rows a batch at a time
+
+        :param query: MySQl query to be executed
+        :type query: str
+        :param params: Values bound to the %s placeholders of the query
+        :type params: tuple
+        :param batch_size: Number of rows fetched from the server per round trip
+        :type batch_size: int
+
+        :return: Async generator of result rows
+        :rtype: async_generator
+        """
+        pool = await self.get_pool()
+        async with pool.acquire() as connection:
+            async with connection.cursor(aiomysql.SSCursor if aiomysql else None) as cursor:
+                await cursor.execute(query, params)
+                headers = [_[0] for _ in cursor.description]
+                rows = await cursor.fetchmany(batch_size)
+                while rows:
+                    for row in rows:
+                        yield dict(zip(headers, row))
+                    rows = await cursor.fetchmany(batch_size)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Async context manager running every query of the current task on one connection, committed once on exit
+        and rolled back if the block raises. Nested blocks join the outer transaction.
+        """
+        if self._transaction.get() is not None:
+            yield self
+            return
+        pool = await self.get_pool()
+        async with pool.acquire() as connection:
+            await connection.begin()
+            token = self._transaction.set(connection)
+            try:
+                yield self
+                await connection.commit()
+            except Exception:
+                await connection.rollback()
+                raise
+            finally:
+                self._transaction.reset(token)
+
+    async def select_all_from_table(self, table):
+        """
+        Function to select all from a table
+
+        :param table: Name of the table
+        :type table: str
+
+        :return: List of all entries of the table
+        :rtype: list
+        """
+        return await self.execute_query(f"SELECT * FROM {read_source(table)}", result_req=True)
+
+    def stream_all_from_table(self, table, batch_size=STREAM_BATCH_SIZE):
+        """
+        Function to lazily select all from a table
+
+        :param table: Name of the table
+        :type table: str
+        :param batch_size: Number of rows fetched from the server per round trip
+        :type batch_size: int
+
+        :return: Async generator of all entries of the table
+        :rtype: async_generator
+        """
+        return self.stream_query(f"SELECT * FROM {read_source(table)}", batch_size=batch_size)
+
+    async def select_page(self, table, columns, order_by, limit, after=None, filters=None):
+        """
+        Function to select one keyset page of a table, ordered by the given columns
+
+        :param table: Name of the table
+        :type table: str
+        :param columns: List of names of the columns to select
+        :type columns: list
+        :param order_by: List of names of the unique ordering columns the page is keyed on
+        :type order_by: list
+        :param limit: Maximum number of rows to return
+        :type limit: int
+        :param after: Values of the order_by columns of the last row of the previous page
+        :type after: list
+        :param filters: Column, Value pairs the rows must equal
+        :type filters: dict
+
+        :return: List of matched entries
+        :rtype: list
+        """
+        query, params = page_query(table, columns, order_by, limit, after=after, filters=filters)
+        return await self.execute_query(query, result_req=True, params=params)
+
+    async def select_all_from_table_by_key_value(self, table, key, value):
+        """
+        Function to select all matching from a table
+
+        :param table: Name of the table
+        :type table: str
+        :param key: Name of the column to match
+        :type key: str
+        :param value: Value of the supplied column to be matched
+        :type value: str
+
+        :return: List of matched entries
+        :rtype: list
+        """
+        return await self.execute_query(
+            f"SELECT * FROM {read_source(table)} WHERE {key} = %s", result_req=True, params=(value,))
+
+    async def insert_rows(self, table, columns, rows):
+        """
+        Function to insert a batch of rows with one parameterized multi-row INSERT
+
+        :param table: Name of the table
+        :type table: str
+        :param columns: List of names of the column to insert into
+        :type columns: list
+        :param rows: List of value tuples, one per row, in column order
+        :type rows: list
+        """
+        placeholders = ", ".join(["%s"] * len(columns))
+        await self.execute_query(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", params=rows, many=True)
+
+    async def update_row(self, table, values, col_name, row_name):
+        """
+        Function to update a row
+
+        :param table: Name of the table
+        :type table: str
+        :param values: Columns, Values to be updated
+        :type values: dict
+        :param col_name: Name of the column to match
+        :type col_name: str
+        :param row_name: Value of the supplied column to be matched
+        :type row_name: str
+        """
+        set_str = ", ".join([f"{column} = %s" for column in values])
+        await self.execute_query(
+            f"UPDATE {table} SET {set_str} WHERE {col_name} = %s", params=tuple(values.values()) + (row_name,))
+
+    async def delete_row(self, table, key, value):
+        """
+        Function to delete matching rows
+
+        :param table: Name of the table
+        :type table: str
+        :param key: Name of the column to match
+        :type key: str
+        :param value: Value of the supplied column to be matched
+        :type value: str
+        """
+        await self.execute_query(f"DELETE FROM {table} WHERE {key} = %s", params=(value,))
@@ -0,0 +1,608 @@
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from functools import lru_cache
+
+from mysql.connector import connect, Error
+
+_host = "mysqldb"
+_user = "root"
+_password = "p@ssw0rd"
+MEMORY = ':memory:'
+# Seconds a SQLite statement waits for another connection's write lock before failing
+SQLITE_BUSY_TIMEOUT = 5.0
+DB_ERRORS = (Error, sqlite3.Error)
+SQLITE_PARAM = re.compile(r"%([s%])")
+ISO_TIMESTAMP = re.compile(r"^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d+)?(Z|[+-]\d{2}:\d{2})?$")
+ON_UPDATE_TIMESTAMP = re.compile(r"(\w+) ([^,]*?) ON UPDATE CURRENT_TIMESTAMP", re.IGNORECASE)
+AUTO_INCREMENT_KEY = re.compile(r"\bINT NOT NULL AUTO_INCREMENT PRIMARY KEY\b", re.IGNORECASE)
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+DECIMAL_PLACES = Decimal('0.01')
+
+
+class Backend(ABC):
+    """
+    Storage engine DBConnection runs its queries on. A backend opens DB-API connections exposing the
+    mysql.connector connection and cursor methods DBConnection uses, and issues the statements whose syntax
+    differs between engines. Subclasses implement every abstract method, an incomplete backend cannot be created.
+    """
+    name = None
+
+    @abstractmethod
+    def connect(self, database=None, autocommit=False):
+        """
+        Function to open a new connection
+
+        :param database: Name of the DB to connect to, None for a server connection
+        :type database: str
+        :param autocommit: Boolean indicating if every statement commits on its own
+        :type autocommit: bool
+
+        :return: DB connection
+        :rtype: object
+        """
+
+    @abstractmethod
+    def create_database(self, db, exists_ok=False):
+        """
+        Function to create the database of a DB connection
+
+        :param db: DB connection
+        :type db: `DBConnection`
+        :param exists_ok: Boolean indicating if an existing database is left as it is
+        :type exists_ok: bool
+        """
+
+    @abstractmethod
+    def drop_database(self, db):
+        """
+        Function to drop the database of a DB connection
+
+        :param db: DB connection
+        :type db: `DBConnection`
+        """
+
+    @abstractmethod
+    def table_names(self, db):
+        """
+        Function to list the tables of the database of a DB connection, empty when the database does not exist
+
+        :param db: DB connection
+        :type db: `DBConnection`
+
+        :return: Names of the tables
+        :rtype: list
+        """
+
+    @abstractmethod
+    def column_names(self, db, table):
+        """
+        Function to list the columns of a table of the database of a DB connection
+
+        :param db: DB connection
+        :type db: `DBConnection`
+        :param table: Name of the table
+        :type table: str
+
+        :return: Names of the columns, in table order
+        :rtype: list
+        """
+
+    def table_ddl(self, table, column_values):
+        """
+        Function to build the statements creating a table
+
+        :param table: Name of the table
+        :type table: str
+        :param column_values: String containing the columns to create, in MySQL syntax
+        :type column_values: str
+
+        :return: List of statements
+        :rtype: list
+        """
+        return [f"CREATE TABLE {table} ({column_values})"]
+
+    @abstractmethod
+    def try_lock(self, connection, name):
+        """
+        Function to take a named lock without waiting, held until released or the connection closes
+
+        :param connection: Open DB connection the lock is held by
+        :type connection: object
+        :param name: Name of the lock
+        :type name: str
+
+        :return: Boolean indicating if the lock was taken
+        :rtype: bool
+        """
+
+    @abstractmethod
+    def release_lock(self, connection, name):
+        """
+        Function to release a named lock taken with try_lock
+
+        :param connection: Open DB connection the lock is held by
+        :type connection: object
+        :param name: Name of the lock
+        :type name: str
+        """
+
+
+class MySQLBackend(Backend):
+    name = 'mysql'
+
+    def __init__(self, host=_host, user=_user, password=_password):
+        self.config = {'user': user, 'password': password, 'host': host, 'raise_on_warnings': True}
+
+    def connect(self, database=None, autocommit=False):
+        """
+        Function to open a new MySQL connection
+
+        :param database: Name of the DB to connect to, None for a server connection
+        :type database: str
+        :param autocommit: Boolean indicating if every statement commits on its own
+        :type autocommit: bool
+
+        :return: DB connection
+        :rtype: `CMySQLConnection`
+        """
+        config = dict(self.config, database=database) if database else dict(self.config)
+        if autocommit:
+            config['autocommit'] = True
+        return connect(**config)
+
+    def create_database(self, db, exists_ok=False):
+        """
+        Function to set the database timezone to UTC and create the database
+
+        :param db: DB connection
+        :type db: `DBConnection`
+        :param exists_ok: Boolean indicating if an existing database is left as it is
+        :type exists_ok: bool
+        """
+        # Checked rather than CREATE DATABASE IF NOT EXISTS, whose warning is raised by raise_on_warnings
+        if exists_ok and db.execute_query("SELECT schema_name FROM information_schema.schemata WHERE schema_name = %s",
+                                          result_req=True, params=(db.database,)):
+            return
+        db.execute_query("SET time_zone = '+00:00'")
+        db.execute_query(f"CREATE DATABASE {db.database}")
+
+    def drop_database(self, db):
+        """
+        Function to drop the database
+
+        :param db: DB connection
+        :type db: `DBConnection`
+        """
+        db.execute_query(f"DROP DATABASE IF EXISTS {db.database}")
+
+    def table_names(self, db):
+        """
+        Function to list the tables of the database, read from the server so the database need not exist
+
+        :param db: DB connection
+        :type db: `DBConnection`
+
+        :return: Names of the tables
+        :rtype: list
+        """
+        rows = db.execute_query("SELECT table_name AS name FROM information_schema.tables WHERE table_schema = %s",
+                                result_req=True, params=(db.database,))
+        return [row['name'] for row in rows]
+
+    def column_names(self, db, table):
+        """
+        Function to list the columns of a table, read from the server
+
+        :param db: DB connection
+        :type db: `DBConnection`
+        :param table: Name of the table
+        :type table: str
+
+        :return: Names of the columns, in table order
+        :rtype: list
+        """
+        rows = db.execute_query(
+            "SELECT column_name AS name FROM information_schema.columns WHERE table_schema = %s AND table_name = %s "
+            "ORDER BY ordinal_position", result_req=True, params=(db.database, table))
+        return [row['name'] for row in rows]
+
+    def try_lock(self, connection, name):
+        """
+        Function to take a MySQL user level lock without waiting, shared by every app process on the server
+
+        :param connection: Open DB connection the lock is held by
+        :type connection: `CMySQLConnection`
+        :param name: Name of the lock
+        :type name: str
+
+        :return: Boolean indicating if the lock was taken
+        :rtype: bool
+        """
+        return self._lock_call(connection, "SELECT GET_LOCK(%s, 0)", name) == 1
+
+    def release_lock(self, connection, name):
+        """
+        Function to release a MySQL user level lock
+
+        :param connection: Open DB connection the lock is held by
+        :type connection: `CMySQLConnection`
+        :param name: Name of the lock
+        :type name: str
+        """
+        self._lock_call(connection, "SELECT RELEASE_LOCK(%s)", name)
+
+    @staticmethod
+    def _lock_call(connection, query, name):
+        cursor = connection.cursor()
+        try:
+            cursor.execute(query, (name,))
+            return cursor.fetchall()[0][0]
+        finally:
+            cursor.close()
+
+
+class SQLiteBackend(Backend):
+    name = 'sqlite'
+
+    def __init__(self, path=MEMORY, read_only=False):
+        """
+        In process SQLite engine running the MySQL schema and queries of the app
+
+        :param path: File path of the database, may contain {database}, or :memory: for a temporary database per
+            database name shared by every connection of the backend and removed with it
+        :type path: str
+        :param read_only: Boolean indicating if connections reject writes
+        :type read_only: bool
+        """
+        self.path = path
+        self.read_only = read_only
+        # Shared cache in-memory databases fail at once on table locks, a WAL file waits them out like any file
+        self._temp_dir = tempfile.TemporaryDirectory(prefix='sqlite-') if path == MEMORY else None
+        self._held_locks = set()
+        self._lock = threading.Lock()
+
+    def uri(self, database):
+        """
+        Function to build the URI of a database
+
+        :param database: Name of the DB
+        :type database: str
+
+        :return: SQLite URI
+        :rtype: str
+        """
+        if self._temp_dir is not None:
+            return f"file:{os.path.join(self._temp_dir.name, database or 'main')}.db"
+        return f"file:{self.path.format(database=database or 'main')}{'?mode=ro' if self.read_only else ''}"
+
+    def connect(self, database=None, autocommit=False):
+        """
+        Function to open a new SQLite connection. Writable databases are journaled in WAL mode, so reads run
+        alongside a write and writes wait for each other up to the busy timeout. Connections run in autocommit mode
+        until a transaction is started.
+
+        :param database: Name of the DB to connect to
+        :type database: str
+        :param autocommit: Unused, statements outside a transaction always commit on their own
+        :type autocommit: bool
+
+        :return: DB connection
+        :rtype: `SQLiteConnection`
+        """
+        connection = sqlite3.connect(self.uri(database), uri=True, detect_types=sqlite3.PARSE_DECLTYPES,
+                                     isolation_level=None, check_same_thread=False, timeout=SQLITE_BUSY_TIMEOUT)
+        connection.create_function('REGEXP', 2, regexp)
+        connection.execute("PRAGMA foreign_keys = ON")
+        if self.read_only:
+            connection.execute("PRAGMA query_only = ON")
+        else:
+            connection.execute("PRAGMA journal_mode = WAL")
+        return SQLiteConnection(connection, immediate=not self.read_only)
+
+    def create_database(self, db, exists_ok=False):
+        """
+        Function to create the database, SQLite creates it on first connect
+
+        :param db: DB connection
+        :type db: `DBConnection`
+        :param exists_ok: Unused, an existing database is always left as it is
+        :type exists_ok: bool
+        """
+
+    def drop_database(self, db):
+        """
+        Function to drop every table of the database, children first
+
+        :param db: DB connection
+        :type db: `DBConnection`
+        """
+        for table in reversed(self.table_names(db)):
+            db.execute_query(f"DROP TABLE {table}", database=db.database)
+
+    def table_names(self, db):
+        """
+        Function to list the tables of the database in creation order
+
+        :param db: DB connection
+        :type db: `DBConnection`
+
+        :return: Names of the tables
+        :rtype: list
+        """
+        rows = db.execute_query(
+            "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY rowid", database=db.database, result_req=True)
+        return [row['name'] for row in rows]
+
+    def column_names(self, db, table):
+        """
+        Function to list the columns of a table
+
+        :param db: DB connection
+        :type db: `DBConnection`
+        :param table: Name of the table
+        :type table: str
+
+        :return: Names of the columns, in table order
+        :rtype: list
+        """
+        rows = db.execute_query("SELECT name FROM pragma_table_info(%s) ORDER BY cid", database=db.database,
+                                result_req=True, params=(table,))
+        return [row['name'] for row in rows]
+
+    def try_lock(self, connection, name):
+        """
+        Function to take a named lock without waiting, SQLite databases are served by a single process so the
+        lock is held in the backend
+
+        :param connection: Open DB connection the lock is held by
+        :type connection: `SQLiteConnection`
+        :param name: Name of the lock
+        :type name: str
+
+        :return: Boolean indicating if the lock was taken
+        :rtype: bool
+        """
+        with self._lock:
+            if name in self._held_locks:
+                return False
+            self._held_locks.add(name)
+            return True
+
+    def release_lock(self, connection, name):
+        """
+        Function to release a named lock taken with try_lock
+
+        :param connection: Open DB connection the lock is held by
+        :type connection: `SQLiteConnection`
+        :param name: Name of the lock
+        :type name: str
+        """
+        with self._lock:
+            self._held_locks.discard(name)
+
+    def table_ddl(self, table, column_values):
+        """
+        Function to build the statements creating a table, emulating ON UPDATE CURRENT_TIMESTAMP with a trigger
+        and AUTO_INCREMENT keys with a rowid alias
+
+        :param table: Name of the table
+        :type table: str
+        :param column_values: String containing the columns to create, in MySQL syntax
+        :type column_values: str
+
+        :return: List of statements
+        :rtype: list
+        """
+        columns = [match.group(1) for match in ON_UPDATE_TIMESTAMP.finditer(column_values)]
+        column_values = ON_UPDATE_TIMESTAMP.sub(lambda match: f"{match.group(1)} {match.group(2)}", column_values)
+        column_values = AUTO_INCREMENT_KEY.sub("INTEGER PRIMARY KEY", column_values)
+        ddl = [f"CREATE TABLE {table} ({column_values})"]
+        for column in columns:
+            ddl.append(
+                f"CREATE TRIGGER {table}_{column}_on_update AFTER UPDATE ON {table} FOR EACH ROW "
+                f"WHEN NEW.{column} IS OLD.{column} BEGIN "
+                f"UPDATE {table} SET {column} = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid; END")
+        return ddl
+
+
+class SQLiteConnection(object):
+
+    def __init__(self, connection, immediate=True):
+        """
+        SQLite connection exposing the mysql.connector connection methods used by DBConnection
+
+        :param connection: Autocommit SQLite connection
+        :type connection: `sqlite3.Connection`
+        :param immediate: Boolean indicating if transactions take the write lock when they start, waiting for it
+            up to the busy timeout, rather than failing when they first write after another connection did
+        :type immediate: bool
+        """
+        self.connection = connection
+        self.immediate = immediate
+
+    def cursor(self, buffered=None, prepared=None):
+        """
+        Function to open a cursor, SQLite steps through results lazily and caches compiled statements itself
+
+        :return: DB cursor
+        :rtype: `SQLiteCursor`
+        """
+        return SQLiteCursor(self.connection.cursor())
+
+    def start_transaction(self):
+        self.connection.execute("BEGIN IMMEDIATE" if self.immediate else "BEGIN")
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    def is_connected(self):
+        try:
+            self.connection.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def close(self):
+        self.connection.close()
+
+
+class SQLiteCursor(object):
+
+    def __init__(self, cursor):
+        """
+        SQLite cursor taking the %s placeholders and value types of mysql.connector
+
+        :param cursor: SQLite cursor
+        :type cursor: `sqlite3.Cursor`
+        """
+        self.cursor = cursor
+
+    @property
+    def description(self):
+        return self.cursor.description
+
+    @property
+    def with_rows(self):
+        return self.cursor.description is not None
+
+    def execute(self, query, params=None):
+        if params is None:
+            self.cursor.execute(query)
+        else:
+            self.cursor.execute(sqlite_query(query), adapt_params(params))
+
+    def executemany(self, query, params):
+        """
+        Function to execute a query once per entry of params, atomically like a MySQL multi-row statement
+        """
+        self.cursor.execute("SAVEPOINT executemany")
+        try:
+            self.cursor.executemany(sqlite_query(query), [adapt_params(row) for row in params])
+        except sqlite3.Error:
+            self.cursor.execute("ROLLBACK TO executemany")
+            raise
+        finally:
+            self.cursor.execute("RELEASE executemany")
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def fetchmany(self, size):
+        return self.cursor.fetchmany(size)
+
+    def close(self):
+        self.cursor.close()
+
+
+def sqlite_query(query):
+    """
+    Function to convert the %s placeholders and %% escapes of a parameterized query to SQLite syntax
+
+    :param query: Parameterized MySQl query
+    :type query: str
+
+    :return: SQLite query
+    :rtype: str
+    """
+    return SQLITE_PARAM.sub(lambda match: '?' if match.group(1) == 's' else '%', query)
+
+
+def adapt_params(params):
+    """
+    Function to convert bound values the way MySQL stores them: datetimes and ISO 8601 strings as UTC
+    'YYYY-MM-DD HH:MM:SS' text, so they order and compare correctly, and decimals as numbers
+
+    :param params: Values bound to a query
+    :type params: tuple
+
+    :return: SQLite values
+    :rtype: tuple
+    """
+    return tuple(adapt_value(value) for value in params)
+
+
+def adapt_value(value):
+    """
+    Function to convert one bound value, see adapt_params
+
+    :param value: Value bound to a query
+    :type value: object
+
+    :return: SQLite value
+    :rtype: object
+    """
+    if isinstance(value, str) and ISO_TIMESTAMP.match(value):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.strftime(TIMESTAMP_FORMAT)
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+@lru_cache(maxsize=256)
+def compile_regex(pattern):
+    """
+    Function to compile a REGEXP pattern, case insensitive like MySQL's default collation
+
+    :param pattern: Regex pattern string
+    :type pattern: str
+
+    :return: Compiled pattern
+    :rtype: `re.Pattern`
+    """
+    return re.compile(pattern, re.IGNORECASE)
+
+
+def regexp(pattern, value):
+    """
+    Function implementing the SQLite REGEXP operator, value REGEXP pattern
+
+    :return: Boolean indicating if the value matches
+    :rtype: bool
+    """
+    return value is not None and compile_regex(pattern).search(str(value)) is not None
+
+
+def convert_timestamp(value):
+    return datetime.strptime(value.decode()[:19], TIMESTAMP_FORMAT)
+
+
+def convert_decimal(value):
+    return Decimal(value.decode()).quantize(DECIMAL_PLACES)
+
+
+sqlite3.register_converter('TIMESTAMP', convert_timestamp)
+sqlite3.register_converter('DECIMAL', convert_decimal)
+
+BACKENDS = {MySQLBackend.name: MySQLBackend, SQLiteBackend.name: SQLiteBackend}
+
+
+def get_backend(name, **kwargs):
+    """
+    Function to build a backend by name
+
+    :param name: Name of the backend, mysql or sqlite
+    :type name: str
+
+    :raises ValueError: raised if the backend is unknown
+
+    :return: Backend
+    :rtype: `Backend`
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend: {name}, expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
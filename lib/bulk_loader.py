@@ -0,0 +1,134 @@
+import json
+from collections import OrderedDict
+
+from .activity_mgr import ActivityMgr, EVENT, SELECTION, SPORT
+from .backends import DB_ERRORS
+from .db_setup import with_parent_ids
+
+CHUNK_SIZE = 500
+LOAD_ORDER = ['sports', 'events', 'selections']
+TABLE_ACTIVITIES = {'sports': SPORT, 'events': EVENT, 'selections': SELECTION}
+
+
+def parse_ndjson(body):
+    """
+    Function to parse a newline delimited JSON body, keeping undecodable lines so they are reported per row
+
+    :param body: Request body with one JSON activity per line
+    :type body: str
+
+    :return: List of decoded activities, or the raw line where decoding failed
+    :rtype: list
+    """
+    items = []
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            items.append(json.loads(line))
+        except ValueError:
+            items.append(line)
+    return items
+
+
+class BulkLoader(object):
+
+    def __init__(self, db, chunk_size=CHUNK_SIZE):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.created = 0
+        self.errors = []
+        self.changes = []
+
+    def load(self, items):
+        """
+        Function to validate and insert a list of sports, events and selections in batched multi-row inserts.
+        Parents are written before children so activities can reference others in the same load. The activities
+        created are recorded in changes.
+
+        :param items: List of activity dicts, as accepted by /create
+        :type items: list
+
+        :return: Number of activities created and the errors of rejected rows by index
+        :rtype: dict
+        """
+        batches = OrderedDict([(table, {'columns': None, 'rows': [], 'indexes': []}) for table in LOAD_ORDER])
+        for index, item in enumerate(items):
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError(f"Invalid activity: {item!r}")
+                mgr = ActivityMgr(self.db, **item)
+                mgr.set_activity_type()
+                mgr.validate_activity()
+                table, columns, row = mgr.build_activity_row()
+            except Exception as e:
+                self.errors.append({'index': index, 'error': str(e)})
+                continue
+            batches[table]['columns'] = columns
+            batches[table]['rows'].append(row)
+            batches[table]['indexes'].append(index)
+        for table, batch in batches.items():
+            for start in range(0, len(batch['rows']), self.chunk_size):
+                end = start + self.chunk_size
+                self.insert_chunk(table, batch['columns'], batch['rows'][start:end], batch['indexes'][start:end])
+        self.errors.sort(key=lambda error: error['index'])
+        return {'created': self.created, 'errors': self.errors}
+
+    def insert_chunk(self, table, columns, rows, indexes):
+        """
+        Function to insert a chunk of rows, resolving their parent ids in one lookup, falling back to row by row
+        inserts to pin down failing rows
+
+        :param table: Name of the table to insert into
+        :type table: str
+        :param columns: List of names of the column to insert into
+        :type columns: list
+        :param rows: List of value tuples
+        :type rows: list
+        :param indexes: Position of each row in the original request
+        :type indexes: list
+        """
+        repository = self.db.repository(table)
+        try:
+            repository.insert_rows(*with_parent_ids(self.db, table, columns, rows))
+            self.created += len(rows)
+            self.record(table, columns, rows)
+            return
+        except DB_ERRORS + (ValueError,) as e:
+            if len(rows) == 1:
+                self.errors.append({'index': indexes[0], 'error': str(e)})
+                return
+        inserted = []
+        for row, index in zip(rows, indexes):
+            try:
+                repository.insert_rows(*with_parent_ids(self.db, table, columns, [row]))
+                self.created += 1
+                inserted.append(row)
+            except DB_ERRORS + (ValueError,) as e:
+                self.errors.append({'index': index, 'error': str(e)})
+        self.record(table, columns, inserted)
+
+    def record(self, table, columns, rows):
+        """
+        Function to record the creation of inserted rows with their sport and event, the sports of selections
+        read in one lookup of their events
+
+        :param table: Name of the table the rows were inserted into
+        :type table: str
+        :param columns: List of names of the columns of the rows
+        :type columns: list
+        :param rows: List of value tuples inserted
+        :type rows: list
+        """
+        activity = TABLE_ACTIVITIES[table]
+        names = [row[columns.index('name')] for row in rows]
+        if activity == SPORT:
+            lineages = [{SPORT: name, EVENT: None} for name in names]
+        elif activity == EVENT:
+            lineages = [{SPORT: row[columns.index(SPORT)], EVENT: name} for row, name in zip(rows, names)]
+        else:
+            events = [row[columns.index(EVENT)] for row in rows]
+            sports = {row['name']: row[SPORT] for row in self.db.repository('events').select_by_key_values(
+                ['name', SPORT], 'name', sorted(set(events)))} if rows else {}
+            lineages = [{SPORT: sports.get(event), EVENT: event} for event in events]
+        self.changes.extend({'activity': activity, 'name': name, **lineage} for name, lineage in zip(names, lineages))
@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache(object):
+
+    def __init__(self, max_size=1024, ttl=30):
+        """
+        Size bounded, least recently used cache whose entries expire after a time to live and are tagged with
+        the tables they were read from so writes can invalidate them. Each table keeps a generation moved on by
+        every invalidation, so a value read before a write is not stored once the write has invalidated it.
+
+        :param max_size: Maximum number of entries kept
+        :type max_size: int
+        :param ttl: Seconds an entry is served for, None to keep entries until evicted or invalidated
+        :type ttl: float
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._keys_by_table = {}
+        self._generations = {}
+        self._clears = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def get(self, key):
+        """
+        Function to look up an entry, refreshing its recency
+
+        :param key: Cache key
+        :type key: hashable
+
+        :return: Boolean indicating a hit and the cached value
+        :rtype: tuple
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return False, None
+            value, tables, expires = entry
+            if expires is not None and expires < time.monotonic():
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                self._remove(key)
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return True, value
+
+    def generation(self, tables):
+        """
+        Function to read the generation of tables, taken before reading a value from them
+
+        :param tables: Names of the tables the value is read from
+        :type tables: iterable
+
+        :return: Opaque token, changed by any invalidation of one of the tables
+        :rtype: tuple
+        """
+        with self._lock:
+            return self._generation(tables)
+
+    def set(self, key, value, tables, generation=None):
+        """
+        Function to store an entry, evicting the least recently used entries above the size bound
+
+        :param key: Cache key
+        :type key: hashable
+        :param value: Value to be cached
+        :type value: object
+        :param tables: Names of the tables the value was read from
+        :type tables: iterable
+        :param generation: Generation of the tables taken before the value was read, the value is not stored if
+            one of them was invalidated since
+        :type generation: tuple
+
+        :return: Boolean indicating the value was stored
+        :rtype: bool
+        """
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        tables = frozenset(tables)
+        with self._lock:
+            if generation is not None and generation != self._generation(tables):
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, tables, expires)
+            for table in tables:
+                self._keys_by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._stats['evictions'] += 1
+                self._remove(next(iter(self._entries)))
+        return True
+
+    def invalidate(self, *tables):
+        """
+        Function to drop every entry read from any of the given tables
+
+        :param tables: Names of the tables written to
+        :type tables: str
+        """
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+                for key in list(self._keys_by_table.get(table, ())):
+                    self._stats['invalidations'] += 1
+                    self._remove(key)
+
+    def clear(self):
+        """
+        Function to drop every entry
+        """
+        with self._lock:
+            self._stats['invalidations'] += len(self._entries)
+            self._clears += 1
+            self._entries.clear()
+            self._keys_by_table.clear()
+
+    def stats(self):
+        """
+        Function to report the cache counters
+
+        :return: Cache configuration and counters
+        :rtype: dict
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({'size': len(self._entries), 'max_size': self.max_size, 'ttl': self.ttl})
+        return stats
+
+    def _generation(self, tables):
+        """
+        Function to read the generation of tables, caller must hold the lock
+
+        :param tables: Names of the tables
+        :type tables: iterable
+
+        :return: Clear count and table generations, in table name order
+        :rtype: tuple
+        """
+        return (self._clears,) + tuple(self._generations.get(table, 0) for table in sorted(tables))
+
+    def _remove(self, key):
+        """
+        Function to drop one entry and its table tags, caller must hold the lock
+
+        :param key: Cache key
+        :type key: hashable
+        """
+        _, tables, _ = self._entries.pop(key)
+        for table in tables:
+            keys = self._keys_by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_table[table]
@@ -0,0 +1,174 @@
+import threading
+import time
+from collections import deque
+
+from .serializers import dumps
+
+FEED_CAPACITY = 10000
+HEARTBEAT_SECONDS = 15
+RESET = 'reset'
+
+
+class ChangeFeed(object):
+
+    def __init__(self, capacity=FEED_CAPACITY):
+        """
+        In process feed of the changes committed by the app, numbered by a sequence and kept in a bounded
+        ring buffer so a client can resume from the last sequence it saw. Changes are only published once their
+        transaction has committed; a client that falls further behind than the buffer is told to reset.
+
+        :param capacity: Maximum number of changes kept for resuming clients
+        :type capacity: int
+        """
+        self._changes = deque(maxlen=capacity)
+        self._seq = 0
+        self._condition = threading.Condition()
+
+    @property
+    def last_seq(self):
+        with self._condition:
+            return self._seq
+
+    def publish(self, change, activity, name, sport=None, event=None, **data):
+        """
+        Function to append a committed change and wake every waiting client
+
+        :param change: Kind of change, e.g. create, start, inactive, delete, price
+        :type change: str
+        :param activity: Activity type changed, sport, event or selection
+        :type activity: str
+        :param name: Name of the activity changed
+        :type name: str
+        :param sport: Name of the sport the activity belongs to, used to filter the feed
+        :type sport: str
+        :param event: Name of the event the activity belongs to, used to filter the feed
+        :type event: str
+        :param data: Changed values, e.g. price, status or outcome
+
+        :return: Sequence number of the change
+        :rtype: int
+        """
+        with self._condition:
+            self._seq += 1
+            self._changes.append({'seq': self._seq, 'change': change, 'activity': activity, 'name': name,
+                                  'sport': sport, 'event': event, **data})
+            self._condition.notify_all()
+            return self._seq
+
+    def changes_since(self, since, timeout=None):
+        """
+        Function to return the changes after a sequence number, waiting up to timeout for one to be published
+
+        :param since: Last sequence number seen by the client
+        :type since: int
+        :param timeout: Seconds to wait when there are no newer changes, None to return at once
+        :type timeout: float
+
+        :return: Newer changes in sequence order, or a single reset change if the client missed changes that
+            are no longer buffered or holds a sequence from before a restart
+        :rtype: list
+        """
+        with self._condition:
+            if timeout is not None:
+                self._condition.wait_for(lambda: self._seq != since, timeout)
+            if since > self._seq or (self._changes and since < self._changes[0]['seq'] - 1):
+                return [{'seq': self._seq, 'change': RESET}]
+            if since == self._seq:
+                return []
+            first = self._changes[0]['seq']
+            return [self._changes[index] for index in range(since - first + 1, len(self._changes))]
+
+    def subscribe(self, since=None, sport=None, event=None, heartbeat=HEARTBEAT_SECONDS):
+        """
+        Generator to follow the feed from a sequence number, yielding matching changes as they are published
+        and None when nothing was published for a heartbeat interval so idle connections can be kept alive
+
+        :param since: Last sequence number seen by the client, None to start from now
+        :type since: int
+        :param sport: Only yield changes of this sport
+        :type sport: str
+        :param event: Only yield changes of this event
+        :type event: str
+        :param heartbeat: Seconds to wait for a change before yielding None
+        :type heartbeat: float
+
+        :return: Generator of changes
+        :rtype: generator
+        """
+        # Resolved now rather than on the first next() so changes published in between are not missed
+        return self._follow(self.last_seq if since is None else since, sport, event, heartbeat)
+
+    def _follow(self, seq, sport, event, heartbeat):
+        """
+        Generator behind subscribe, following the feed from a resolved sequence number
+
+        :return: Generator of changes
+        :rtype: generator
+        """
+        while True:
+            changes = self.changes_since(seq, timeout=heartbeat)
+            if not changes:
+                yield None
+                continue
+            for change in changes:
+                seq = change['seq']
+                if change['change'] == RESET or matches(change, sport, event):
+                    yield change
+
+
+def matches(change, sport=None, event=None):
+    """
+    Function to check a change belongs to the given sport and event. Changes of the sport itself also reach
+    subscribers of one of its events, as they cascade down to the event.
+
+    :param change: Published change
+    :type change: dict
+    :param sport: Name of the sport to match, None for any
+    :type sport: str
+    :param event: Name of the event to match, None for any, given with its sport to receive sport changes
+    :type event: str
+
+    :return: Boolean indicating if the change matches
+    :rtype: bool
+    """
+    if sport and change['sport'] != sport:
+        return False
+    if event and change['event'] != event and not (sport and change['activity'] == 'sport'):
+        return False
+    return True
+
+
+def iter_sse(changes):
+    """
+    Generator to encode changes as server-sent events, with the sequence as the event id so the browser resumes
+    with Last-Event-ID, and a comment line for every heartbeat
+
+    :param changes: Changes, None for a heartbeat
+    :type changes: iterable
+
+    :return: Generator of event text
+    :rtype: generator
+    """
+    # The reconnection delay doubles as the first chunk, which makes servers send the headers at once
+    yield "retry: 2000\n\n"
+    for change in changes:
+        if change is None:
+            yield f": heartbeat {int(time.time())}\n\n"
+        else:
+            yield f"id: {change['seq']}\nevent: {change['change']}\ndata: {dumps(change)}\n\n"
+
+
+def iter_feed_ndjson(changes):
+    """
+    Generator to encode changes as newline delimited JSON, with an empty line for every heartbeat
+
+    :param changes: Changes, None for a heartbeat
+    :type changes: iterable
+
+    :return: Generator of JSON lines
+    :rtype: generator
+    """
+    # Servers send the headers with the first chunk, so open the stream at once
+    yield "\n"
+    for change in changes:
+        yield "\n" if change is None else dumps(change) + "\n"
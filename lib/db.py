@@ -1,20 +1,264 @@
-from mysql.connector import connect, Error
+import copy
+import threading
+import time
+from contextlib import contextmanager
 
-_host = "mysqldb"
-_user = "root"
-_password = "p@ssw0rd"
+from .backends import DB_ERRORS, Error, MySQLBackend
+from .pool import ConnectionPool
+from .statements import STATEMENT_CACHE_SIZE, StatementCache, is_preparable
+
+STREAM_BATCH_SIZE = 500
+# Child table: Parent table, Name the parent name is read as, Column holding the parent id
+PARENTS = {
+    'events': ('sports', 'sport', 'sport_id'),
+    'selections': ('events', 'event', 'event_id')}
+
+
+def read_source(table):
+    """
+    Function to build the relation the rows of a table are read from. Children only store the id of their parent,
+    its name is joined in and read under the parent name column, e.g. the sport of an event
+
+    :param table: Name of the table
+    :type table: str
+
+    :return: Table name, or derived table of the child rows with their parent name
+    :rtype: str
+    """
+    if table not in PARENTS:
+        return table
+    parent_table, name_column, id_column = PARENTS[table]
+    return (f"(SELECT c.*, p.name AS {name_column} FROM {table} c "
+            f"LEFT JOIN {parent_table} p ON p.id = c.{id_column}) {table}")
+
+
+def read_tables(table):
+    """
+    Function to list the tables a read of a table depends on, the table and the parent its names are joined from
+
+    :param table: Name of the table
+    :type table: str
+
+    :return: List of table names
+    :rtype: list
+    """
+    return [table, PARENTS[table][0]] if table in PARENTS else [table]
+
+
+def page_query(table, columns, order_by, limit, after=None, filters=None):
+    """
+    Function to build the query selecting one keyset page of a table, ordered by the given columns
+
+    :param table: Name of the table
+    :type table: str
+    :param columns: List of names of the columns to select
+    :type columns: list
+    :param order_by: List of names of the unique ordering columns the page is keyed on
+    :type order_by: list
+    :param limit: Maximum number of rows to return
+    :type limit: int
+    :param after: Values of the order_by columns of the last row of the previous page
+    :type after: list
+    :param filters: Column, Value pairs the rows must equal
+    :type filters: dict
+
+    :return: Query built and its params
+    :rtype: tuple
+    """
+    conditions = []
+    params = []
+    for key, value in (filters or {}).items():
+        conditions.append(f"{key} = %s")
+        params.append(value)
+    if after:
+        placeholders = ", ".join(["%s"] * len(order_by))
+        conditions.append(f"({', '.join(order_by)}) > ({placeholders})" if len(order_by) > 1 else
+                          f"{order_by[0]} > %s")
+        params.extend(after)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"SELECT {', '.join(columns)} FROM {read_source(table)}{where} ORDER BY {', '.join(order_by)} LIMIT %s"
+    return query, tuple(params) + (limit,)
 
 
 class DBConnection(object):
 
-    def __init__(self, database, table=None):
+    def __init__(self, database, table=None, pool_config=None, cache=None, statement_cache_size=STATEMENT_CACHE_SIZE,
+                 backend=None, metrics=None, versions=None, name_ids=None):
         self.database = database
-        self.connection_config = {'user': _user, 'password': _password, 'host': _host, 'raise_on_warnings': True}
+        self.backend = backend or MySQLBackend()
         self.table = table
-        self.cursor = None
-        self.connection = None
+        self.pool = ConnectionPool(self._connect, **pool_config) if pool_config is not None else None
+        self.cache = cache
+        self.statement_cache_size = statement_cache_size
+        self.metrics = metrics
+        self.versions = versions
+        self.name_ids = name_ids
+        self._local = threading.local()
+        self._repositories = {}
+
+    def repository(self, table):
+        """
+        Function to return a connection bound to one table, sharing the pool, cache and per thread transactions
+        of this connection. A repository is never pointed at another table, so one can be used by any number of
+        threads at once.
+
+        :param table: Name of the table
+        :type table: str
+
+        :return: Table bound DB connection
+        :rtype: `DBConnection`
+        """
+        repository = self._repositories.get(table)
+        if repository is None:
+            repository = copy.copy(self)
+            repository.table = table
+            self._repositories[table] = repository
+        return repository
+
+    def _connect(self):
+        """
+        Function to open a new autocommit connection to the database, used by the pool
+
+        :return: DB connection
+        :rtype: `CMySQLConnection`
+        """
+        return self._open(self.database, autocommit=True)
+
+    def _open(self, database=None, autocommit=False):
+        """
+        Function to open a new connection through the backend, timing the connect
+
+        :param database: Name of the DB to connect to, None for a server connection
+        :type database: str
+        :param autocommit: Boolean indicating if every statement commits on its own
+        :type autocommit: bool
+
+        :return: DB connection
+        :rtype: `CMySQLConnection`
+        """
+        if self.metrics is None:
+            return self.backend.connect(database, autocommit=autocommit)
+        start = time.perf_counter()
+        connection = self.backend.connect(database, autocommit=autocommit)
+        self.metrics.observe_connect(time.perf_counter() - start)
+        return connection
+
+    def _observe(self, query, start, rows=None, error=False, params=None):
+        """
+        Function to record an executed query when metrics are enabled
+
+        :param query: MySQl query executed
+        :type query: str
+        :param start: perf_counter value taken before the query was sent
+        :type start: float
+        :param rows: Number of rows returned, None when the query returns none
+        :type rows: int
+        :param error: Boolean indicating if the query raised
+        :type error: bool
+        :param params: Values bound to the query
+        :type params: tuple|list
+        """
+        if self.metrics is not None:
+            self.metrics.observe_query(query, time.perf_counter() - start, rows=rows, error=error, params=params)
+
+    def statement_cache(self, pooled):
+        """
+        Function to return the prepared statement cache of a pooled connection, creating it on first use
+
+        :param pooled: Checked out connection
+        :type pooled: `PooledConnection`
+
+        :return: Statement cache, or None when prepared statements are disabled
+        :rtype: `StatementCache`|None
+        """
+        if not self.statement_cache_size:
+            return None
+        if pooled.statements is None:
+            pooled.statements = StatementCache(pooled.connection, self.statement_cache_size)
+        return pooled.statements
+
+    def pool_stats(self):
+        """
+        Function to report connection pool usage
+
+        :return: Pool counters, or None when pooling is disabled
+        :rtype: dict|None
+        """
+        return self.pool.stats() if self.pool else None
+
+    def cache_stats(self):
+        """
+        Function to report read cache usage
+
+        :return: Cache counters, or None when caching is disabled
+        :rtype: dict|None
+        """
+        return self.cache.stats() if self.cache else None
+
+    def name_id_stats(self):
+        """
+        Function to report name to id cache usage
+
+        :return: Cache counters, or None when the cache is disabled
+        :rtype: dict|None
+        """
+        return self.name_ids.stats() if self.name_ids else None
+
+    def read_through(self, query, params, loader):
+        """
+        Function to serve a read of the current table from the cache, loading and caching it on a miss.
+        Reads inside a transaction bypass the cache so they see the transaction's own writes. A read overtaken by
+        a committed write to the table, or the parent its names are joined from, is returned but not cached.
+
+        :param query: Query text of the read, part of the cache key
+        :type query: str
+        :param params: Values bound to the query, part of the cache key
+        :type params: tuple
+        :param loader: Callable running the read against the DB
+        :type loader: callable
+
+        :return: Result of the read, shared with other callers so it must not be modified
+        :rtype: list
+        """
+        if self.cache is None or getattr(self._local, 'connection', None) is not None:
+            return loader()
+        key = (self.table, query, params)
+        hit, result = self.cache.get(key)
+        if not hit:
+            tables = read_tables(self.table)
+            generation = self.cache.generation(tables)
+            result = loader()
+            self.cache.set(key, result, tables, generation=generation)
+        return result
+
+    def mark_dirty(self, table):
+        """
+        Function to invalidate cached reads of a table once its write is committed
+
+        :param table: Name of the table written to
+        :type table: str
+        """
+        if getattr(self._local, 'connection', None) is not None:
+            self._local.dirty.add(table)
+        else:
+            self.invalidate(table)
 
-    def execute_query(self, query, database=None, result_req=False, commit=False):
+    def invalidate(self, *tables):
+        """
+        Function to drop the cached reads and ids and move the versions of tables whose writes were committed
+
+        :param tables: Names of the tables written to
+        :type tables: str
+        """
+        tables = [table for table in tables if table is not None]
+        if self.cache is not None:
+            self.cache.invalidate(*tables)
+        if self.name_ids is not None:
+            self.name_ids.invalidate(*tables)
+        if self.versions is not None:
+            self.versions.bump(*tables)
+
+    def execute_query(self, query, database=None, result_req=False, commit=False, params=None, many=False):
         """
         Function to execute a Query
 
@@ -26,30 +270,238 @@ class DBConnection(object):
         :type result_req: bool
         :param commit: Boolean indicating if the query needs to be committed to the db
         :type commit: bool
+        :param params: Values bound to the %s placeholders of the query, or a list of them when many is set
+        :type params: tuple|list
+        :param many: Boolean indicating if the query is executed once per entry of params
+        :type many: bool
+
+        :raise Error: raised if the query execution fails
+
+        :return: Optional return of the result list
+        :rtype: list|None
+        """
+        table = self.table
+        try:
+            return self._execute(query, database, result_req, commit, params, many)
+        finally:
+            if commit:
+                self.mark_dirty(table)
+
+    def _execute(self, query, database, result_req, commit, params, many):
+        """
+        Function to execute a Query on the transaction connection, a pooled connection or a new connection
 
         :raise Error: raised if the query execution fails
 
         :return: Optional return of the result list
         :rtype: list|None
         """
-        if database:
-            self.connection_config.update({'database': database})
+        transaction = getattr(self._local, 'connection', None)
+        if transaction is not None and database == self.database:
+            return self._execute_on(transaction, query, result_req, params, many, self._local.statements)
+        if self.pool and database and database == self.database:
+            return self._execute_pooled(query, result_req, params, many)
+        connection = None
+        cursor = None
         try:
-            self.connection = connect(**self.connection_config)
-            self.cursor = self.connection.cursor()
-            self.cursor.execute(query)
+            connection = self._open(database)
+            start = time.perf_counter()
+            cursor = connection.cursor()
+            if many:
+                cursor.executemany(query, params)
+            else:
+                cursor.execute(query, params)
             if commit:
-                self.connection.commit()
+                connection.commit()
+            result = self.get_result(cursor) if result_req else None
+            self._observe(query, start, rows=len(result) if result_req else None, params=params)
+            return result
+        except DB_ERRORS as e:
+            print(f"Failed to execute query: {query}. Error encountered: {e}")
+            if connection is not None:
+                self._observe(query, start, error=True, params=params)
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+            if connection is not None:
+                connection.close()
+
+    def _execute_pooled(self, query, result_req=False, params=None, many=False):
+        """
+        Function to execute a Query on a pooled autocommit connection
+
+        :param query: MySQl query to be executed
+        :type query: str
+        :param result_req: Boolean indicating if the result of the query should be returned
+        :type result_req: bool
+        :param params: Values bound to the %s placeholders of the query, or a list of them when many is set
+        :type params: tuple|list
+        :param many: Boolean indicating if the query is executed once per entry of params
+        :type many: bool
+
+        :raise Error: raised if the query execution fails
+
+        :return: Optional return of the result list
+        :rtype: list|None
+        """
+        pooled = self.pool.acquire()
+        discard = False
+        try:
+            return self._execute_on(pooled.connection, query, result_req, params, many, self.statement_cache(pooled))
+        except DB_ERRORS:
+            discard = not ConnectionPool.is_healthy(pooled)
+            raise
+        finally:
+            self.pool.release(pooled, discard=discard)
+
+    def _execute_on(self, connection, query, result_req=False, params=None, many=False, statements=None):
+        """
+        Function to execute a Query on an already open connection, leaving commit to the caller. Parameterized
+        DML runs as a server side prepared statement when the connection has a statement cache.
+
+        :param connection: Open DB connection
+        :type connection: `CMySQLConnection`
+        :param query: MySQl query to be executed
+        :type query: str
+        :param result_req: Boolean indicating if the result of the query should be returned
+        :type result_req: bool
+        :param params: Values bound to the %s placeholders of the query, or a list of them when many is set
+        :type params: tuple|list
+        :param many: Boolean indicating if the query is executed once per entry of params
+        :type many: bool
+        :param statements: Prepared statement cache of the connection
+        :type statements: `StatementCache`
+
+        :raise Error: raised if the query execution fails
+
+        :return: Optional return of the result list
+        :rtype: list|None
+        """
+        cursor = None
+        prepared = statements is not None and is_preparable(query, params, many)
+        start = time.perf_counter()
+        try:
+            if prepared:
+                cursor, query = statements.statement(query)
+            else:
+                cursor = connection.cursor()
+            if many:
+                cursor.executemany(query, params)
+            else:
+                cursor.execute(query, params)
             if result_req:
-                return self.get_result(self.cursor)
-        except Error as e:
+                result = self.get_result(cursor)
+                self._observe(query, start, rows=len(result), params=params)
+                return result
+            if prepared and cursor.with_rows:
+                cursor.fetchall()
+            self._observe(query, start, params=params)
+        except DB_ERRORS as e:
+            print(f"Failed to execute query: {query}. Error encountered: {e}")
+            self._observe(query, start, error=True, params=params)
+            if prepared:
+                statements.discard(query)
+            raise
+        finally:
+            if cursor is not None and not prepared:
+                cursor.close()
+
+    def stream_query(self, query, params=None, batch_size=STREAM_BATCH_SIZE):
+        """
+        Generator to execute a Query on an unbuffered cursor and yield result rows a batch at a time, so memory
+        use stays bounded by the batch size rather than the result size. The connection is held until the
+        generator is exhausted or closed; a partially read connection is discarded rather than reused. The recorded
+        query time spans the whole stream, including the time the consumer spends between batches.
+
+        :param query: MySQl query to be executed
+        :type query: str
+        :param params: Values bound to the %s placeholders of the query
+        :type params: tuple
+        :param batch_size: Number of rows fetched from the server per round trip
+        :type batch_size: int
+
+        :raise Error: raised if the query execution fails
+
+        :return: Generator of result rows
+        :rtype: generator
+        """
+        pooled = self.pool.acquire() if self.pool else None
+        connection = None
+        cursor = None
+        exhausted = False
+        count = 0
+        try:
+            connection = pooled.connection if pooled else self._open(self.database)
+            start = time.perf_counter()
+            cursor = connection.cursor(buffered=False)
+            cursor.execute(query, params)
+            headers = [_[0] for _ in cursor.description]
+            rows = cursor.fetchmany(batch_size)
+            while rows:
+                count += len(rows)
+                for row in rows:
+                    yield dict(zip(headers, row))
+                rows = cursor.fetchmany(batch_size)
+            exhausted = True
+            self._observe(query, start, rows=count, params=params)
+        except DB_ERRORS as e:
             print(f"Failed to execute query: {query}. Error encountered: {e}")
+            if connection is not None:
+                self._observe(query, start, error=True, params=params)
             raise
         finally:
-            if getattr(self.cursor, 'close'):
-                self.cursor.close()
-            if getattr(self.connection, 'close'):
-                self.connection.close()
+            if cursor is not None and exhausted:
+                cursor.close()
+            if pooled:
+                self.pool.release(pooled, discard=not exhausted)
+            elif connection is not None:
+                connection.close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Context manager running every query against the database on one connection, committed once on exit
+        and rolled back if the block raises. Nested blocks join the outer transaction.
+
+        :raise Error: raised if the commit or rollback fails
+        """
+        if getattr(self._local, 'connection', None) is not None:
+            yield self
+            return
+        pooled = self.pool.acquire() if self.pool else None
+        discard = False
+        try:
+            connection = pooled.connection if pooled else self._open(self.database)
+        except Exception:
+            if pooled:
+                self.pool.release(pooled, discard=True)
+            raise
+        try:
+            connection.start_transaction()
+            self._local.connection = connection
+            self._local.statements = self.statement_cache(pooled) if pooled else None
+            self._local.dirty = set()
+            try:
+                yield self
+            finally:
+                self._local.connection = None
+                self._local.statements = None
+            connection.commit()
+            if self._local.dirty:
+                self.invalidate(*self._local.dirty)
+        except Exception:
+            try:
+                connection.rollback()
+            except DB_ERRORS as e:
+                print(f"Failed to roll back transaction. Error encountered: {e}")
+                discard = True
+            raise
+        finally:
+            if pooled:
+                self.pool.release(pooled, discard=discard)
+            else:
+                connection.close()
 
     @staticmethod
     def get_result(cursor):
@@ -69,18 +521,20 @@ class DBConnection(object):
             result_data.append(dict(zip(headers, result)))
         return result_data
 
-    def create_database(self):
+    def create_database(self, exists_ok=False):
         """
-        Function to set the database timezone to UTC and create the database
+        Function to create the database, on MySQL setting the database timezone to UTC
+
+        :param exists_ok: Boolean indicating if an existing database is left as it is
+        :type exists_ok: bool
         """
-        self.execute_query("SET time_zone = '+00:00'")
-        self.execute_query(f"CREATE DATABASE {self.database}")
+        self.backend.create_database(self, exists_ok=exists_ok)
 
     def drop_database(self):
         """
         Function to drop a database
         """
-        self.execute_query(f"DROP DATABASE IF EXISTS {self.database}")
+        self.backend.drop_database(self)
 
     def create_table(self, column_values):
         """
@@ -89,7 +543,19 @@ class DBConnection(object):
         :param column_values: String containing the columns to create
         :type column_values: str
         """
-        self.execute_query(f"CREATE TABLE {self.table} ({column_values})", database=self.database)
+        for query in self.backend.table_ddl(self.table, column_values):
+            self.execute_query(query, database=self.database)
+
+    def create_index(self, index_name, columns):
+        """
+        Function to create an index on the table
+
+        :param index_name: Name of the index
+        :type index_name: str
+        :param columns: List of names of the indexed columns, in order
+        :type columns: list
+        """
+        self.execute_query(f"CREATE INDEX {index_name} ON {self.table} ({', '.join(columns)})", database=self.database)
 
     def drop_table(self):
         """
@@ -107,9 +573,26 @@ class DBConnection(object):
         :type values: list
         """
         cs_columns = ", ".join(columns)
-        cs_values = ", ".join([str(value) for value in values])
+        placeholders = ", ".join([f"({', '.join(['%s'] * len(columns))})"] * len(values))
+        params = tuple(value for row in values for value in row)
         self.execute_query(
-            f"INSERT INTO {self.table} ({cs_columns}) VALUES {cs_values}", database=self.database, commit=True)
+            f"INSERT INTO {self.table} ({cs_columns}) VALUES {placeholders}", database=self.database, commit=True,
+            params=params)
+
+    def insert_rows(self, columns, rows):
+        """
+        Function to insert a batch of rows with one parameterized multi-row INSERT
+
+        :param columns: List of names of the column to insert into
+        :type columns: list
+        :param rows: List of value tuples, one per row, in column order
+        :type rows: list
+        """
+        cs_columns = ", ".join(columns)
+        placeholders = ", ".join(["%s"] * len(columns))
+        self.execute_query(
+            f"INSERT INTO {self.table} ({cs_columns}) VALUES ({placeholders})", database=self.database,
+            commit=True, params=rows, many=True)
 
     def update_row(self, values, col_name, row_name):
         """
@@ -122,12 +605,55 @@ class DBConnection(object):
         :param row_name: Value of the supplied column to be matched
         :type row_name: str
         """
-        set_values = []
-        for key, value in values.items():
-            set_values.append(f"{key} = '{value}'")
-        set_str = ", ".join(set_values)
+        set_str = ", ".join([f"{column} = %s" for column in values])
+        self.execute_query(
+            f"UPDATE {self.table} SET {set_str} WHERE {col_name} = %s", database=self.database, commit=True,
+            params=tuple(values.values()) + (row_name,))
+
+    def update_rows_by_key(self, column, key, values, filters=None, constants=None):
+        """
+        Function to set a column to a different value per row in one statement, matching rows on a key column
+
+        :param column: Name of the column to update
+        :type column: str
+        :param key: Name of the column to match
+        :type key: str
+        :param values: Key value, Column value pairs, one per row
+        :type values: dict
+        :param filters: Column, Value pairs the rows must also equal
+        :type filters: dict
+        :param constants: Columns, Values set to the same value on every matched row
+        :type constants: dict
+        """
+        cases = " ".join(["WHEN %s THEN %s"] * len(values))
+        keys = ", ".join(["%s"] * len(values))
+        set_str = "".join(f", {constant} = %s" for constant in (constants or {}))
+        conditions = "".join(f" AND {filter_key} = %s" for filter_key in (filters or {}))
+        params = (tuple(value for pair in values.items() for value in pair) + tuple((constants or {}).values()) +
+                  tuple(values) + tuple((filters or {}).values()))
         self.execute_query(
-            f"UPDATE {self.table} SET {set_str} WHERE {col_name} = '{row_name}'", database=self.database, commit=True)
+            f"UPDATE {self.table} SET {column} = CASE {key} {cases} END{set_str} WHERE {key} IN ({keys}){conditions}",
+            database=self.database, commit=True, params=params)
+
+    def update_rows_by_key_values(self, values, key, key_values, filters=None):
+        """
+        Function to update the rows matching any of many values of a column, in one statement
+
+        :param values: Columns, Values to be updated
+        :type values: dict
+        :param key: Name of the column to match
+        :type key: str
+        :param key_values: Values of the supplied column to be matched
+        :type key_values: list
+        :param filters: Column, Value pairs the rows must also equal
+        :type filters: dict
+        """
+        set_str = ", ".join([f"{column} = %s" for column in values])
+        placeholders = ", ".join(["%s"] * len(key_values))
+        conditions = "".join(f" AND {filter_key} = %s" for filter_key in (filters or {}))
+        self.execute_query(
+            f"UPDATE {self.table} SET {set_str} WHERE {key} IN ({placeholders}){conditions}", database=self.database,
+            commit=True, params=tuple(values.values()) + tuple(key_values) + tuple((filters or {}).values()))
 
     def update_rows_inactive(self, key, value):
         """
@@ -139,7 +665,68 @@ class DBConnection(object):
         :type value: str
         """
         self.execute_query(
-            f"UPDATE {self.table} SET active = 0 WHERE {key} = '{value}'", database=self.database, commit=True)
+            f"UPDATE {self.table} SET active = 0 WHERE {key} = %s", database=self.database, commit=True,
+            params=(value,))
+
+    def update_active_rows(self, values, key, value):
+        """
+        Function to update every still active row matching a column value
+
+        :param values: Columns, Values to be updated
+        :type values: dict
+        :param key: Name of the column to match
+        :type key: str
+        :param value: Value of the supplied column to be matched
+        :type value: str
+        """
+        set_str = ", ".join([f"{column} = %s" for column in values])
+        self.execute_query(
+            f"UPDATE {self.table} SET {set_str} WHERE {key} = %s AND active = 1", database=self.database,
+            commit=True, params=tuple(values.values()) + (value,))
+
+    def update_active_rows_by_parent(self, values, foreign_key, parent_table, parent_key, parent_value):
+        """
+        Function to update every still active row whose parent matches a column value, in one statement
+
+        :param values: Columns, Values to be updated
+        :type values: dict
+        :param foreign_key: Column of this table holding the parent id
+        :type foreign_key: str
+        :param parent_table: Name of the parent table
+        :type parent_table: str
+        :param parent_key: Column of the parent table to match
+        :type parent_key: str
+        :param parent_value: Value of the parent column to be matched
+        :type parent_value: str
+        """
+        set_str = ", ".join([f"{column} = %s" for column in values])
+        self.execute_query(
+            f"UPDATE {self.table} SET {set_str} WHERE active = 1 AND {foreign_key} IN "
+            f"(SELECT id FROM {parent_table} WHERE {parent_key} = %s)", database=self.database,
+            commit=True, params=tuple(values.values()) + (parent_value,))
+
+    def update_parent_if_children_inactive(self, values, child_table, foreign_key, child_key, child_value):
+        """
+        Function to update the active parent of the matching child rows when it has no active children left
+
+        :param values: Columns, Values to be updated on the parent
+        :type values: dict
+        :param child_table: Name of the child table
+        :type child_table: str
+        :param foreign_key: Column of the child table holding the parent id
+        :type foreign_key: str
+        :param child_key: Column of the child table to match
+        :type child_key: str
+        :param child_value: Value of the child column to be matched
+        :type child_value: str
+        """
+        set_str = ", ".join([f"{column} = %s" for column in values])
+        self.execute_query(
+            f"UPDATE {self.table} SET {set_str} WHERE active = 1 AND id IN "
+            f"(SELECT {foreign_key} FROM {child_table} WHERE {child_key} = %s) AND NOT EXISTS "
+            f"(SELECT 1 FROM {child_table} WHERE {child_table}.{foreign_key} = {self.table}.id "
+            f"AND {child_table}.active = 1)", database=self.database,
+            commit=True, params=tuple(values.values()) + (child_value,))
 
     def select_all_from_table(self):
         """
@@ -148,7 +735,43 @@ class DBConnection(object):
         :return: List of all entries of the table
         :rtype: list
         """
-        return self.execute_query(f"SELECT * FROM {self.table}", database=self.database, result_req=True)
+        query = f"SELECT * FROM {read_source(self.table)}"
+        return self.read_through(
+            query, None, lambda: self.execute_query(query, database=self.database, result_req=True))
+
+    def stream_all_from_table(self, batch_size=STREAM_BATCH_SIZE):
+        """
+        Function to lazily select all from a table
+
+        :param batch_size: Number of rows fetched from the server per round trip
+        :type batch_size: int
+
+        :return: Generator of all entries of the table
+        :rtype: generator
+        """
+        return self.stream_query(f"SELECT * FROM {read_source(self.table)}", batch_size=batch_size)
+
+    def select_page(self, columns, order_by, limit, after=None, filters=None):
+        """
+        Function to select one keyset page of a table, ordered by the given columns
+
+        :param columns: List of names of the columns to select
+        :type columns: list
+        :param order_by: List of names of the unique ordering columns the page is keyed on
+        :type order_by: list
+        :param limit: Maximum number of rows to return
+        :type limit: int
+        :param after: Values of the order_by columns of the last row of the previous page
+        :type after: list
+        :param filters: Column, Value pairs the rows must equal
+        :type filters: dict
+
+        :return: List of matched entries
+        :rtype: list
+        """
+        query, params = page_query(self.table, columns, order_by, limit, after=after, filters=filters)
+        return self.read_through(
+            query, params, lambda: self.execute_query(query, database=self.database, result_req=True, params=params))
 
     def select_all_from_table_by_key_value(self, key, value):
         """
@@ -162,8 +785,130 @@ class DBConnection(object):
         :return: List of matched entries
         :rtype: list
         """
-        return self.execute_query(
-            f"SELECT * FROM {self.table} WHERE {key} = '{value}'", database=self.database, result_req=True)
+        query = f"SELECT * FROM {read_source(self.table)} WHERE {key} = %s"
+        params = (value,)
+        return self.read_through(
+            query, params, lambda: self.execute_query(query, database=self.database, result_req=True, params=params))
+
+    def select_by_key_values(self, columns, key, values, filters=None):
+        """
+        Function to select the rows matching any of many values of a column, in one query
+
+        :param columns: List of names of the columns to select
+        :type columns: list
+        :param key: Name of the column to match
+        :type key: str
+        :param values: Values of the supplied column to be matched
+        :type values: list
+        :param filters: Column, Value pairs the rows must also equal
+        :type filters: dict
+
+        :return: List of matched entries
+        :rtype: list
+        """
+        placeholders = ", ".join(["%s"] * len(values))
+        conditions = "".join(f" AND {filter_key} = %s" for filter_key in (filters or {}))
+        query = (f"SELECT {', '.join(columns)} FROM {read_source(self.table)} "
+                 f"WHERE {key} IN ({placeholders}){conditions}")
+        params = tuple(values) + tuple((filters or {}).values())
+        return self.read_through(
+            query, params, lambda: self.execute_query(query, database=self.database, result_req=True, params=params))
+
+    def select_by_parent(self, columns, foreign_key, parent_table, parent_key, parent_value, filters=None):
+        """
+        Function to select the rows whose parent matches a column value, in one query
+
+        :param columns: List of names of the columns to select
+        :type columns: list
+        :param foreign_key: Column of this table holding the parent id
+        :type foreign_key: str
+        :param parent_table: Name of the parent table
+        :type parent_table: str
+        :param parent_key: Column of the parent table to match
+        :type parent_key: str
+        :param parent_value: Value of the parent column to be matched
+        :type parent_value: str
+        :param filters: Column, Value pairs the rows must also equal
+        :type filters: dict
+
+        :return: List of matched entries
+        :rtype: list
+        """
+        conditions = "".join(f" AND {filter_key} = %s" for filter_key in (filters or {}))
+        query = (f"SELECT {', '.join(columns)} FROM {read_source(self.table)} "
+                 f"WHERE {foreign_key} IN (SELECT id FROM {parent_table} WHERE {parent_key} = %s){conditions}")
+        params = (parent_value,) + tuple((filters or {}).values())
+        return self.read_through(
+            query, params, lambda: self.execute_query(query, database=self.database, result_req=True, params=params))
+
+    def ids_by_name(self, names):
+        """
+        Function to resolve the names of rows of the table to their ids, through the name to id cache. Names
+        missing from the cache are read in one query, and cached unless read inside a transaction, whose inserts
+        may still be rolled back.
+
+        :param names: Names of the rows
+        :type names: list
+
+        :return: Name, Id pairs of the rows that exist
+        :rtype: dict
+        """
+        cached = self.name_ids is not None and getattr(self._local, 'connection', None) is None
+        ids = {}
+        missing = []
+        for name in dict.fromkeys(names):
+            hit, row_id = self.name_ids.get((self.table, name)) if self.name_ids is not None else (False, None)
+            if hit:
+                ids[name] = row_id
+            else:
+                missing.append(name)
+        if missing:
+            generation = self.name_ids.generation([self.table]) if cached else None
+            placeholders = ", ".join(["%s"] * len(missing))
+            rows = self.execute_query(f"SELECT name, id FROM {self.table} WHERE name IN ({placeholders})",
+                                      database=self.database, result_req=True, params=tuple(missing))
+            for row in rows:
+                ids[row['name']] = row['id']
+                if cached:
+                    self.name_ids.set((self.table, row['name']), row['id'], [self.table], generation=generation)
+        return ids
+
+    def id_by_name(self, name):
+        """
+        Function to resolve the name of a row of the table to its id, see ids_by_name
+
+        :param name: Name of the row
+        :type name: str
+
+        :return: Id of the row, None if it does not exist
+        :rtype: int|None
+        """
+        return self.ids_by_name([name]).get(name) if name else None
+
+    def select_between(self, columns, key, low, high, filters=None):
+        """
+        Function to select the rows whose column lies in a range, ordered by that column
+
+        :param columns: List of names of the columns to select
+        :type columns: list
+        :param key: Name of the column to range over
+        :type key: str
+        :param low: Lowest value to match, inclusive
+        :type low: object
+        :param high: Highest value to match, inclusive
+        :type high: object
+        :param filters: Column, Value pairs the rows must also equal
+        :type filters: dict
+
+        :return: List of matched entries
+        :rtype: list
+        """
+        conditions = "".join(f"{filter_key} = %s AND " for filter_key in (filters or {}))
+        query = (f"SELECT {', '.join(columns)} FROM {read_source(self.table)} "
+                 f"WHERE {conditions}{key} BETWEEN %s AND %s ORDER BY {key}")
+        params = tuple((filters or {}).values()) + (low, high)
+        # Not cached, range bounds are usually derived from the clock and never repeat
+        return self.execute_query(query, database=self.database, result_req=True, params=params)
 
     def delete_row(self, key, value):
         """
@@ -174,4 +919,23 @@ class DBConnection(object):
         :param value: Value of the supplied column to be matched
         :type value: str
         """
-        self.execute_query(f"DELETE FROM {self.table} WHERE {key} = '{value}'", database=self.database, commit=True)
+        self.execute_query(
+            f"DELETE FROM {self.table} WHERE {key} = %s", database=self.database, commit=True, params=(value,))
+
+    def delete_rows_by_parent(self, foreign_key, parent_table, parent_key, parent_value):
+        """
+        Function to delete every row whose parent matches a column value, in one statement
+
+        :param foreign_key: Column of this table holding the parent id
+        :type foreign_key: str
+        :param parent_table: Name of the parent table
+        :type parent_table: str
+        :param parent_key: Column of the parent table to match
+        :type parent_key: str
+        :param parent_value: Value of the parent column to be matched
+        :type parent_value: str
+        """
+        self.execute_query(
+            f"DELETE FROM {self.table} WHERE {foreign_key} IN "
+            f"(SELECT id FROM {parent_table} WHERE {parent_key} = %s)", database=self.database, commit=True,
+            params=(parent_value,))
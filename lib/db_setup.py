@@ -1,48 +1,144 @@
 from collections import OrderedDict
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
-from .db import DBConnection
+from .db import DBConnection, PARENTS
 
 SPORTS_TABLE = "sports"
-SPORTS_VALUES = "name VARCHAR(32) NOT NULL PRIMARY KEY, slug VARCHAR(32), active BOOLEAN NOT NULL"
+# Rows are keyed and referenced by integer ids, names stay unique and children read their parent name by its id
+SPORTS_VALUES = ("id INT NOT NULL AUTO_INCREMENT PRIMARY KEY, name VARCHAR(32) NOT NULL UNIQUE, slug VARCHAR(32), "
+                 "active BOOLEAN NOT NULL")
 EVENTS_TABLE = "events"
-EVENTS_VALUES = ("name VARCHAR(32) NOT NULL PRIMARY KEY, slug VARCHAR(32), active BOOLEAN NOT NULL, "
-                 "type INT DEFAULT 0, status INT DEFAULT 0, scheduled_start TIMESTAMP, "
-                 "actual_start TIMESTAMP ON UPDATE CURRENT_TIMESTAMP, sport VARCHAR(32), "
-                 "FOREIGN KEY(sport) REFERENCES sports(name)")
+EVENTS_VALUES = ("id INT NOT NULL AUTO_INCREMENT PRIMARY KEY, name VARCHAR(32) NOT NULL UNIQUE, slug VARCHAR(32), "
+                 "active BOOLEAN NOT NULL, type INT DEFAULT 0, status INT DEFAULT 0, scheduled_start TIMESTAMP, "
+                 "actual_start TIMESTAMP ON UPDATE CURRENT_TIMESTAMP, sport_id INT, "
+                 "FOREIGN KEY(sport_id) REFERENCES sports(id)")
 SELECTIONS_TABLE = "selections"
-SELECTIONS_VALUES = ("name VARCHAR(32) NOT NULL PRIMARY KEY, active BOOLEAN NOT NULL, "
-                     "price DECIMAL(10,2) DEFAULT 0.00, outcome INT DEFAULT 0, "
-                     "event VARCHAR(32), FOREIGN KEY(event) REFERENCES events(name)")
+SELECTIONS_VALUES = ("id INT NOT NULL AUTO_INCREMENT PRIMARY KEY, name VARCHAR(32) NOT NULL UNIQUE, "
+                     "active BOOLEAN NOT NULL, price DECIMAL(10,2) DEFAULT 0.00, outcome INT DEFAULT 0, "
+                     "event_id INT, FOREIGN KEY(event_id) REFERENCES events(id)")
+SPORT_ID = "sport_id"
+EVENT_ID = "event_id"
+# Columns rows are read with, the sport of an event and the event of a selection are joined in from their parent
+TABLE_COLUMNS = {
+    SPORTS_TABLE: ['name', 'slug', 'active'],
+    EVENTS_TABLE: ['name', 'slug', 'active', 'type', 'status', 'scheduled_start', 'actual_start', 'sport'],
+    SELECTIONS_TABLE: ['name', 'active', 'price', 'outcome', 'event']}
 SETUP_CMDS = OrderedDict([
     (SPORTS_TABLE, SPORTS_VALUES), (EVENTS_TABLE, EVENTS_VALUES), (SELECTIONS_TABLE, SELECTIONS_VALUES)])
+TABLE_INDEXES = {
+    SPORTS_TABLE: [
+        ('idx_sports_active_name', ['active', 'name'])],
+    EVENTS_TABLE: [
+        ('idx_events_sport_id_active', [SPORT_ID, 'active']),
+        ('idx_events_active_name', ['active', 'name']),
+        ('idx_events_start_name', ['scheduled_start', 'name']),
+        ('idx_events_active_start_name', ['active', 'scheduled_start', 'name']),
+        ('idx_events_status_start', ['status', 'scheduled_start'])],
+    SELECTIONS_TABLE: [
+        ('idx_selections_event_id_active', [EVENT_ID, 'active']),
+        ('idx_selections_active_name', ['active', 'name']),
+        ('idx_selections_outcome', ['outcome'])]}
 
 
-def setup_db(database_name):
+def setup_db(database_name, backend=None):
     """
-    Function to setup the required database, tables and add some test data
+    Function to setup the required database, tables and add some test data, dropping any existing database. The
+    schema is built by the migrations, so the database is recorded as up to date
 
     :param database_name: Name of the DB to be created
     :type database_name: str
+    :param backend: Storage engine, MySQL by default
+    :type backend: `Backend`
     """
-    connection = DBConnection(database_name)
+    # Imported here, the migrations build on the schema of this module
+    from .migrations import MigrationRunner
+    connection = DBConnection(database_name, backend=backend)
     try:
         connection.drop_database()
     except Exception as e:
         print(str(e))
         pass
-    connection.create_database()
-    for key, value in SETUP_CMDS.items():
-        connection.table = key
-        connection.create_table(value)
-        if key == "sports":
-            connection.insert_into_table(['name', 'slug', 'active'], [('Football', 'football', 1)])
-        elif key == "events":
-            scheduled_start = datetime.now(timezone.utc).isoformat()
-            connection.insert_into_table(
-                ['name', 'slug', 'active', 'scheduled_start', 'sport'],
-                [('World Cup 2022', 'world-cup', 1, scheduled_start, 'Football')])
-        else:
-            connection.insert_into_table(
-                ['name', 'active', 'price', 'event'],
-                [('Norway Win', 1, float(f"{10.000:.2f}"), 'World Cup 2022')])
+    MigrationRunner(connection).migrate()
+
+
+def create_tables(connection, tables=None, indexes=None):
+    """
+    Function to create the activity tables and their indexes, parents first
+
+    :param connection: DB connection to the database
+    :type connection: `DBConnection`
+    :param tables: Table, Columns pairs in creation order, SETUP_CMDS by default
+    :type tables: `OrderedDict`
+    :param indexes: Table, Indexes pairs, TABLE_INDEXES by default
+    :type indexes: dict
+    """
+    indexes = TABLE_INDEXES if indexes is None else indexes
+    for key, value in (SETUP_CMDS if tables is None else tables).items():
+        repository = connection.repository(key)
+        repository.create_table(value)
+        for index_name, columns in indexes[key]:
+            repository.create_index(index_name, columns)
+
+
+def with_parent_ids(connection, table, columns, rows):
+    """
+    Function to replace the parent name column of rows by the parent id column, resolving the names through the
+    name to id cache of the parent table
+
+    :param connection: DB connection to the database
+    :type connection: `DBConnection`
+    :param table: Name of the table the rows are inserted into
+    :type table: str
+    :param columns: List of names of the columns of the rows, including the parent name column
+    :type columns: list
+    :param rows: List of value tuples, in column order
+    :type rows: list
+
+    :raises ValueError: raised if a parent does not exist
+
+    :return: Columns and rows with the parent id in place of the parent name
+    :rtype: tuple
+    """
+    if table not in PARENTS:
+        return columns, rows
+    parent_table, name_column, id_column = PARENTS[table]
+    position = columns.index(name_column)
+    ids = connection.repository(parent_table).ids_by_name([row[position] for row in rows])
+    unknown = sorted({str(row[position]) for row in rows if row[position] not in ids})
+    if unknown:
+        raise ValueError(f"Unknown {name_column}: {', '.join(unknown)}")
+    return (columns[:position] + [id_column] + columns[position + 1:],
+            [tuple(row[:position]) + (ids[row[position]],) + tuple(row[position + 1:]) for row in rows])
+
+
+def seed_dataset(database_name, sports=10, events=100, selections=10, chunk_size=1000, backend=None):
+    """
+    Function to bulk load a synthetic sports x events x selections dataset into existing tables
+
+    :param database_name: Name of the DB to load into
+    :type database_name: str
+    :param sports: Number of sports
+    :type sports: int
+    :param events: Number of events per sport
+    :type events: int
+    :param selections: Number of selections per event
+    :type selections: int
+    :param chunk_size: Number of rows per multi-row insert
+    :type chunk_size: int
+    :param backend: Storage engine, MySQL by default
+    :type backend: `Backend`
+    """
+    connection = DBConnection(database_name, backend=backend)
+    start = datetime.now(timezone.utc).replace(microsecond=0)
+    sport_rows = [(f"Sport {sp}", f"sport-{sp}", 1) for sp in range(sports)]
+    event_rows = [
+        (f"Event {sp}-{ev}", f"event-{sp}-{ev}", 1, (start + timedelta(minutes=ev)).isoformat(), f"Sport {sp}")
+        for sp in range(sports) for ev in range(events)]
+    selection_rows = [(f"Sel {sp}-{ev}-{se}", 1, f"{se + 1:.2f}", f"Event {sp}-{ev}")
+                      for sp in range(sports) for ev in range(events) for se in range(selections)]
+    for table, columns, rows in [(SPORTS_TABLE, ['name', 'slug', 'active'], sport_rows),
+                                 (EVENTS_TABLE, ['name', 'slug', 'active', 'scheduled_start', 'sport'], event_rows),
+                                 (SELECTIONS_TABLE, ['name', 'active', 'price', 'event'], selection_rows)]:
+        repository = connection.repository(table)
+        for index in range(0, len(rows), chunk_size):
+            repository.insert_rows(*with_parent_ids(connection, table, columns, rows[index:index + chunk_size]))
@@ -27,3 +27,8 @@ class Outcome(Enum):
     VOID = 1
     LOSE = 2
     WIN = 3
+
+
+EVENT_TYPE_NAMES = {event_type.value: str(event_type) for event_type in EventType}
+STATUS_NAMES = {status.value: str(status) for status in Status}
+OUTCOME_NAMES = {outcome.value: str(outcome) for outcome in Outcome}
@@ -0,0 +1,76 @@
+from .activities import format_fields
+from .db_setup import TABLE_COLUMNS, SPORTS_TABLE, EVENTS_TABLE, SELECTIONS_TABLE
+
+TREE_TABLES = ((SPORTS_TABLE, 't'), (EVENTS_TABLE, 't1'), (SELECTIONS_TABLE, 't2'))
+# Children only store their parent id, their parent name is read from the parent joined before them
+TREE_SOURCES = {(EVENTS_TABLE, 'sport'): 't.name', (SELECTIONS_TABLE, 'event'): 't1.name'}
+TREE_COLUMNS = ", ".join(f"{TREE_SOURCES.get((table, column), f'{alias}.{column}')} AS {alias}_{column}"
+                         for table, alias in TREE_TABLES for column in TABLE_COLUMNS[table])
+TREE_ORDER = "ORDER BY t.name, t1.scheduled_start, t1.name, t2.name"
+
+
+def tree_query(sport=None, event=None, active=False):
+    """
+    Function to build the query reading a sport, event and selection subtree in one statement. Sports without
+    events and events without selections are kept by the outer joins.
+
+    :param sport: Only read this sport
+    :type sport: str
+    :param event: Only read this event, with its sport
+    :type event: str
+    :param active: Boolean indicating if only active sports, events and selections are read
+    :type active: bool
+
+    :return: Query built and its params
+    :rtype: tuple
+    """
+    # Active filters on the children sit in the join conditions, so a parent left without children still shows
+    active_join = " AND {}.active = 1" if active else ""
+    query = (f"SELECT {TREE_COLUMNS} FROM {SPORTS_TABLE} t "
+             f"LEFT JOIN {EVENTS_TABLE} t1 ON t1.sport_id = t.id{active_join.format('t1')} "
+             f"LEFT JOIN {SELECTIONS_TABLE} t2 ON t2.event_id = t1.id{active_join.format('t2')}")
+    filters = []
+    params = ()
+    if active:
+        filters.append("t.active = 1")
+    if sport:
+        filters.append("t.name = %s")
+        params += (sport,)
+    if event:
+        filters.append("t1.name = %s")
+        params += (event,)
+    if filters:
+        query += f" WHERE {' AND '.join(filters)}"
+    return f"{query} {TREE_ORDER}", params
+
+
+def build_tree(rows):
+    """
+    Function to group the rows of the tree query into sports holding their events holding their selections, in
+    one pass over the rows
+
+    :param rows: Rows of the tree query, one per selection or childless parent
+    :type rows: list
+
+    :return: Sports, each with its list of events, each with its list of selections
+    :rtype: list
+    """
+    sports = {}
+    events = {}
+    sport_columns, event_columns, selection_columns = (
+        [(f"{alias}_{column}", column) for column in TABLE_COLUMNS[table]] for table, alias in TREE_TABLES)
+    for row in rows:
+        sport = sports.get(row['t_name'])
+        if sport is None:
+            sport = sports[row['t_name']] = format_fields({column: row[key] for key, column in sport_columns})
+            sport['events'] = []
+        if row['t1_name'] is None:
+            continue
+        event = events.get(row['t1_name'])
+        if event is None:
+            event = events[row['t1_name']] = format_fields({column: row[key] for key, column in event_columns})
+            event['selections'] = []
+            sport['events'].append(event)
+        if row['t2_name'] is not None:
+            event['selections'].append(format_fields({column: row[key] for key, column in selection_columns}))
+    return list(sports.values())
@@ -0,0 +1,271 @@
+import re
+import threading
+import time
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+STATEMENT_TABLE = re.compile(
+    r"^\s*(?:(UPDATE)\s+|(\w+)\b.*?\b(?:FROM|INTO|TABLE)\s+)`?(\w+)", re.IGNORECASE | re.DOTALL)
+STATEMENT = re.compile(r"^\s*(\w+)")
+
+
+def query_labels(query):
+    """
+    Function to label a query by its statement type and the first table it names, keeping the label set small
+    whatever the values bound to it
+
+    :param query: MySQl query
+    :type query: str
+
+    :return: Statement, Table pair, table is empty when the query names none
+    :rtype: tuple
+    """
+    match = STATEMENT_TABLE.match(query)
+    if match:
+        update, statement, table = match.groups()
+        return (update or statement).upper(), table.lower()
+    match = STATEMENT.match(query)
+    return (match.group(1).upper() if match else ''), ''
+
+
+def format_labels(names, values):
+    """
+    Function to format a label set in the Prometheus text format
+
+    :param names: Label names
+    :type names: tuple
+    :param values: Label values, in name order
+    :type values: tuple
+
+    :return: Label set, empty when there are no labels
+    :rtype: str
+    """
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter(object):
+
+    def __init__(self, name, documentation, labels=()):
+        """
+        Monotonic counter per label set
+
+        :param name: Metric name
+        :type name: str
+        :param documentation: Help text
+        :type documentation: str
+        :param labels: Label names
+        :type labels: tuple
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def render(self):
+        """
+        Function to render the counter in the Prometheus text format
+
+        :return: Lines of the metric
+        :rtype: list
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{format_labels(self.labels, label_values)} {format_value(value)}")
+        return lines
+
+
+class Histogram(object):
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        """
+        Cumulative bucket histogram per label set, with the sum and count of the observations
+
+        :param name: Metric name
+        :type name: str
+        :param documentation: Help text
+        :type documentation: str
+        :param labels: Label names
+        :type labels: tuple
+        :param buckets: Sorted upper bounds of the buckets, +Inf is implied
+        :type buckets: tuple
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0, 0]
+            counts = series[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            return series[2] if series else 0
+
+    def render(self):
+        """
+        Function to render the histogram in the Prometheus text format
+
+        :return: Lines of the metric
+        :rtype: list
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        bucket_labels = self.labels + ('le',)
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{format_labels(bucket_labels, label_values + (bound,))} "
+                                 f"{cumulative}")
+                lines.append(f"{self.name}_bucket{format_labels(bucket_labels, label_values + ('+Inf',))} {count}")
+                labels = format_labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Metrics(object):
+
+    def __init__(self, slow_query_threshold=None):
+        """
+        Registry of the DB and HTTP metrics of the app, exported in the Prometheus text format. Queries are
+        counted against the request running on the current thread, so the queries issued per route show up
+        alongside the route latency, and queries slower than the threshold are printed with their params.
+
+        :param slow_query_threshold: Seconds above which a query is logged, None to disable the slow query log
+        :type slow_query_threshold: float
+        """
+        self.slow_query_threshold = slow_query_threshold
+        self.query_duration = Histogram(
+            'db_query_duration_seconds', 'Time spent executing a query and fetching its rows.',
+            ('statement', 'table'))
+        self.query_rows = Histogram(
+            'db_query_rows', 'Rows returned by a query.', ('statement', 'table'), buckets=ROW_BUCKETS)
+        self.query_errors = Counter('db_query_errors_total', 'Queries that raised a DB error.', ('statement', 'table'))
+        self.slow_queries = Counter(
+            'db_slow_queries_total', 'Queries slower than the slow query threshold.', ('statement', 'table'))
+        self.connect_duration = Histogram('db_connect_duration_seconds', 'Time spent opening a DB connection.')
+        self.request_duration = Histogram(
+            'http_request_duration_seconds', 'Time spent handling a request.', ('method', 'route', 'status'))
+        self.request_queries = Histogram(
+            'http_request_queries', 'Queries executed while handling a request.', ('method', 'route'),
+            buckets=QUERY_COUNT_BUCKETS)
+        self._local = threading.local()
+
+    def observe_connect(self, seconds):
+        """
+        Function to record the time taken to open a DB connection
+
+        :param seconds: Connect time
+        :type seconds: float
+        """
+        self.connect_duration.observe(seconds)
+
+    def observe_query(self, query, seconds, rows=None, error=False, params=None):
+        """
+        Function to record one executed query, counting it against the current request and logging it when slow
+
+        :param query: MySQl query executed
+        :type query: str
+        :param seconds: Time spent executing the query and fetching its rows
+        :type seconds: float
+        :param rows: Number of rows returned, None when the query returns none
+        :type rows: int
+        :param error: Boolean indicating if the query raised
+        :type error: bool
+        :param params: Values bound to the query, printed by the slow query log
+        :type params: tuple|list
+        """
+        labels = query_labels(query)
+        self.query_duration.observe(seconds, *labels)
+        if rows is not None:
+            self.query_rows.observe(rows, *labels)
+        if error:
+            self.query_errors.inc(*labels)
+        if getattr(self._local, 'queries', None) is not None:
+            self._local.queries += 1
+        if self.slow_query_threshold is not None and seconds >= self.slow_query_threshold:
+            self.slow_queries.inc(*labels)
+            print(f"Slow query: {seconds * 1e3:.1f}ms, {query}, params: {params}")
+
+    def start_request(self):
+        """
+        Function to start counting the queries of the request handled by the current thread
+        """
+        self._local.queries = 0
+        self._local.start = time.perf_counter()
+
+    def end_request(self, method, route, status):
+        """
+        Function to record the latency and query count of the request handled by the current thread
+
+        :param method: HTTP method
+        :type method: str
+        :param route: Route rule the request matched, not its path, so the label set stays small
+        :type route: str
+        :param status: HTTP status code of the response
+        :type status: int
+
+        :return: Number of queries the request executed, None outside a started request
+        :rtype: int|None
+        """
+        queries = getattr(self._local, 'queries', None)
+        if queries is None:
+            return None
+        self.request_duration.observe(time.perf_counter() - self._local.start, method, route, status)
+        self.request_queries.observe(queries, method, route)
+        self._local.queries = None
+        return queries
+
+    def render(self, gauges=None):
+        """
+        Function to render every metric in the Prometheus text format
+
+        :param gauges: Name, Value pairs of point in time values to export alongside, e.g. pool usage
+        :type gauges: dict
+
+        :return: Exposition text
+        :rtype: str
+        """
+        lines = []
+        for metric in (self.query_duration, self.query_rows, self.query_errors, self.slow_queries,
+                       self.connect_duration, self.request_duration, self.request_queries):
+            lines.extend(metric.render())
+        for name, value in (gauges or {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.extend([f"# TYPE {name} gauge", f"{name} {format_value(value)}"])
+        return '\n'.join(lines) + '\n'
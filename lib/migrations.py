@@ -0,0 +1,330 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from .backends import DB_ERRORS
+from .db_setup import create_tables, PARENTS, SETUP_CMDS, SPORTS_TABLE, EVENTS_TABLE, SELECTIONS_TABLE
+
+SCHEMA_TABLE = 'schema_version'
+SCHEMA_VALUES = "version INT NOT NULL PRIMARY KEY, description VARCHAR(128) NOT NULL, applied_at TIMESTAMP NOT NULL"
+LOCK_NAME = 'schema_migrations'
+LOCK_TIMEOUT = 60
+LOCK_POLL_SECONDS = 0.05
+# Schema created by the first migration, kept as it was so the steps replay the same on a new database
+V1_TABLES = OrderedDict([
+    (SPORTS_TABLE, "name VARCHAR(32) NOT NULL PRIMARY KEY, slug VARCHAR(32), active BOOLEAN NOT NULL"),
+    (EVENTS_TABLE, "name VARCHAR(32) NOT NULL PRIMARY KEY, slug VARCHAR(32), active BOOLEAN NOT NULL, "
+                   "type INT DEFAULT 0, status INT DEFAULT 0, scheduled_start TIMESTAMP, "
+                   "actual_start TIMESTAMP ON UPDATE CURRENT_TIMESTAMP, sport VARCHAR(32), "
+                   "FOREIGN KEY(sport) REFERENCES sports(name)"),
+    (SELECTIONS_TABLE, "name VARCHAR(32) NOT NULL PRIMARY KEY, active BOOLEAN NOT NULL, "
+                       "price DECIMAL(10,2) DEFAULT 0.00, outcome INT DEFAULT 0, "
+                       "event VARCHAR(32), FOREIGN KEY(event) REFERENCES events(name)")])
+V1_INDEXES = {
+    SPORTS_TABLE: [
+        ('idx_sports_active_name', ['active', 'name'])],
+    EVENTS_TABLE: [
+        ('idx_events_sport_active', ['sport', 'active']),
+        ('idx_events_active_name', ['active', 'name']),
+        ('idx_events_start_name', ['scheduled_start', 'name']),
+        ('idx_events_active_start_name', ['active', 'scheduled_start', 'name']),
+        ('idx_events_status_start', ['status', 'scheduled_start'])],
+    SELECTIONS_TABLE: [
+        ('idx_selections_event_active', ['event', 'active']),
+        ('idx_selections_active_name', ['active', 'name']),
+        ('idx_selections_outcome', ['outcome'])]}
+V1_COLUMNS = {
+    SPORTS_TABLE: ['name', 'slug', 'active'],
+    EVENTS_TABLE: ['name', 'slug', 'active', 'type', 'status', 'scheduled_start', 'actual_start', 'sport'],
+    SELECTIONS_TABLE: ['name', 'active', 'price', 'outcome', 'event']}
+# Schema keyed by integer ids created by the third migration, children still holding their parent name
+V3_TABLES = OrderedDict([
+    (SPORTS_TABLE, "id INT NOT NULL AUTO_INCREMENT PRIMARY KEY, name VARCHAR(32) NOT NULL UNIQUE, "
+                   "slug VARCHAR(32), active BOOLEAN NOT NULL"),
+    (EVENTS_TABLE, "id INT NOT NULL AUTO_INCREMENT PRIMARY KEY, name VARCHAR(32) NOT NULL UNIQUE, "
+                   "slug VARCHAR(32), active BOOLEAN NOT NULL, type INT DEFAULT 0, status INT DEFAULT 0, "
+                   "scheduled_start TIMESTAMP, actual_start TIMESTAMP ON UPDATE CURRENT_TIMESTAMP, "
+                   "sport VARCHAR(32), sport_id INT, FOREIGN KEY(sport_id) REFERENCES sports(id)"),
+    (SELECTIONS_TABLE, "id INT NOT NULL AUTO_INCREMENT PRIMARY KEY, name VARCHAR(32) NOT NULL UNIQUE, "
+                       "active BOOLEAN NOT NULL, price DECIMAL(10,2) DEFAULT 0.00, outcome INT DEFAULT 0, "
+                       "event VARCHAR(32), event_id INT, FOREIGN KEY(event_id) REFERENCES events(id)")])
+V3_INDEXES = {
+    SPORTS_TABLE: [
+        ('idx_sports_active_name', ['active', 'name'])],
+    EVENTS_TABLE: [
+        ('idx_events_sport_id_active', ['sport_id', 'active']),
+        ('idx_events_active_name', ['active', 'name']),
+        ('idx_events_start_name', ['scheduled_start', 'name']),
+        ('idx_events_active_start_name', ['active', 'scheduled_start', 'name']),
+        ('idx_events_status_start', ['status', 'scheduled_start'])],
+    SELECTIONS_TABLE: [
+        ('idx_selections_event_id_active', ['event_id', 'active']),
+        ('idx_selections_active_name', ['active', 'name']),
+        ('idx_selections_outcome', ['outcome'])]}
+# Suffix of the copies the activity tables are rebuilt from
+REBUILD_SUFFIX = '_rebuild'
+
+
+def create_v1_tables(db):
+    """
+    Function to create the activity tables keyed by name and their indexes
+
+    :param db: DB connection to the database
+    :type db: `DBConnection`
+    """
+    create_tables(db, V1_TABLES, V1_INDEXES)
+
+
+def insert_v1_sample_data(db):
+    """
+    Function to add a sport with one event and one selection to the tables keyed by name
+
+    :param db: DB connection to the database
+    :type db: `DBConnection`
+    """
+    db.repository(SPORTS_TABLE).insert_into_table(['name', 'slug', 'active'], [('Football', 'football', 1)])
+    db.repository(EVENTS_TABLE).insert_into_table(
+        ['name', 'slug', 'active', 'scheduled_start', 'sport'],
+        [('World Cup 2022', 'world-cup', 1, datetime.now(timezone.utc).isoformat(), 'Football')])
+    db.repository(SELECTIONS_TABLE).insert_into_table(
+        ['name', 'active', 'price', 'event'], [('Norway Win', 1, float(f"{10.000:.2f}"), 'World Cup 2022')])
+
+
+def rebuild_tables(db, create, copy_query):
+    """
+    Function to rebuild the activity tables: rows are copied aside, the tables recreated and the rows copied back.
+    A failed rebuild is resumed from the copies.
+
+    :param db: DB connection to the database
+    :type db: `DBConnection`
+    :param create: Callable creating the new tables on the DB connection
+    :type create: callable
+    :param copy_query: Callable building the query copying the rows of a table back from its copy
+    :type copy_query: callable
+    """
+    tables = db.backend.table_names(db)
+    for table in SETUP_CMDS:
+        if f"{table}{REBUILD_SUFFIX}" not in tables:
+            db.execute_query(f"CREATE TABLE {table}{REBUILD_SUFFIX} AS SELECT * FROM {table}", database=db.database)
+    for table in reversed(SETUP_CMDS):
+        if table in tables:
+            db.repository(table).drop_table()
+    create(db)
+    for table in SETUP_CMDS:
+        db.execute_query(copy_query(table), database=db.database, commit=True)
+    for table in reversed(SETUP_CMDS):
+        db.repository(f"{table}{REBUILD_SUFFIX}").drop_table()
+
+
+def add_surrogate_keys(db):
+    """
+    Function to rebuild the activity tables keyed by integer ids, with the foreign keys on the ids. Each child is
+    joined to its parent by name to set the parent id.
+
+    :param db: DB connection to the database
+    :type db: `DBConnection`
+    """
+    def copy_query(table):
+        columns = ", ".join(V1_COLUMNS[table])
+        copied = ", ".join(f"c.{column}" for column in V1_COLUMNS[table])
+        if table not in PARENTS:
+            return f"INSERT INTO {table} ({columns}) SELECT {copied} FROM {table}{REBUILD_SUFFIX} c ORDER BY c.name"
+        parent_table, name_column, id_column = PARENTS[table]
+        return (f"INSERT INTO {table} ({columns}, {id_column}) SELECT {copied}, p.id FROM {table}{REBUILD_SUFFIX} c "
+                f"LEFT JOIN {parent_table} p ON p.name = c.{name_column} ORDER BY c.name")
+
+    rebuild_tables(db, lambda connection: create_tables(connection, V3_TABLES, V3_INDEXES), copy_query)
+
+
+def drop_parent_names(db):
+    """
+    Function to rebuild the activity tables without the parent name columns of the children, which read their
+    parent name by the parent id instead. Ids are copied as they are.
+
+    :param db: DB connection to the database
+    :type db: `DBConnection`
+    """
+    def copy_query(table):
+        kept = ['id'] + V1_COLUMNS[table]
+        if table in PARENTS:
+            _, name_column, id_column = PARENTS[table]
+            kept = [column for column in kept if column != name_column] + [id_column]
+        copied = ", ".join(f"c.{column}" for column in kept)
+        return (f"INSERT INTO {table} ({', '.join(kept)}) SELECT {copied} FROM {table}{REBUILD_SUFFIX} c "
+                f"ORDER BY c.id")
+
+    rebuild_tables(db, create_tables, copy_query)
+
+
+# Version, Description, Function applying the step to a DB connection, in version order
+MIGRATIONS = [
+    (1, 'Create the activity tables and indexes', create_v1_tables),
+    (2, 'Add sample activities', insert_v1_sample_data),
+    (3, 'Key the activity tables by integer ids', add_surrogate_keys),
+    (4, 'Read parent names by the parent ids', drop_parent_names)]
+# Databases set up before versioning hold the tables and sample data of these steps already
+BASELINE_VERSION = 2
+# Parent columns of the events table, Version, telling apart the schemas of databases without a schema version table
+UNVERSIONED_SCHEMAS = [({'sport'}, BASELINE_VERSION), ({'sport', 'sport_id'}, 3), ({'sport_id'}, 4)]
+
+
+class MigrationRunner(object):
+
+    def __init__(self, db, migrations=None, lock_name=LOCK_NAME, lock_timeout=LOCK_TIMEOUT,
+                 poll_seconds=LOCK_POLL_SECONDS):
+        """
+        Runner bringing the schema up to date by applying only the migration steps the database is missing. The
+        applied steps are recorded in a schema version table, so an up to date database is checked with one
+        query. Steps are applied by one process at a time under a named DB lock, other processes wait for it and
+        find the schema up to date.
+
+        :param db: DB connection to the database to migrate
+        :type db: `DBConnection`
+        :param migrations: Version, Description, Function triples in version order, MIGRATIONS by default
+        :type migrations: list
+        :param lock_name: Name of the DB lock the steps are applied under
+        :type lock_name: str
+        :param lock_timeout: Seconds to wait for the lock before giving up
+        :type lock_timeout: float
+        :param poll_seconds: Seconds between attempts to take the lock
+        :type poll_seconds: float
+        """
+        self.db = db
+        self.migrations = MIGRATIONS if migrations is None else migrations
+        self.lock_name = lock_name
+        self.lock_timeout = lock_timeout
+        self.poll_seconds = poll_seconds
+
+    @property
+    def latest(self):
+        return self.migrations[-1][0] if self.migrations else 0
+
+    def current_version(self):
+        """
+        Function to read the version of the schema
+
+        :return: Highest migration applied, 0 for a database without any, None when the database or its schema
+            version table does not exist
+        :rtype: int|None
+        """
+        try:
+            rows = self.db.execute_query(
+                f"SELECT MAX(version) AS version FROM {SCHEMA_TABLE}", database=self.db.database, result_req=True)
+        except DB_ERRORS:
+            return None
+        return rows[0]['version'] or 0
+
+    def migrate(self):
+        """
+        Function to apply every missing migration, returning at once when the schema is up to date
+
+        :raises RuntimeError: raised if the lock is not taken within the lock timeout
+
+        :return: Versions applied by this call
+        :rtype: list
+        """
+        version = self.current_version()
+        if version is not None and version >= self.latest:
+            return []
+        connection = self.lock()
+        try:
+            return self.apply_missing()
+        finally:
+            self.unlock(connection)
+
+    def apply_missing(self):
+        """
+        Function to create the database and schema version table when missing and apply the missing migrations,
+        recording each as it completes so a failed step is retried from there. Caller must hold the lock.
+
+        :return: Versions applied
+        :rtype: list
+        """
+        self.db.create_database(exists_ok=True)
+        tables = self.db.backend.table_names(self.db)
+        if SCHEMA_TABLE not in tables:
+            self.db.execute_query(f"CREATE TABLE {SCHEMA_TABLE} ({SCHEMA_VALUES})", database=self.db.database)
+            existing = self.unversioned_version(tables)
+            if existing:
+                print(f"Recording existing schema as version {existing}")
+                for number, description, _ in self.migrations:
+                    if number <= existing:
+                        self.record(number, description)
+        version = self.current_version() or 0
+        applied = []
+        for number, description, apply in self.migrations:
+            if number <= version:
+                continue
+            print(f"Applying schema migration {number}: {description}")
+            apply(self.db)
+            self.record(number, description)
+            applied.append(number)
+        return applied
+
+    def unversioned_version(self, tables):
+        """
+        Function to tell the version of a database without a schema version table by the parent columns of its
+        events table
+
+        :param tables: Names of the tables of the database
+        :type tables: list
+
+        :return: Version of the schema, 0 for a database without the activity tables
+        :rtype: int
+        """
+        if EVENTS_TABLE not in tables:
+            return 0
+        columns = set(self.db.backend.column_names(self.db, EVENTS_TABLE)) & {'sport', 'sport_id'}
+        for parent_columns, version in UNVERSIONED_SCHEMAS:
+            if columns == parent_columns:
+                return version
+        return 0
+
+    def record(self, number, description):
+        """
+        Function to record a migration as applied
+
+        :param number: Version of the migration
+        :type number: int
+        :param description: Description of the migration
+        :type description: str
+        """
+        self.db.execute_query(
+            f"INSERT INTO {SCHEMA_TABLE} (version, description, applied_at) VALUES (%s, %s, %s)",
+            database=self.db.database, commit=True,
+            params=(number, description, datetime.now(timezone.utc).replace(tzinfo=None)))
+
+    def lock(self):
+        """
+        Function to take the migration lock on a server connection, waiting for another process to release it
+
+        :raises RuntimeError: raised if the lock is not taken within the lock timeout
+
+        :return: Connection holding the lock
+        :rtype: object
+        """
+        connection = self.db.backend.connect(autocommit=True)
+        deadline = time.monotonic() + self.lock_timeout
+        try:
+            while not self.db.backend.try_lock(connection, self.lock_name):
+                if time.monotonic() >= deadline:
+                    raise RuntimeError(f"Timed out waiting for the {self.lock_name} lock")
+                time.sleep(self.poll_seconds)
+        except Exception:
+            connection.close()
+            raise
+        return connection
+
+    def unlock(self, connection):
+        """
+        Function to release the migration lock and close its connection
+
+        :param connection: Connection holding the lock
+        :type connection: object
+        """
+        try:
+            self.db.backend.release_lock(connection, self.lock_name)
+        except DB_ERRORS as e:
+            print(f"Failed to release the {self.lock_name} lock. Error encountered: {e}")
+        finally:
+            connection.close()
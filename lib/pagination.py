@@ -0,0 +1,159 @@
+import base64
+import binascii
+import json
+
+from .activities import format_fields
+from .db_setup import TABLE_COLUMNS, SPORTS_TABLE, EVENTS_TABLE, SELECTIONS_TABLE
+
+PAGE_ARGS = ('limit', 'after', 'active', 'fields', 'order')
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+KEYSET_ORDERS = {
+    SPORTS_TABLE: {'name': ['name']},
+    EVENTS_TABLE: {'name': ['name'], 'scheduled_start': ['scheduled_start', 'name']},
+    SELECTIONS_TABLE: {'name': ['name']}}
+BOOLEAN_ARGS = {'true': 1, '1': 1, 'false': 0, '0': 0}
+
+
+class InvalidPageRequest(ValueError):
+    pass
+
+
+def is_page_request(args):
+    """
+    Function to check if a request asks for paging, filtering or projection
+
+    :param args: Request query arguments
+    :type args: dict
+
+    :return: Boolean indicating if any paging argument was supplied
+    :rtype: bool
+    """
+    return any(arg in args for arg in PAGE_ARGS)
+
+
+def encode_cursor(row, order_by):
+    """
+    Function to encode the ordering values of a row as an opaque cursor token
+
+    :param row: Last row of a page
+    :type row: dict
+    :param order_by: List of names of the ordering columns
+    :type order_by: list
+
+    :return: URL safe cursor token
+    :rtype: str
+    """
+    values = json.dumps([row[column] for column in order_by], default=str)
+    return base64.urlsafe_b64encode(values.encode()).decode()
+
+
+def decode_cursor(token, order_by):
+    """
+    Function to decode a cursor token back into the ordering values it was built from
+
+    :param token: Cursor token returned as next by a previous page
+    :type token: str
+    :param order_by: List of names of the ordering columns
+    :type order_by: list
+
+    :raises InvalidPageRequest: raised if the token is malformed or was built for another ordering
+
+    :return: Values of the ordering columns
+    :rtype: list
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, binascii.Error):
+        raise InvalidPageRequest(f"Invalid cursor: {token}")
+    if not isinstance(values, list) or len(values) != len(order_by):
+        raise InvalidPageRequest(f"Cursor does not match ordering: {', '.join(order_by)}")
+    return values
+
+
+def parse_page_args(table, args):
+    """
+    Function to validate the paging arguments of a request against a table
+        - limit: int, rows per page up to MAX_LIMIT
+        - after: str, cursor returned as next by the previous page
+        - active: bool, only rows with a matching active flag
+        - fields: str, comma separated columns to return
+        - order: str, keyset ordering, name or for events scheduled_start
+
+    :param table: Name of the table being paged
+    :type table: str
+    :param args: Request query arguments
+    :type args: dict
+
+    :raises InvalidPageRequest: raised if any argument is invalid
+
+    :return: Columns, ordering, limit, cursor values, filters and returned fields of the page
+    :rtype: dict
+    """
+    orders = KEYSET_ORDERS[table]
+    order = args.get('order', 'name')
+    if order not in orders:
+        raise InvalidPageRequest(f"Invalid order: {order}, expected one of {', '.join(orders)}")
+    order_by = orders[order]
+    try:
+        limit = int(args.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise InvalidPageRequest(f"Invalid limit: {args.get('limit')}")
+    if not 0 < limit <= MAX_LIMIT:
+        raise InvalidPageRequest(f"Limit must be between 1 and {MAX_LIMIT}")
+    fields = TABLE_COLUMNS[table]
+    if args.get('fields'):
+        fields = [field.strip() for field in args.get('fields').split(',') if field.strip()]
+        unknown = [field for field in fields if field not in TABLE_COLUMNS[table]]
+        if unknown:
+            raise InvalidPageRequest(f"Unknown fields: {', '.join(unknown)}")
+    filters = {}
+    if 'active' in args:
+        active = args.get('active', '').lower()
+        if active not in BOOLEAN_ARGS:
+            raise InvalidPageRequest(f"Invalid active: {args.get('active')}")
+        filters['active'] = BOOLEAN_ARGS[active]
+    after = decode_cursor(args.get('after'), order_by) if args.get('after') else None
+    columns = fields + [column for column in order_by if column not in fields]
+    return {'columns': columns, 'order_by': order_by, 'limit': limit, 'after': after, 'filters': filters,
+            'fields': fields}
+
+
+def fetch_page(db, args):
+    """
+    Function to fetch one page of the table the connection is set to
+
+    :param db: DB connection set to the table being paged
+    :type db: `DBConnection`
+    :param args: Request query arguments
+    :type args: dict
+
+    :raises InvalidPageRequest: raised if any argument is invalid
+
+    :return: Formatted rows of the page and the cursor of the next page, None on the last page
+    :rtype: tuple
+    """
+    page = parse_page_args(db.table, args)
+    rows = db.select_page(
+        page['columns'], page['order_by'], page['limit'] + 1, after=page['after'], filters=page['filters'])
+    return build_page(page, rows)
+
+
+def build_page(page, rows):
+    """
+    Function to trim the rows fetched for a page, one more than its limit, and format them
+
+    :param page: Parsed paging arguments, as returned by parse_page_args
+    :type page: dict
+    :param rows: Rows selected for the page
+    :type rows: list
+
+    :return: Formatted rows of the page and the cursor of the next page, None on the last page
+    :rtype: tuple
+    """
+    next_cursor = None
+    if len(rows) > page['limit']:
+        rows = rows[:page['limit']]
+        next_cursor = encode_cursor(rows[-1], page['order_by'])
+    fields = page['fields']
+    return [format_fields({field: row[field] for field in fields}) for row in rows], next_cursor
@@ -0,0 +1,184 @@
+import threading
+import time
+from collections import deque
+
+
+class PoolExhaustedError(Exception):
+    pass
+
+
+class PooledConnection(object):
+
+    def __init__(self, connection, overflow=False):
+        self.connection = connection
+        self.overflow = overflow
+        self.last_used = time.monotonic()
+        self.statements = None
+
+
+class ConnectionPool(object):
+
+    def __init__(self, factory, size=5, max_overflow=10, idle_timeout=300, checkout_timeout=30, health_check=True):
+        """
+        Pool of reusable DB connections
+
+        :param factory: Callable returning a new DB connection
+        :type factory: callable
+        :param size: Number of connections kept open when idle
+        :type size: int
+        :param max_overflow: Number of extra connections allowed above size under load, closed on release
+        :type max_overflow: int
+        :param idle_timeout: Seconds an idle connection may be kept before being closed on checkout
+        :type idle_timeout: float
+        :param checkout_timeout: Seconds to wait for a free connection before giving up
+        :type checkout_timeout: float
+        :param health_check: Boolean indicating if idle connections are pinged on checkout
+        :type health_check: bool
+        """
+        self.factory = factory
+        self.size = size
+        self.max_overflow = max_overflow
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check = health_check
+        self._idle = deque()
+        self._total = 0
+        self._lock = threading.Condition()
+        self._stats = {'created': 0, 'reused': 0, 'discarded': 0, 'expired': 0, 'waits': 0, 'timeouts': 0}
+
+    def acquire(self):
+        """
+        Function to check out a connection, reusing an idle one where possible
+
+        :raises PoolExhaustedError: raised if no connection frees up within the checkout timeout
+
+        :return: Checked out connection
+        :rtype: `PooledConnection`
+        """
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            pooled = self._checkout(deadline)
+            if pooled is None:
+                break
+            healthy = not self.health_check or self.is_healthy(pooled)
+            with self._lock:
+                if healthy:
+                    self._stats['reused'] += 1
+                    return pooled
+                self._stats['discarded'] += 1
+                self._close(pooled)
+        try:
+            connection = self.factory()
+        except Exception:
+            with self._lock:
+                self._total -= 1
+                self._lock.notify()
+            raise
+        with self._lock:
+            self._stats['created'] += 1
+            overflow = self._total > self.size
+        return PooledConnection(connection, overflow=overflow)
+
+    def _checkout(self, deadline):
+        """
+        Function to take an idle connection or reserve a slot for a new one, waiting while the pool is full
+
+        :param deadline: Monotonic time after which to give up waiting
+        :type deadline: float
+
+        :raises PoolExhaustedError: raised if no connection frees up before the deadline
+
+        :return: Idle connection, or None if a slot was reserved for a new connection
+        :rtype: `PooledConnection`|None
+        """
+        with self._lock:
+            while True:
+                while self._idle:
+                    pooled = self._idle.pop()
+                    if self.idle_timeout is not None and time.monotonic() - pooled.last_used > self.idle_timeout:
+                        self._stats['expired'] += 1
+                        self._close(pooled)
+                        continue
+                    return pooled
+                if self._total < self.size + self.max_overflow:
+                    self._total += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolExhaustedError(
+                        f"No connection available after {self.checkout_timeout}s "
+                        f"(size={self.size}, max_overflow={self.max_overflow})")
+                self._stats['waits'] += 1
+                self._lock.wait(remaining)
+
+    def release(self, pooled, discard=False):
+        """
+        Function to return a connection to the pool
+
+        :param pooled: Connection previously checked out
+        :type pooled: `PooledConnection`
+        :param discard: Boolean indicating if the connection is broken and must not be reused
+        :type discard: bool
+        """
+        with self._lock:
+            if discard or pooled.overflow or len(self._idle) >= self.size:
+                if discard:
+                    self._stats['discarded'] += 1
+                self._close(pooled)
+            else:
+                pooled.last_used = time.monotonic()
+                self._idle.append(pooled)
+            self._lock.notify()
+
+    def close_all(self):
+        """
+        Function to close every idle connection in the pool
+        """
+        with self._lock:
+            while self._idle:
+                self._close(self._idle.pop())
+            self._lock.notify_all()
+
+    def stats(self):
+        """
+        Function to report the pool usage counters
+
+        :return: Pool configuration and counters
+        :rtype: dict
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'size': self.size, 'max_overflow': self.max_overflow, 'idle': len(self._idle),
+                'in_use': self._total - len(self._idle)})
+        return stats
+
+    def _close(self, pooled):
+        """
+        Function to close a connection and drop it from the pool count, caller must hold the lock
+
+        :param pooled: Connection to be closed
+        :type pooled: `PooledConnection`
+        """
+        self._total -= 1
+        try:
+            pooled.connection.close()
+        except Exception as e:
+            print(f"Failed to close pooled connection. Error encountered: {e}")
+
+    @staticmethod
+    def is_healthy(pooled):
+        """
+        Function to check a connection is still usable
+
+        :param pooled: Connection to be checked
+        :type pooled: `PooledConnection`
+
+        :return: Boolean indicating if the connection responded
+        :rtype: bool
+        """
+        try:
+            return pooled.connection.is_connected()
+        except Exception:
+            return False
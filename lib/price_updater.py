@@ -0,0 +1,97 @@
+from decimal import Decimal, InvalidOperation
+
+CHUNK_SIZE = 500
+NOT_ACTIVE = "Unknown or inactive selection"
+MAX_PRICE = Decimal('99999999.99')
+
+
+def parse_price(price):
+    """
+    Function to validate a price and format it to the 2 decimal places stored, like /create does
+
+    :param price: Price as sent by the client
+    :type price: str|int|float
+
+    :raises ValueError: raised if the price is not a finite number between 0 and the largest DECIMAL(10,2)
+
+    :return: Formatted price
+    :rtype: str
+    """
+    try:
+        value = Decimal(str(price))
+    except InvalidOperation:
+        raise ValueError(f"Invalid price: {price!r}")
+    if isinstance(price, bool) or not value.is_finite() or not 0 <= value <= MAX_PRICE:
+        raise ValueError(f"Invalid price: {price!r}")
+    return "{:.2f}".format(float(value))
+
+
+class PriceUpdater(object):
+
+    def __init__(self, db, chunk_size=CHUNK_SIZE, feed=None):
+        self.db = db
+        self.selections = db.repository('selections')
+        self.events = db.repository('events')
+        self.chunk_size = chunk_size
+        self.feed = feed
+        self.accepted = 0
+        self.errors = []
+
+    def update(self, prices):
+        """
+        Function to set the price of many active selections in one transaction, one UPDATE ... CASE statement
+        per chunk. Rows are written in name order so concurrent batches lock them in the same order. The active
+        selections of each chunk are read first in the same transaction; selections that do not exist or are no
+        longer active are left untouched and reported as errors. With a change feed, the repriced selections
+        and their sport and event are published once the transaction commits.
+
+        :param prices: Selection name, Price pairs
+        :type prices: dict
+
+        :return: Number of prices written and the errors of rejected prices by selection
+        :rtype: dict
+        """
+        valid = {}
+        for name, price in prices.items():
+            try:
+                valid[name] = parse_price(price)
+            except ValueError as e:
+                self.errors.append({'selection': name, 'error': str(e)})
+        names = sorted(valid)
+        if not names:
+            return {'accepted': 0, 'errors': self.errors}
+        changes = []
+        with self.db.transaction():
+            for start in range(0, len(names), self.chunk_size):
+                chunk = names[start:start + self.chunk_size]
+                rows = self.selections.select_by_key_values(['name', 'event'], 'name', chunk, filters={'active': 1})
+                active = {row['name'] for row in rows}
+                self.errors.extend({'selection': name, 'error': NOT_ACTIVE} for name in chunk if name not in active)
+                if not active:
+                    continue
+                chunk = {name: valid[name] for name in chunk if name in active}
+                if self.feed is not None:
+                    changes.extend(self.price_changes(chunk, rows))
+                self.selections.update_rows_by_key('price', 'name', chunk, filters={'active': 1})
+                self.accepted += len(chunk)
+        for change in changes:
+            self.feed.publish('price', 'selection', **change)
+        return {'accepted': self.accepted, 'errors': self.errors}
+
+    def price_changes(self, chunk, rows):
+        """
+        Function to build the change of each active selection of a chunk, with its sport and event
+
+        :param chunk: Selection name, Price pairs of the active selections
+        :type chunk: dict
+        :param rows: Name and event of the active selections
+        :type rows: list
+
+        :return: List of change fields
+        :rtype: list
+        """
+        event_names = sorted({row['event'] for row in rows})
+        sports = {row['name']: row['sport'] for row in
+                  self.events.select_by_key_values(['name', 'sport'], 'name', event_names)} if rows else {}
+        return [{'name': row['name'], 'sport': sports.get(row['event']), 'event': row['event'],
+                 'price': chunk[row['name']]} for row in sorted(rows, key=lambda row: row['name'])]
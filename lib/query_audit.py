@@ -0,0 +1,187 @@
+import argparse
+import sys
+
+from .db import DBConnection
+from .db_setup import (setup_db, seed_dataset, TABLE_COLUMNS, SPORTS_TABLE, EVENTS_TABLE, SELECTIONS_TABLE, EVENT_ID,
+                       SPORT_ID)
+from .hierarchy import tree_query
+from .pagination import KEYSET_ORDERS
+from .search import query_builder
+
+FULL_SCAN = 'ALL'
+SAMPLE_NAME = 'Sample'
+SAMPLE_ID = 1
+SAMPLE_START = '2021-10-15 19:30:39'
+SEARCH_FILTERS = [('^N', ['0']), ('N.*Win', ['0']), ('^N', ['1']), ('^N', ['2']), ('^N', ['0', '1']),
+                  ('^N', ['1', '2']), ('^N', ['0', '1', '2'])]
+TREE_SCOPES = [('tree', {}), ('tree:active', {'active': True}), ('tree:sport', {'sport': SAMPLE_NAME}),
+               ('tree:event', {'event': SAMPLE_NAME, 'active': True})]
+# Unpaged listings and the unscoped tree read the whole table by design and an unanchored regex cannot use an index
+EXPECTED_FULL_SCANS = {'select_all_from_table', 'stream_all_from_table', 'search:0:N.*Win', 'tree', 'tree:active'}
+
+
+class QueryRecorder(DBConnection):
+
+    def __init__(self, database):
+        """
+        DB connection recording the queries its methods build instead of running them
+
+        :param database: Name of the DB the queries are built for
+        :type database: str
+        """
+        super(QueryRecorder, self).__init__(database)
+        self.label = None
+        self.queries = []
+
+    def execute_query(self, query, database=None, result_req=False, commit=False, params=None, many=False):
+        """
+        Function to record a Query in place of executing it
+
+        :return: Empty result
+        :rtype: list
+        """
+        self.queries.append({'label': self.label, 'table': self.table, 'query': query, 'params': params})
+        return []
+
+    def stream_query(self, query, params=None, batch_size=None):
+        """
+        Function to record a streamed Query in place of executing it
+
+        :return: Empty result
+        :rtype: iterator
+        """
+        self.queries.append({'label': self.label, 'table': self.table, 'query': query, 'params': params})
+        return iter(())
+
+    def record(self, label, table, call):
+        """
+        Function to record the queries built by one call
+
+        :param label: Name the recorded queries are reported under
+        :type label: str
+        :param table: Name of the table the call is made against
+        :type table: str
+        :param call: Callable taking this connection and calling the method to record
+        :type call: callable
+        """
+        self.label = label
+        self.table = table
+        call(self)
+
+
+def record_query_templates(database):
+    """
+    Function to build every query the DB layer and search can issue, with sample values
+
+    :param database: Name of the DB the queries are built for
+    :type database: str
+
+    :return: List of recorded queries with their label, table and params
+    :rtype: list
+    """
+    recorder = QueryRecorder(database)
+    for table in (SPORTS_TABLE, EVENTS_TABLE, SELECTIONS_TABLE):
+        recorder.record('select_all_from_table', table, lambda db: db.select_all_from_table())
+        recorder.record('stream_all_from_table', table, lambda db: list(db.stream_all_from_table()))
+        recorder.record('select_by_name', table, lambda db: db.select_all_from_table_by_key_value('name', SAMPLE_NAME))
+        recorder.record('update_row', table, lambda db: db.update_row({'active': 0}, 'name', SAMPLE_NAME))
+        recorder.record('delete_row', table, lambda db: db.delete_row('name', SAMPLE_NAME))
+        recorder.record('select_ids_by_name', table, lambda db: db.ids_by_name([SAMPLE_NAME, f"{SAMPLE_NAME} 2"]))
+        for order, order_by in KEYSET_ORDERS[table].items():
+            after = [SAMPLE_START if column == 'scheduled_start' else SAMPLE_NAME for column in order_by]
+            for filters in ({}, {'active': 1}):
+                label = f"select_page:{order}{':active' if filters else ''}"
+                recorder.record(label, table, lambda db, order_by=order_by, after=after, filters=filters: (
+                    db.select_page(TABLE_COLUMNS[db.table], order_by, 101, after=after, filters=filters)))
+    for table, key, parent, grandparent_key in [(EVENTS_TABLE, SPORT_ID, SPORTS_TABLE, None),
+                                                (SELECTIONS_TABLE, EVENT_ID, EVENTS_TABLE, SPORT_ID)]:
+        recorder.record(f"select_by_{key}", table, lambda db, key=key: db.select_all_from_table_by_key_value(
+            key, SAMPLE_ID))
+        recorder.record(f"update_active_rows_by_{key}", table, lambda db, key=key: db.update_active_rows(
+            {'active': 0}, key, SAMPLE_ID))
+        recorder.record(f"delete_rows_by_{key}", table, lambda db, key=key: db.delete_row(key, SAMPLE_ID))
+        recorder.record(f"update_parent_of_{table}", parent, lambda db, table=table, key=key: (
+            db.update_parent_if_children_inactive({'active': 0}, table, key, 'name', SAMPLE_NAME)))
+        if grandparent_key:
+            recorder.record(f"select_active_by_{grandparent_key}", table, lambda db, key=key: db.select_by_parent(
+                ['name', 'event'], key, EVENTS_TABLE, SPORT_ID, SAMPLE_ID, filters={'active': 1}))
+            recorder.record(f"update_active_rows_by_{grandparent_key}", table, lambda db, key=key: (
+                db.update_active_rows_by_parent({'active': 0}, key, EVENTS_TABLE, SPORT_ID, SAMPLE_ID)))
+            recorder.record(f"delete_rows_by_{grandparent_key}", table, lambda db, key=key: (
+                db.delete_rows_by_parent(key, EVENTS_TABLE, SPORT_ID, SAMPLE_ID)))
+    recorder.record('update_prices', SELECTIONS_TABLE, lambda db: db.update_rows_by_key(
+        'price', 'name', {SAMPLE_NAME: '1.00', f"{SAMPLE_NAME} 2": '2.00'}, filters={'active': 1}))
+    recorder.record('select_active_selections_by_names', SELECTIONS_TABLE, lambda db: db.select_by_key_values(
+        ['name', 'event'], 'name', [SAMPLE_NAME, f"{SAMPLE_NAME} 2"], filters={'active': 1}))
+    recorder.record('select_sports_of_events', EVENTS_TABLE, lambda db: db.select_by_key_values(
+        ['name', 'sport'], 'name', [SAMPLE_NAME, f"{SAMPLE_NAME} 2"]))
+    recorder.record('settle_selections', SELECTIONS_TABLE, lambda db: db.update_rows_by_key(
+        'outcome', 'name', {SAMPLE_NAME: 3, f"{SAMPLE_NAME} 2": 2}, filters={EVENT_ID: SAMPLE_ID},
+        constants={'active': 0}))
+    recorder.record('select_active_selections_by_event', SELECTIONS_TABLE, lambda db: db.select_by_key_values(
+        ['name'], EVENT_ID, [SAMPLE_ID], filters={'active': 1}))
+    recorder.record('select_due_events', EVENTS_TABLE, lambda db: db.select_between(
+        ['name', 'scheduled_start', 'sport'], 'scheduled_start', SAMPLE_START, SAMPLE_START,
+        filters={'status': 0, 'active': 1}))
+    recorder.record('start_due_events', EVENTS_TABLE, lambda db: db.update_rows_by_key_values(
+        {'status': 1, 'type': 1}, 'name', [SAMPLE_NAME, f"{SAMPLE_NAME} 2"], filters={'status': 0}))
+    for regex, filters in SEARCH_FILTERS:
+        query, params = query_builder(regex, filters, '')
+        recorder.record(f"search:{','.join(filters)}:{regex}", None, lambda db, query=query, params=params: (
+            db.execute_query(query, database=db.database, result_req=True, params=params)))
+    for label, scope in TREE_SCOPES:
+        query, params = tree_query(**scope)
+        recorder.record(label, None, lambda db, query=query, params=params: (
+            db.execute_query(query, database=db.database, result_req=True, params=params)))
+    return recorder.queries
+
+
+def audit_queries(db, queries):
+    """
+    Function to EXPLAIN each query and report the base tables it reads with a full table scan
+
+    :param db: DB connection to the database holding the schema under audit
+    :type db: `DBConnection`
+    :param queries: List of recorded queries
+    :type queries: list
+
+    :return: Report per query with the full scans found and whether they are expected
+    :rtype: list
+    """
+    report = []
+    for recorded in queries:
+        plan = db.execute_query(
+            f"EXPLAIN {recorded['query']}", database=db.database, result_req=True, params=recorded['params'])
+        full_scans = [row.get('table') for row in plan
+                      if row.get('type') == FULL_SCAN and not str(row.get('table')).startswith('<')]
+        report.append(dict(recorded, full_scans=full_scans, keys=[row.get('key') for row in plan],
+                           expected=recorded['label'] in EXPECTED_FULL_SCANS))
+    return report
+
+
+def main(argv=None):
+    """
+    Function to audit every query template against a database, failing if any does an unexpected full scan
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--database', default='application')
+    parser.add_argument('--setup', action='store_true', help="drop and recreate the database before the audit")
+    parser.add_argument('--seed', nargs=3, type=int, metavar=('SPORTS', 'EVENTS', 'SELECTIONS'),
+                        help="load a synthetic dataset so the optimizer plans against realistic table sizes")
+    args = parser.parse_args(argv)
+    if args.setup:
+        setup_db(args.database)
+    if args.seed:
+        seed_dataset(args.database, *args.seed)
+    report = audit_queries(DBConnection(args.database), record_query_templates(args.database))
+    failures = [entry for entry in report if entry['full_scans'] and not entry['expected']]
+    for entry in report:
+        status = 'FAIL' if entry in failures else 'ok'
+        print(f"{status:4} {entry['label']:40} {entry['table'] or '-':10} scans={entry['full_scans']} "
+              f"keys={entry['keys']}")
+    print(f"{len(report)} queries audited, {len(failures)} with unexpected full table scans")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
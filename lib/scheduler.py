@@ -0,0 +1,281 @@
+import heapq
+import threading
+from datetime import datetime, timedelta, timezone
+
+from .backends import DB_ERRORS
+from .enums import EventType, Status
+
+LOCK_NAME = 'event_scheduler'
+BATCH_SIZE = 500
+REFRESH_SECONDS = 30
+HORIZON = timedelta(minutes=5)
+CATCH_UP = timedelta(hours=1)
+
+
+def utc_now():
+    """
+    Function to read the current UTC time as the naive datetime the DB stores timestamps as
+
+    :return: Current UTC time
+    :rtype: `datetime`
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class EventScheduler(object):
+
+    def __init__(self, db, feed=None, batch_size=BATCH_SIZE, refresh_seconds=REFRESH_SECONDS, horizon=HORIZON,
+                 catch_up=CATCH_UP, lock_name=LOCK_NAME, clock=utc_now):
+        """
+        In process scheduler starting pending events when their scheduled start passes. Events due within the
+        horizon are kept in a heap keyed by scheduled start and started in batched updates. The heap is refreshed
+        from the DB every refresh interval, so events created by other processes are picked up, and events
+        created or deleted by this process are added or dropped at once. When several processes run a
+        scheduler, only the one holding a named DB lock starts events; the lock is freed with its connection so
+        another process takes over if the leader dies.
+
+        :param db: DB connection
+        :type db: `DBConnection`
+        :param feed: Change feed the starts are published to
+        :type feed: `ChangeFeed`
+        :param batch_size: Maximum number of events started per statement
+        :type batch_size: int
+        :param refresh_seconds: Seconds between reloads of the due events from the DB
+        :type refresh_seconds: float
+        :param horizon: How far ahead of now events are loaded into the heap
+        :type horizon: `timedelta`
+        :param catch_up: How long past their scheduled start pending events are still started, older ones are
+            left to be started or cancelled by hand
+        :type catch_up: `timedelta`
+        :param lock_name: Name of the DB lock electing the leader
+        :type lock_name: str
+        :param clock: Callable returning the current naive UTC time
+        :type clock: callable
+        """
+        self.db = db
+        self.events = db.repository('events')
+        self.feed = feed
+        self.batch_size = batch_size
+        self.refresh_seconds = refresh_seconds
+        self.horizon = horizon
+        self.catch_up = catch_up
+        self.lock_name = lock_name
+        self.clock = clock
+        self.started = 0
+        self._heap = []
+        self._due = {}
+        self._leader = None
+        self._next_refresh = None
+        self._condition = threading.Condition()
+        self._woken = False
+        self._stopping = False
+        self._thread = None
+
+    @property
+    def is_leader(self):
+        return self._leader is not None
+
+    def schedule(self, name, scheduled_start, sport=None):
+        """
+        Function to add or move a pending event, ignored when it is due beyond the horizon, overdue beyond the
+        catch up window or when this process does not lead, as the leader loads its events on election
+
+        :param name: Name of the event
+        :type name: str
+        :param scheduled_start: Naive UTC scheduled start
+        :type scheduled_start: `datetime`
+        :param sport: Name of the sport of the event
+        :type sport: str
+        """
+        now = self.clock()
+        if (not self.is_leader or scheduled_start is None or scheduled_start > now + self.horizon or
+                scheduled_start < now - self.catch_up):
+            return
+        with self._condition:
+            self._due[name] = (scheduled_start, sport)
+            heapq.heappush(self._heap, (scheduled_start, name))
+            self._woken = True
+            self._condition.notify()
+
+    def cancel(self, name):
+        """
+        Function to drop an event, its heap entry is discarded when it comes due
+
+        :param name: Name of the event
+        :type name: str
+        """
+        with self._condition:
+            self._due.pop(name, None)
+
+    def track(self, *names):
+        """
+        Function to schedule events from their stored rows, e.g. after they were created, in one read. Only the
+        leader reads them, other processes would ignore them.
+
+        :param names: Names of the events
+        :type names: str
+        """
+        if not self.is_leader or not names:
+            return
+        for row in self.events.select_by_key_values(['name', 'scheduled_start', 'sport'], 'name', list(names),
+                                                    filters={'status': Status.PENDING.value, 'active': 1}):
+            self.schedule(row['name'], row['scheduled_start'], row['sport'])
+
+    def refresh(self):
+        """
+        Function to reload the pending events due between the catch up window and the horizon, replacing the heap
+        """
+        now = self.clock()
+        rows = self.events.select_between(
+            ['name', 'scheduled_start', 'sport'], 'scheduled_start', now - self.catch_up, now + self.horizon,
+            filters={'status': Status.PENDING.value, 'active': 1})
+        with self._condition:
+            self._due = {row['name']: (row['scheduled_start'], row['sport']) for row in rows}
+            self._heap = [(start, name) for name, (start, _) in self._due.items()]
+            heapq.heapify(self._heap)
+
+    def pop_due(self, now):
+        """
+        Function to pop the next batch of events whose scheduled start has passed
+
+        :param now: Naive UTC time
+        :type now: `datetime`
+
+        :return: Event name, Sport name pairs
+        :rtype: dict
+        """
+        batch = {}
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now and len(batch) < self.batch_size:
+                start, name = heapq.heappop(self._heap)
+                entry = self._due.get(name)
+                if entry is not None and entry[0] == start:
+                    batch[name] = self._due.pop(name)[1]
+        return batch
+
+    def start_due(self):
+        """
+        Function to start every due event, one UPDATE per batch. Only events still pending are started, so events
+        started, ended or cancelled by hand in the meantime are left as they are.
+
+        :return: Number of events started
+        :rtype: int
+        """
+        started = 0
+        batch = self.pop_due(self.clock())
+        while batch:
+            names = sorted(batch)
+            with self.db.transaction():
+                pending = [row['name'] for row in self.events.select_by_key_values(
+                    ['name'], 'name', names, filters={'status': Status.PENDING.value, 'active': 1})]
+                if pending:
+                    self.events.update_rows_by_key_values(
+                        {'status': Status.STARTED.value, 'type': EventType.INPLAY.value}, 'name', pending,
+                        filters={'status': Status.PENDING.value})
+            if self.feed is not None:
+                for name in sorted(pending):
+                    self.feed.publish(
+                        'start', 'event', name, sport=batch[name], event=name, status=Status.STARTED.value)
+            started += len(pending)
+            batch = self.pop_due(self.clock())
+        self.started += started
+        return started
+
+    def lead(self):
+        """
+        Function to keep or take the leader lock, on a connection held for as long as this process leads
+
+        :return: Boolean indicating if this process leads
+        :rtype: bool
+        """
+        if self._leader is not None:
+            if self._leader.is_connected():
+                return True
+            print("Event scheduler lost its leader connection")
+            self.resign()
+        connection = None
+        try:
+            connection = self.db.backend.connect(self.db.database, autocommit=True)
+            if self.db.backend.try_lock(connection, self.lock_name):
+                self._leader = connection
+                return True
+        except DB_ERRORS as e:
+            print(f"Event scheduler failed to take the leader lock. Error encountered: {e}")
+        if connection is not None:
+            connection.close()
+        return False
+
+    def resign(self):
+        """
+        Function to release the leader lock and its connection
+        """
+        leader, self._leader = self._leader, None
+        if leader is None:
+            return
+        try:
+            self.db.backend.release_lock(leader, self.lock_name)
+            leader.close()
+        except DB_ERRORS as e:
+            print(f"Event scheduler failed to release the leader lock. Error encountered: {e}")
+
+    def run_once(self):
+        """
+        Function to run one scheduling round: take or keep the lead, reload the heap when just elected or when the
+        refresh is due, and start due events. A process that does not lead holds no events.
+
+        :return: Seconds to sleep before the next round
+        :rtype: float
+        """
+        was_leader = self.is_leader
+        if not self.lead():
+            with self._condition:
+                self._heap = []
+                self._due = {}
+            return self.refresh_seconds
+        if not was_leader or self._next_refresh is None or self.clock() >= self._next_refresh:
+            self.refresh()
+            self._next_refresh = self.clock() + timedelta(seconds=self.refresh_seconds)
+        self.start_due()
+        with self._condition:
+            next_due = self._heap[0][0] if self._heap else self._next_refresh
+        return max(0.0, (min(next_due, self._next_refresh) - self.clock()).total_seconds())
+
+    def run(self):
+        """
+        Function to run scheduling rounds until stopped, woken early when an event is scheduled
+        """
+        while True:
+            try:
+                delay = self.run_once()
+            except Exception as e:
+                print(f"Event scheduler round failed. Error encountered: {e}")
+                delay = self.refresh_seconds
+            with self._condition:
+                if not self._woken and not self._stopping:
+                    self._condition.wait(delay)
+                self._woken = False
+                if self._stopping:
+                    break
+        self.resign()
+
+    def start(self):
+        """
+        Function to run the scheduler on a daemon thread
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name='event-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Function to stop the scheduler thread and release the leader lock
+
+        :param timeout: Seconds to wait for the thread to exit
+        :type timeout: float
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,108 @@
+import re
+from datetime import datetime, timedelta
+
+from .enums import Outcome
+
+SEARCH_LIMIT = 100
+MAX_SEARCH_LIMIT = 1000
+BASE_QUERY = ("SELECT t.name AS sport, t1.name AS event, t2.name AS selection FROM sports t "
+              "JOIN events t1 ON t1.sport_id = t.id JOIN selections t2 ON t2.event_id = t1.id WHERE")
+NAME_COLUMNS = ['t.name', 't1.name', 't2.name']
+# Orders the whole result, union branches included, so a limited search returns the same rows every time
+SEARCH_ORDER = "ORDER BY sport, event, selection"
+REGEX_FILTER = 0
+RECENT_FILTER = 1
+WINNERS_FILTER = 2
+LITERAL_PREFIX = re.compile(r"^\^([^.^$*+?()\[\]{}|\\]+)$")
+# Explicit escape character, as the default LIKE escape is a backslash on MySQL and none on SQLite
+LIKE_ESCAPE = '!'
+
+
+def name_filter(regex):
+    """
+    Function to build the name match filter. An anchored literal prefix is matched with one LIKE prefix branch
+    per name column, each driven by the name index of its own table and leaving out the rows of earlier
+    branches, so the branches are combined with UNION ALL. Other patterns are one REGEXP filter over every name.
+
+    :param regex: Regex pattern string
+    :type regex: str
+
+    :return: Filter SQL and params of each branch
+    :rtype: list
+    """
+    prefix = LITERAL_PREFIX.match(regex)
+    if not prefix:
+        sql = " OR ".join([f"({column} REGEXP %s)" for column in NAME_COLUMNS])
+        return [(f"({sql})", (regex,) * len(NAME_COLUMNS))]
+    pattern = re.sub(r"([!%_])", LIKE_ESCAPE + r"\1", prefix.group(1)) + '%'
+    operator = f"LIKE %s ESCAPE '{LIKE_ESCAPE}'"
+    branches = []
+    for index, column in enumerate(NAME_COLUMNS):
+        excluded = [f"{earlier} NOT {operator}" for earlier in NAME_COLUMNS[:index]]
+        branches.append((" AND ".join([f"{column} {operator}"] + excluded), (pattern,) * (index + 1)))
+    return branches
+
+
+def recent_filter():
+    """
+    Function to build the filter for events scheduled to start within the last 24 hours or later
+
+    :return: Filter SQL and its params
+    :rtype: tuple
+    """
+    return "t1.scheduled_start >= %s", (datetime.utcnow() - timedelta(hours=24),)
+
+
+def winners_filter():
+    """
+    Function to build the filter for winning selections
+
+    :return: Filter SQL and its params
+    :rtype: tuple
+    """
+    return "t2.outcome = %s", (Outcome.WIN.value,)
+
+
+def query_builder(regex, filters, expression, limit=SEARCH_LIMIT):
+    """
+    Function to build the search query, joining sports to their events and selections, ordered by name
+
+    :param regex: Regex pattern string
+    :type regex: str
+    :param filters: List of filters to be selected
+    :type filters: list
+    :param expression: MySQL expression to query
+    :type expression: str
+    :param limit: Maximum number of results, capped at MAX_SEARCH_LIMIT
+    :type limit: int
+
+    :raises RuntimeError: raised is the search criteria produces None
+    :return: Query built and its params
+    :rtype: tuple
+    """
+    selected_filters = []
+    params = ()
+    branches = [("", ())]
+    if expression:
+        selected_filters = [f"({expression.replace('%', '%%')})"]
+    for _ in [int(_) for _ in filters]:
+        if _ == REGEX_FILTER:
+            branches = name_filter(regex)
+            continue
+        elif _ == RECENT_FILTER:
+            sql, filter_params = recent_filter()
+        elif _ == WINNERS_FILTER:
+            sql, filter_params = winners_filter()
+        else:
+            continue
+        selected_filters.append(sql)
+        params += filter_params
+    if not selected_filters and not branches[0][0]:
+        raise RuntimeError("No matching search criteria found.")
+    limit = max(1, min(int(limit), MAX_SEARCH_LIMIT))
+    queries = []
+    query_params = ()
+    for sql, branch_params in branches:
+        queries.append(f"{BASE_QUERY} {' AND '.join(([sql] if sql else []) + selected_filters)}")
+        query_params += branch_params + params
+    return f"{' UNION ALL '.join(queries)} {SEARCH_ORDER} LIMIT %s", query_params + (limit,)
@@ -0,0 +1,204 @@
+import json
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache
+from json.encoder import encode_basestring_ascii
+
+from werkzeug.http import http_date
+
+from .db_setup import TABLE_COLUMNS
+from .enums import STATUS_NAMES, OUTCOME_NAMES, EVENT_TYPE_NAMES
+
+STREAM_CHUNK_ROWS = 100
+
+
+def json_default(obj):
+    """
+    Function to encode the non JSON types returned by the DB the same way as Flask's jsonify
+
+    :param obj: Value json cannot encode natively
+    :type obj: object
+
+    :raises TypeError: raised if the value type is not supported
+
+    :return: JSON encodable value
+    :rtype: str
+    """
+    if isinstance(obj, date):
+        return http_date(obj)
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """
+    Function to encode a value to compact, key sorted JSON matching Flask's jsonify
+
+    :param obj: Value to encode
+    :type obj: object
+
+    :return: JSON text
+    :rtype: str
+    """
+    return json.dumps(obj, default=json_default, separators=(',', ':'), sort_keys=True)
+
+
+def encode_value(value):
+    """
+    Function to encode a single DB value to JSON, with fast paths for the common column types
+
+    :param value: Column value
+    :type value: object
+
+    :return: JSON text
+    :rtype: str
+    """
+    if value is None:
+        return 'null'
+    if isinstance(value, str):
+        return encode_basestring_ascii(value)
+    if value is True or value is False:
+        return 'true' if value else 'false'
+    if isinstance(value, int):
+        return int.__repr__(value)
+    if isinstance(value, date):
+        return encode_date(value)
+    if isinstance(value, Decimal):
+        return '"' + str(value) + '"'
+    return dumps(value)
+
+
+@lru_cache(maxsize=4096)
+def encode_date(value):
+    """
+    Function to encode a date or datetime as a JSON HTTP date string, memoized as start times repeat across rows
+
+    :param value: Date value
+    :type value: `datetime.date`
+
+    :return: JSON text
+    :rtype: str
+    """
+    return encode_basestring_ascii(http_date(value))
+
+
+def _encoded_names(names):
+    """
+    Function to pre-encode an enum value to name table as JSON strings
+
+    :param names: Enum value, name pairs
+    :type names: dict
+
+    :return: Enum value, JSON string pairs
+    :rtype: dict
+    """
+    return {value: encode_basestring_ascii(name) for value, name in names.items()}
+
+
+COLUMN_ENCODERS = {
+    'active': lambda value: 'true' if value == 1 else 'false',
+    'status': _encoded_names(STATUS_NAMES).__getitem__,
+    'type': _encoded_names(EVENT_TYPE_NAMES).__getitem__,
+    'outcome': _encoded_names(OUTCOME_NAMES).__getitem__}
+
+
+class RowEncoder(object):
+    __slots__ = ('fields',)
+
+    def __init__(self, columns):
+        """
+        Encoder turning DB rows straight into the JSON the activity models serialize to, without building
+        the model or an intermediate dict
+
+        :param columns: List of names of the columns to encode
+        :type columns: list
+        """
+        self.fields = [(encode_basestring_ascii(column) + ':', COLUMN_ENCODERS.get(column, encode_value), column)
+                       for column in sorted(columns)]
+
+    def encode(self, row):
+        """
+        Function to encode one row
+
+        :param row: Column, Value pairs of a table row
+        :type row: dict
+
+        :return: JSON object text
+        :rtype: str
+        """
+        return '{' + ','.join([key + encode(row.get(column)) for key, encode, column in self.fields]) + '}'
+
+
+ROW_ENCODERS = {table: RowEncoder(columns) for table, columns in TABLE_COLUMNS.items()}
+
+
+def encode_json_object(key, rows, encode=dumps):
+    """
+    Function to encode {key: [rows]} in one pass
+
+    :param key: Key of the list in the response object
+    :type key: str
+    :param rows: Iterable of rows
+    :type rows: iterable
+    :param encode: Callable encoding one row to JSON text
+    :type encode: callable
+
+    :return: JSON text
+    :rtype: str
+    """
+    return '{' + dumps(key) + ':[' + ','.join([encode(row) for row in rows]) + ']}'
+
+
+def iter_json_object(key, items, chunk_rows=STREAM_CHUNK_ROWS, encode=dumps):
+    """
+    Function to incrementally encode {key: [items]} so only a chunk of rows is held in memory at a time
+
+    :param key: Key of the list in the response object
+    :type key: str
+    :param items: Iterable of JSON encodable items
+    :type items: iterable
+    :param chunk_rows: Number of items encoded per yielded chunk
+    :type chunk_rows: int
+    :param encode: Callable encoding one item to JSON text
+    :type encode: callable
+
+    :return: Generator of JSON text fragments
+    :rtype: generator
+    """
+    yield '{' + dumps(key) + ':['
+    chunk = []
+    separator = ''
+    for item in items:
+        chunk.append(encode(item))
+        if len(chunk) >= chunk_rows:
+            yield separator + ','.join(chunk)
+            separator = ','
+            chunk = []
+    if chunk:
+        yield separator + ','.join(chunk)
+    yield ']}'
+
+
+def iter_ndjson(items, chunk_rows=STREAM_CHUNK_ROWS, encode=dumps):
+    """
+    Function to incrementally encode items as newline delimited JSON
+
+    :param items: Iterable of JSON encodable items
+    :type items: iterable
+    :param chunk_rows: Number of items encoded per yielded chunk
+    :type chunk_rows: int
+    :param encode: Callable encoding one item to JSON text
+    :type encode: callable
+
+    :return: Generator of NDJSON text fragments
+    :rtype: generator
+    """
+    chunk = []
+    for item in items:
+        chunk.append(encode(item) + '\n')
+        if len(chunk) >= chunk_rows:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
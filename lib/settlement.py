@@ -0,0 +1,130 @@
+import time
+
+from .db_setup import EVENT_ID, SPORT_ID
+from .enums import Outcome, Status
+
+CHUNK_SIZE = 500
+
+
+def parse_outcome(outcome):
+    """
+    Function to validate a settlement outcome given by value or name, e.g. 3 or "WIN"
+
+    :param outcome: Outcome as sent by the client
+    :type outcome: int|str
+
+    :raises ValueError: raised if the outcome is unknown or unsettled
+
+    :return: Outcome value
+    :rtype: int
+    """
+    try:
+        value = Outcome[outcome.upper()] if isinstance(outcome, str) else Outcome(outcome)
+    except (KeyError, ValueError):
+        raise ValueError(f"Invalid outcome: {outcome!r}")
+    if value is Outcome.UNSETTLED or isinstance(outcome, bool):
+        raise ValueError(f"Invalid outcome: {outcome!r}")
+    return value.value
+
+
+class Settlement(object):
+
+    def __init__(self, db, chunk_size=CHUNK_SIZE):
+        self.db = db
+        self.sports = db.repository('sports')
+        self.events = db.repository('events')
+        self.selections = db.repository('selections')
+        self.chunk_size = chunk_size
+        self.timings = {}
+
+    def settle(self, event_name, outcomes, status=Status.ENDED.value):
+        """
+        Function to settle many selections of an event in one transaction: every outcome is written with one
+        UPDATE ... CASE per chunk, then the event is closed once none of its selections is active and the sport
+        once none of its events is. Each phase is timed.
+
+        :param event_name: Name of the event
+        :type event_name: str
+        :param outcomes: Selection name, Outcome pairs, outcomes by value or name
+        :type outcomes: dict
+        :param status: Status the event is closed with
+        :type status: int
+
+        :raises ValueError: raised if the event is unknown, an outcome or the status is invalid or a selection is
+            not one of the event's active selections
+
+        :return: Number of selections settled, active selections left, the sport, the outcome values, the event
+            and sport closed by the roll-up as changes and phase timings in ms
+        :rtype: dict
+        """
+        start = time.perf_counter()
+        values = {name: parse_outcome(outcome) for name, outcome in outcomes.items()}
+        if not values:
+            raise ValueError("No outcomes to settle")
+        status = Status(status).value
+        phase = self.lap('validate', start)
+        with self.db.transaction():
+            event = self.events.select_all_from_table_by_key_value('name', event_name)
+            if not event:
+                raise ValueError(f"Unknown event: {event_name}")
+            event_id = event[0]['id']
+            sport_name = event[0]['sport']
+            sport_active = self.is_active(self.sports, sport_name)
+            active = {row['name'] for row in self.selections.select_by_key_values(
+                ['name'], EVENT_ID, [event_id], filters={'active': 1})}
+            unknown = sorted(set(values) - active)
+            if unknown:
+                raise ValueError(f"Not active selections of {event_name}: {', '.join(unknown)}")
+            phase = self.lap('read', phase)
+            names = sorted(values)
+            for index in range(0, len(names), self.chunk_size):
+                chunk = {name: values[name] for name in names[index:index + self.chunk_size]}
+                self.selections.update_rows_by_key('outcome', 'name', chunk, filters={EVENT_ID: event_id},
+                                                   constants={'active': 0})
+            phase = self.lap('selections', phase)
+            self.events.update_parent_if_children_inactive(
+                {'active': 0, 'status': status}, 'selections', EVENT_ID, EVENT_ID, event_id)
+            self.sports.update_parent_if_children_inactive({'active': 0}, 'events', SPORT_ID, 'id', event_id)
+            changes = []
+            if event[0]['active'] and not self.is_active(self.events, event_name):
+                changes.append({'activity': 'event', 'name': event_name, 'sport': sport_name, 'event': event_name,
+                                'status': status})
+            if sport_active and not self.is_active(self.sports, sport_name):
+                changes.append({'activity': 'sport', 'name': sport_name, 'sport': sport_name, 'event': None})
+            phase = self.lap('rollup', phase)
+        self.lap('commit', phase)
+        self.timings['total'] = round((time.perf_counter() - start) * 1e3, 3)
+        return {'settled': len(values), 'active': len(active) - len(values), 'sport': sport_name,
+                'outcomes': values, 'changes': changes, 'timings_ms': self.timings}
+
+    @staticmethod
+    def is_active(repository, name):
+        """
+        Function to read whether an activity is active
+
+        :param repository: DB connection bound to the activity table
+        :type repository: `DBConnection`
+        :param name: Name of the activity
+        :type name: str
+
+        :return: Boolean indicating the activity exists and is active
+        :rtype: bool
+        """
+        rows = repository.select_by_key_values(['active'], 'name', [name])
+        return bool(rows and rows[0]['active'])
+
+    def lap(self, phase, since):
+        """
+        Function to record the time a phase took
+
+        :param phase: Name of the phase
+        :type phase: str
+        :param since: perf_counter value the phase started at
+        :type since: float
+
+        :return: perf_counter value the next phase starts at
+        :rtype: float
+        """
+        now = time.perf_counter()
+        self.timings[phase] = round((now - since) * 1e3, 3)
+        return now
@@ -0,0 +1,98 @@
+from collections import OrderedDict
+
+STATEMENT_CACHE_SIZE = 128
+PREPARABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+def is_preparable(query, params, many):
+    """
+    Function to check if a Query can run as a server side prepared statement: a single parameterized DML statement
+
+    :param query: MySQl query to be executed
+    :type query: str
+    :param params: Values bound to the %s placeholders of the query
+    :type params: tuple
+    :param many: Boolean indicating if the query is executed once per entry of params
+    :type many: bool
+
+    :return: Boolean indicating if the query can be prepared
+    :rtype: bool
+    """
+    return params is not None and not many and query.lstrip()[:7].upper().startswith(PREPARABLE)
+
+
+class StatementCache(object):
+
+    def __init__(self, connection, max_size=STATEMENT_CACHE_SIZE):
+        """
+        Least recently used cache of the server side prepared statements of one connection, keyed by statement
+        template. Each statement keeps its own prepared cursor, so executing a cached template skips the prepare
+        round trip and the server side parse. Like its connection it must only be used by one thread at a time.
+
+        :param connection: Open DB connection the statements are prepared on
+        :type connection: `CMySQLConnection`
+        :param max_size: Maximum number of statements kept prepared, the least recently used is closed above it
+        :type max_size: int
+        """
+        self.connection = connection
+        self.max_size = max_size
+        self._statements = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def statement(self, query):
+        """
+        Function to return the prepared cursor of a statement template, preparing it on first use
+
+        :param query: Parameterized MySQl query
+        :type query: str
+
+        :return: Prepared cursor and the query text it was prepared from, which must be passed to execute as is
+        :rtype: tuple
+        """
+        entry = self._statements.get(query)
+        if entry is not None:
+            self._statements.move_to_end(query)
+            self.stats['hits'] += 1
+            return entry
+        self.stats['misses'] += 1
+        # The cursor re-prepares unless it is handed the very string object it last executed
+        entry = (self.connection.cursor(prepared=True), query)
+        self._statements[query] = entry
+        while len(self._statements) > self.max_size:
+            self.stats['evictions'] += 1
+            self._close(self._statements.popitem(last=False)[1])
+        return entry
+
+    def discard(self, query):
+        """
+        Function to close and forget a statement, e.g. after it failed
+
+        :param query: Parameterized MySQl query
+        :type query: str
+        """
+        entry = self._statements.pop(query, None)
+        if entry is not None:
+            self._close(entry)
+
+    def close(self):
+        """
+        Function to close every cached statement
+        """
+        while self._statements:
+            self._close(self._statements.popitem()[1])
+
+    def __len__(self):
+        return len(self._statements)
+
+    @staticmethod
+    def _close(entry):
+        """
+        Function to close the prepared cursor of an entry, deallocating its statement on the server
+
+        :param entry: Prepared cursor and query text
+        :type entry: tuple
+        """
+        try:
+            entry[0].close()
+        except Exception as e:
+            print(f"Failed to close prepared statement: {entry[1]}. Error encountered: {e}")
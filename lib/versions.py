@@ -0,0 +1,64 @@
+import threading
+import time
+import uuid
+
+
+class TableVersions(object):
+
+    def __init__(self, max_age=None, clock=time.time):
+        """
+        Version counter per table, bumped once a write to the table is committed, so a response built from
+        tables can be tagged with their versions and revalidated without reading them again. Tags carry a token
+        unique to the process, so tags handed out before a restart never match again. Like the read cache the
+        counters are kept in process and only see the writes made through this process, so tags also carry the
+        time bucket they were made in: a tag stops matching after at most max_age seconds and writes made by
+        other processes are seen within the same bound as the read cache TTL.
+
+        :param max_age: Seconds a tag matches for at most, None for tags changed only by writes
+        :type max_age: float
+        :param clock: Callable returning the current time in seconds
+        :type clock: callable
+        """
+        self.epoch = uuid.uuid4().hex[:12]
+        self.max_age = max_age
+        self.clock = clock
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def bump(self, *tables):
+        """
+        Function to move the version of every given table on
+
+        :param tables: Names of the tables written to
+        :type tables: str
+        """
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def version(self, table):
+        """
+        Function to read the version of a table
+
+        :param table: Name of the table
+        :type table: str
+
+        :return: Number of committed writes to the table seen by this process
+        :rtype: int
+        """
+        with self._lock:
+            return self._versions.get(table, 0)
+
+    def etag(self, *tables):
+        """
+        Function to build the entity tag of a response read from the given tables
+
+        :param tables: Names of the tables the response is read from
+        :type tables: str
+
+        :return: Opaque tag, changed by any write to one of the tables and once max_age has passed
+        :rtype: str
+        """
+        prefix = [self.epoch] if self.max_age is None else [self.epoch, str(int(self.clock() // self.max_age))]
+        with self._lock:
+            return '-'.join(prefix + [str(self._versions.get(table, 0)) for table in tables])
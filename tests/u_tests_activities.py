@@ -0,0 +1,28 @@
+import unittest
+
+from lib.activities import Sport, Event, Selection, format_fields
+
+
+class ActivitiesUnitTests(unittest.TestCase):
+
+    def test_models__slotted_without_instance_dict(self):
+        for activity in [Sport('Football', 'football'), Event(status=0, type=0), Selection(outcome=0)]:
+            self.assertFalse(hasattr(activity, '__dict__'))
+
+    def test_event__to_dict(self):
+        event = Event(name='Race', slug='race', active=1, sport='Racing', status=1, type=1)
+        self.assertEqual({'name': 'Race', 'slug': 'race', 'active': True, 'sport': 'Racing', 'actual_start': None,
+                          'scheduled_start': None, 'status': 'Status.STARTED', 'type': 'EventType.INPLAY'},
+                         event.to_dict())
+
+    def test_selection__to_dict(self):
+        selection = Selection(name='Win', active=0, event='Race', outcome=3)
+        self.assertEqual({'name': 'Win', 'active': False, 'event': 'Race', 'price': '00.00',
+                          'outcome': 'Outcome.WIN'}, selection.to_dict())
+
+    def test_format_fields__partial_row(self):
+        self.assertEqual({'outcome': 'Outcome.VOID', 'active': True}, format_fields({'outcome': 1, 'active': 1}))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -1,15 +1,21 @@
 import unittest
 
-from mock import Mock, patch
+from mock import MagicMock, patch
 
 from lib.activity_mgr import ActivityMgr, SELECTION, EVENT, SPORT
+from lib.db_setup import EVENT_ID, SPORT_ID
 
 
 class ActivityMgrUnitTests(unittest.TestCase):
 
     def setUp(self):
-        db = Mock()
+        db = MagicMock()
+        self.repos = {table: MagicMock() for table in ('sports', 'events', 'selections')}
+        db.repository.side_effect = lambda table: self.repos[table]
         self.mgr = ActivityMgr(db, **{})
+        self.sports, self.events, self.selections = (self.repos[table] for table in ('sports', 'events', 'selections'))
+        self.sports.id_by_name.return_value = 1
+        self.events.id_by_name.return_value = 2
 
     def test_set_activity_type__sport(self):
         self.mgr.set_activity_type()
@@ -46,105 +52,128 @@ class ActivityMgrUnitTests(unittest.TestCase):
         self.mgr.activity_type = None
         self.assertEqual(1, mock_disable.call_count)
 
-    @patch('lib.activity_mgr.ActivityMgr.disable_all_events_by_sport')
-    def test_disable_sport__success(self, mock_disable):
-        self.mgr.disable_sport(event_triggered=True)
-        self.assertEqual(1, self.mgr.db.update_rows_inactive.call_count)
-        self.assertEqual(0, mock_disable.call_count)
+    @patch('lib.activity_mgr.ActivityMgr.disable_sport')
+    def test_end_activity__runs_in_transaction(self, _):
+        self.mgr.end_activity()
+        self.assertEqual(1, self.mgr.db.transaction.call_count)
+        self.assertEqual(1, self.mgr.db.transaction.return_value.__exit__.call_count)
 
     @patch('lib.activity_mgr.ActivityMgr.disable_all_events_by_sport')
     def test_disable_sport__disables_child_events(self, mock_disable):
         self.mgr.disable_sport()
-        self.assertEqual(1, self.mgr.db.update_rows_inactive.call_count)
+        self.sports.update_rows_inactive.assert_called_once_with('name', None)
         self.assertEqual(1, mock_disable.call_count)
 
-    @patch('lib.activity_mgr.ActivityMgr.get_all_events_by_sport', return_value=[{'name': EVENT, 'active': 1}])
-    @patch('lib.activity_mgr.ActivityMgr.disable_all_selections_by_event')
-    @patch('lib.activity_mgr.ActivityMgr.disable_sport')
-    def test_disable_event__success(self, mock_disable_sport, mock_disable_sel, _):
-        self.mgr.db.select_all_from_table_by_key_value.return_value = [{'sport': SPORT}]
-        self.mgr.disable_event()
-        self.assertEqual(1, self.mgr.db.update_row.call_count)
-        self.assertEqual(1, self.mgr.db.select_all_from_table_by_key_value.call_count)
-        self.assertEqual(1, mock_disable_sel.call_count)
-        self.assertEqual(0, mock_disable_sport.call_count)
-
-    @patch('lib.activity_mgr.ActivityMgr.get_all_events_by_sport', return_value=[{'name': EVENT, 'active': 0}])
-    @patch('lib.activity_mgr.ActivityMgr.disable_all_selections_by_event')
-    @patch('lib.activity_mgr.ActivityMgr.disable_sport')
-    def test_disable_event__disables_sport(self, mock_disable_sport, mock_disable_sel, _):
-        self.mgr.db.select_all_from_table_by_key_value.return_value = [{'sport': SPORT}]
+    def test_disable_event__success(self):
+        self.mgr.all_args['name'] = EVENT
         self.mgr.disable_event()
-        self.assertEqual(1, self.mgr.db.update_row.call_count)
-        self.assertEqual(1, self.mgr.db.select_all_from_table_by_key_value.call_count)
-        self.assertEqual(1, mock_disable_sel.call_count)
-        self.assertEqual(1, mock_disable_sport.call_count)
-
-    @patch('lib.activity_mgr.ActivityMgr.get_all_events_by_sport', return_value=[{'name': EVENT, 'active': 0}])
-    @patch('lib.activity_mgr.ActivityMgr.disable_all_selections_by_event', return_value=[{'name': EVENT, 'active': 0}])
-    def test_disable_all_events_by_sport__success(self, mock_disable_sel, _):
+        del self.mgr.all_args['name']
+        self.events.update_row.assert_called_with({'active': 0, 'status': 3}, 'name', EVENT)
+        self.selections.update_active_rows.assert_called_with({'active': 0, 'outcome': 1}, EVENT_ID, 2)
+        self.events.id_by_name.assert_called_once_with(EVENT)
+        self.sports.update_parent_if_children_inactive.assert_called_with(
+            {'active': 0}, 'events', SPORT_ID, 'name', EVENT)
+        self.assertEqual(0, self.selections.select_all_from_table_by_key_value.call_count)
+
+    def test_disable_all_events_by_sport__success(self):
         self.mgr.disable_all_events_by_sport(SPORT)
-        self.assertEqual(1, self.mgr.db.update_row.call_count)
-        self.assertEqual(1, mock_disable_sel.call_count)
+        self.events.update_active_rows.assert_called_with({'active': 0, 'status': 3}, SPORT_ID, 1)
+        self.selections.update_active_rows_by_parent.assert_called_with(
+            {'active': 0, 'outcome': 1}, EVENT_ID, 'events', SPORT_ID, 1)
+        self.sports.id_by_name.assert_called_once_with(SPORT)
+        self.assertEqual(0, self.events.select_all_from_table_by_key_value.call_count)
+
+    def test_disable_all_events_by_sport__records_cascaded_children(self):
+        self.events.select_by_key_values.return_value = [{'id': 2, 'name': 'Race'}]
+        self.selections.select_by_parent.return_value = [{'name': 'No 10', EVENT: 'Race'}]
+        self.mgr.disable_all_events_by_sport('Horses')
+        self.events.select_by_key_values.assert_called_once_with(['id', 'name'], SPORT_ID, [1], filters={'active': 1})
+        self.selections.select_by_parent.assert_called_once_with(
+            ['name', EVENT], EVENT_ID, 'events', SPORT_ID, 1, filters={'active': 1})
+        self.assertListEqual([
+            {'activity': EVENT, 'name': 'Race', SPORT: 'Horses', EVENT: 'Race', 'status': 3},
+            {'activity': SELECTION, 'name': 'No 10', SPORT: 'Horses', EVENT: 'Race', 'outcome': 1}], self.mgr.changes)
+
+    def test_roll_up__records_only_parent_closed(self):
+        self.sports.select_all_from_table_by_key_value.side_effect = [[{'active': 1}], [{'active': 0}]]
+        update = MagicMock()
+        self.mgr.roll_up(self.sports, SPORT, 'Horses', update)
+        self.assertEqual(1, update.call_count)
+        self.assertListEqual([{'activity': SPORT, 'name': 'Horses', SPORT: 'Horses', EVENT: None}], self.mgr.changes)
+        self.events.select_all_from_table_by_key_value.side_effect = [[{'active': 1}], [{'active': 1}]]
+        self.mgr.roll_up(self.events, EVENT, 'Race', update, 'Horses', status=3)
+        self.assertEqual(1, len(self.mgr.changes))
 
     def test_get_all_events_by_sport__success(self):
         self.mgr.get_all_events_by_sport(SPORT)
-        self.assertEqual(1, self.mgr.db.select_all_from_table_by_key_value.call_count)
+        self.events.select_all_from_table_by_key_value.assert_called_once_with(SPORT_ID, 1)
 
-    @patch('lib.activity_mgr.ActivityMgr.get_all_selections_by_event', return_value=[{'name': SELECTION}])
-    @patch('lib.activity_mgr.ActivityMgr.disable_event')
-    def test_disable_selection__success(self, mock_disable, _):
-        self.mgr.db.select_all_from_table_by_key_value.return_value = [{'event': EVENT}]
+    def test_disable_selection__success(self):
+        self.mgr.all_args.update({'name': SELECTION, 'outcome': 3})
+        self.selections.select_all_from_table_by_key_value.return_value = [{'event': EVENT}]
         self.mgr.disable_selection()
-        self.assertEqual(1, self.mgr.db.update_row.call_count)
-        self.assertEqual(1, mock_disable.call_count)
-
-    @patch('lib.activity_mgr.ActivityMgr.get_all_selections_by_event', return_value=[{'name': SELECTION, 'active': 1}])
-    @patch('lib.activity_mgr.ActivityMgr.disable_event')
-    def test_disable_selection__does_not_disable_event(self, mock_disable, _):
-        self.mgr.db.select_all_from_table_by_key_value.return_value = [{'event': EVENT}]
-        self.mgr.disable_selection()
-        self.assertEqual(1, self.mgr.db.update_row.call_count)
-        self.assertEqual(0, mock_disable.call_count)
+        self.mgr.all_args.clear()
+        self.selections.update_row.assert_called_with({'active': 0, 'outcome': 3}, 'name', SELECTION)
+        self.events.update_parent_if_children_inactive.assert_called_with(
+            {'active': 0, 'status': 3}, 'selections', EVENT_ID, 'name', SELECTION)
+        self.sports.update_parent_if_children_inactive.assert_called_with(
+            {'active': 0}, 'events', SPORT_ID, 'name', EVENT)
+        self.assertEqual(1, self.selections.select_all_from_table_by_key_value.call_count)
 
     def test_disable_all_selections_by_event__success(self):
         self.mgr.disable_all_selections_by_event(EVENT)
-        self.assertEqual(1, self.mgr.db.update_row.call_count)
+        self.selections.update_active_rows.assert_called_with({'active': 0, 'outcome': 1}, EVENT_ID, 2)
 
     def test_get_all_selections_by_event__success(self):
         self.mgr.get_all_selections_by_event(EVENT)
-        self.assertEqual(1, self.mgr.db.select_all_from_table_by_key_value.call_count)
+        self.selections.select_all_from_table_by_key_value.assert_called_once_with(EVENT_ID, 2)
 
     @patch('lib.activity_mgr.slugify', return_value="slug")
     def test_create_activity__sport(self, _):
         self.mgr.create_activity()
-        self.assertEqual(1, self.mgr.db.insert_into_table.call_count)
-        self.mgr.db.insert_into_table.assert_called_with(['name', 'slug', 'active'], [('', 'slug', 1)])
+        self.assertEqual(1, self.sports.insert_into_table.call_count)
+        self.sports.insert_into_table.assert_called_with(['name', 'slug', 'active'], [('', 'slug', 1)])
 
     @patch('lib.activity_mgr.slugify', return_value="slug")
     def test_create_activity__event(self, _):
         self.mgr.activity_type = EVENT
+        self.mgr.all_args['sport'] = 'Football'
+        self.sports.ids_by_name.return_value = {'Football': 1}
         self.mgr.create_activity()
         self.mgr.activity_type = None
-        self.assertEqual(1, self.mgr.db.insert_into_table.call_count)
-        self.mgr.db.insert_into_table.assert_called_with(
-            ['name', 'slug', 'active', 'scheduled_start', 'sport'],
-            [('', 'slug', 1, '2021-10-15T19:30:39+00:00', None)])
+        del self.mgr.all_args['sport']
+        self.assertEqual(1, self.events.insert_into_table.call_count)
+        self.events.insert_into_table.assert_called_with(
+            ['name', 'slug', 'active', 'scheduled_start', SPORT_ID], [('', 'slug', 1, '2021-10-15T19:30:39+00:00', 1)])
 
     @patch('lib.activity_mgr.slugify', return_value="slug")
     def test_create_activity__selection(self, _):
         self.mgr.activity_type = SELECTION
+        self.mgr.all_args['event'] = 'Race'
+        self.events.ids_by_name.return_value = {'Race': 2}
         self.mgr.create_activity()
         self.mgr.activity_type = None
-        self.assertEqual(1, self.mgr.db.insert_into_table.call_count)
-        self.mgr.db.insert_into_table.assert_called_with(['name', 'active', 'price', 'event'], [('', 1, '0.00', None)])
+        del self.mgr.all_args['event']
+        self.assertEqual(1, self.selections.insert_into_table.call_count)
+        self.selections.insert_into_table.assert_called_with(
+            ['name', 'active', 'price', EVENT_ID], [('', 1, '0.00', 2)])
 
-    @patch('lib.activity_mgr.ActivityMgr.get_all_events_by_sport', return_value=[{'name': EVENT}])
-    @patch('lib.activity_mgr.ActivityMgr.delete_selections_by_event')
-    def test_delete_activity__sport_and_child_events_selections(self, mock_del_sel, _):
+    @patch('lib.activity_mgr.slugify', return_value="slug")
+    def test_create_activity__unknown_parent(self, _):
+        self.mgr.activity_type = EVENT
+        self.sports.ids_by_name.return_value = {}
+        self.assertRaisesRegex(ValueError, 'Unknown sport', self.mgr.create_activity)
+        self.mgr.activity_type = None
+        self.assertEqual(0, self.events.insert_into_table.call_count)
+
+    def test_delete_activity__sport_and_child_events_selections(self):
+        self.mgr.all_args['name'] = SPORT
         self.mgr.delete_activity()
-        self.assertEqual(1, mock_del_sel.call_count)
-        self.assertEqual(2, self.mgr.db.delete_row.call_count)
+        del self.mgr.all_args['name']
+        self.selections.delete_rows_by_parent.assert_called_with(EVENT_ID, 'events', SPORT_ID, 1)
+        self.events.delete_row.assert_called_once_with(SPORT_ID, 1)
+        self.sports.delete_row.assert_called_once_with('name', SPORT)
+        self.assertEqual(0, self.sports.select_all_from_table_by_key_value.call_count)
 
     @patch('lib.activity_mgr.ActivityMgr.delete_selections_by_event')
     def test_delete_activity__event_and_child_selections(self, mock_del_sel):
@@ -152,18 +181,43 @@ class ActivityMgrUnitTests(unittest.TestCase):
         self.mgr.delete_activity()
         self.mgr.activity_type = None
         self.assertEqual(1, mock_del_sel.call_count)
-        self.assertEqual(1, self.mgr.db.delete_row.call_count)
+        self.assertEqual(1, self.events.delete_row.call_count)
+
+    def test_delete_activity__runs_in_transaction(self):
+        self.mgr.activity_type = SELECTION
+        self.mgr.delete_activity()
+        self.mgr.activity_type = None
+        self.assertEqual(1, self.mgr.db.transaction.call_count)
+        self.assertEqual(1, self.mgr.db.transaction.return_value.__exit__.call_count)
 
     def test_delete_activity__selection(self):
         self.mgr.activity_type = SELECTION
         self.mgr.delete_activity()
         self.mgr.activity_type = None
-        self.assertEqual(1, self.mgr.db.delete_row.call_count)
+        self.assertEqual(1, self.selections.delete_row.call_count)
 
-    @patch('lib.activity_mgr.ActivityMgr.get_all_selections_by_event', return_value=[{'name': SELECTION}])
-    def test_delete_selections_by_event__success(self, _):
+    def test_delete_selections_by_event__success(self):
         self.mgr.delete_selections_by_event(EVENT)
-        self.assertEqual(1, self.mgr.db.delete_row.call_count)
+        self.selections.delete_row.assert_called_once_with(EVENT_ID, 2)
+        self.assertEqual(0, self.selections.select_all_from_table_by_key_value.call_count)
+
+    def test_lineage__from_args_and_rows(self):
+        self.mgr.all_args.update({'name': 'Football'})
+        self.mgr.activity_type = SPORT
+        self.assertEqual({SPORT: 'Football', EVENT: None}, self.mgr.lineage())
+        self.mgr.all_args.update({'name': 'Race', SPORT: 'Horses'})
+        self.mgr.activity_type = EVENT
+        self.assertEqual({SPORT: 'Horses', EVENT: 'Race'}, self.mgr.lineage())
+        self.assertEqual(0, self.events.select_all_from_table_by_key_value.call_count)
+
+    def test_lineage__selection_looks_up_parents(self):
+        self.mgr.all_args.update({'name': 'No 10', 'outcome': 2})
+        self.mgr.activity_type = SELECTION
+        self.selections.select_all_from_table_by_key_value.return_value = [{'event': 'Race'}]
+        self.events.select_all_from_table_by_key_value.return_value = []
+        self.assertEqual({SPORT: None, EVENT: 'Race'}, self.mgr.lineage())
+        self.selections.select_all_from_table_by_key_value.assert_called_once_with('name', 'No 10')
+        self.events.select_all_from_table_by_key_value.assert_called_once_with('name', 'Race')
 
 
 if __name__ == '__main__':
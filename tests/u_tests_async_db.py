@@ -0,0 +1,119 @@
+import asyncio
+import unittest
+
+from mock import AsyncMock, MagicMock, patch
+
+from lib.async_db import AsyncDBConnection
+
+
+class StandInPool(object):
+    """
+    In-process stand-in for an aiomysql pool, every acquire() hands out the same connection
+    """
+
+    def __init__(self, rows=None, description=None):
+        self.cursor = MagicMock()
+        self.cursor.execute = AsyncMock()
+        self.cursor.executemany = AsyncMock()
+        self.cursor.fetchall = AsyncMock(return_value=rows or [])
+        self.cursor.fetchmany = AsyncMock(side_effect=[rows or [], []])
+        self.cursor.description = description or []
+        self.cursor.__aenter__.return_value = self.cursor
+        self.connection = MagicMock()
+        self.connection.cursor.return_value = self.cursor
+        self.connection.begin = AsyncMock()
+        self.connection.commit = AsyncMock()
+        self.connection.rollback = AsyncMock()
+        self.acquired = 0
+
+    def acquire(self):
+        self.acquired += 1
+        context = MagicMock()
+        context.__aenter__.return_value = self.connection
+        return context
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class AsyncDBUnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = StandInPool(rows=[('Football', 1)], description=[('name',), ('active',)])
+        self.db = AsyncDBConnection('db', pool=self.pool)
+
+    def test_execute_query__returns_rows_as_dicts(self):
+        result = run(self.db.execute_query("SELECT * FROM sports", result_req=True))
+        self.assertEqual([{'name': 'Football', 'active': 1}], result)
+        self.pool.cursor.execute.assert_awaited_once_with("SELECT * FROM sports", None)
+
+    def test_execute_query__many(self):
+        run(self.db.insert_rows('sports', ['name', 'active'], [('a', 1), ('b', 0)]))
+        self.pool.cursor.executemany.assert_awaited_once_with(
+            "INSERT INTO sports (name, active) VALUES (%s, %s)", [('a', 1), ('b', 0)])
+
+    def test_execute_query__raises(self):
+        self.pool.cursor.execute.side_effect = RuntimeError('gone')
+        with self.assertRaises(RuntimeError):
+            run(self.db.execute_query("SELECT 1"))
+
+    def test_select_all_from_table_by_key_value(self):
+        run(self.db.select_all_from_table_by_key_value('events', 'sport', 'Football'))
+        self.pool.cursor.execute.assert_awaited_once_with(
+            "SELECT * FROM (SELECT c.*, p.name AS sport FROM events c LEFT JOIN sports p ON p.id = c.sport_id) events "
+            "WHERE sport = %s", ('Football',))
+
+    def test_select_page(self):
+        run(self.db.select_page('events', ['name'], ['scheduled_start', 'name'], 11, after=['2021', 'a'],
+                                filters={'active': 1}))
+        self.pool.cursor.execute.assert_awaited_once_with(
+            "SELECT name FROM (SELECT c.*, p.name AS sport FROM events c LEFT JOIN sports p ON p.id = c.sport_id) "
+            "events WHERE active = %s AND (scheduled_start, name) > (%s, %s) "
+            "ORDER BY scheduled_start, name LIMIT %s", (1, '2021', 'a', 11))
+
+    def test_update_row(self):
+        run(self.db.update_row('events', {'status': 1, 'type': 1}, 'name', 'Race'))
+        self.pool.cursor.execute.assert_awaited_once_with(
+            "UPDATE events SET status = %s, type = %s WHERE name = %s", (1, 1, 'Race'))
+
+    def test_stream_all_from_table(self):
+        async def collect():
+            return [row async for row in self.db.stream_all_from_table('sports', batch_size=10)]
+        self.assertEqual([{'name': 'Football', 'active': 1}], run(collect()))
+        self.pool.cursor.fetchmany.assert_awaited_with(10)
+
+    def test_transaction__commits_once_on_one_connection(self):
+        async def write():
+            async with self.db.transaction():
+                await self.db.delete_row('selections', 'event', 'Race')
+                async with self.db.transaction():
+                    await self.db.delete_row('events', 'name', 'Race')
+        run(write())
+        self.assertEqual(1, self.pool.acquired)
+        self.pool.connection.begin.assert_awaited_once()
+        self.pool.connection.commit.assert_awaited_once()
+        self.pool.connection.rollback.assert_not_awaited()
+
+    def test_transaction__rolls_back_on_error(self):
+        async def write():
+            async with self.db.transaction():
+                await self.db.delete_row('events', 'name', 'Race')
+                raise ValueError('fail')
+        with self.assertRaises(ValueError):
+            run(write())
+        self.pool.connection.commit.assert_not_awaited()
+        self.pool.connection.rollback.assert_awaited_once()
+
+    def test_transaction__joined_by_child_tasks_until_exit(self):
+        async def concurrent():
+            async with self.db.transaction():
+                await asyncio.gather(self.db.execute_query("SELECT 1"))
+            await self.db.execute_query("SELECT 2")
+        run(concurrent())
+        self.assertEqual(2, self.pool.acquired)
+
+    @patch('lib.async_db.aiomysql', None)
+    def test_get_pool__requires_driver(self):
+        with self.assertRaises(RuntimeError):
+            run(AsyncDBConnection('db').get_pool())
@@ -0,0 +1,227 @@
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from mock import patch
+
+from lib.activity_mgr import ActivityMgr
+from lib.backends import Backend, MySQLBackend, SQLiteBackend, adapt_value, get_backend, sqlite_query
+from lib.db import DBConnection, DB_ERRORS
+from lib.db_setup import setup_db, seed_dataset, EVENTS_TABLE, EVENTS_VALUES, SELECTIONS_TABLE, SPORTS_TABLE
+from lib.price_updater import PriceUpdater
+from lib.search import query_builder
+
+
+class BackendUnitTests(unittest.TestCase):
+
+    @patch('lib.backends.connect')
+    def test_mysql_connect__autocommit_database(self, mock_connect):
+        MySQLBackend(host='db').connect('test', autocommit=True)
+        mock_connect.assert_called_with(
+            user='root', password='p@ssw0rd', host='db', raise_on_warnings=True, database='test', autocommit=True)
+
+    @patch('lib.backends.connect')
+    def test_mysql_try_lock__user_level_lock(self, mock_connect):
+        connection = mock_connect.return_value
+        connection.cursor.return_value.fetchall.side_effect = [[(1,)], [(0,)], [(1,)]]
+        backend = MySQLBackend()
+        self.assertTrue(backend.try_lock(connection, 'leader'))
+        self.assertFalse(backend.try_lock(connection, 'leader'))
+        connection.cursor.return_value.execute.assert_called_with("SELECT GET_LOCK(%s, 0)", ('leader',))
+        backend.release_lock(connection, 'leader')
+        connection.cursor.return_value.execute.assert_called_with("SELECT RELEASE_LOCK(%s)", ('leader',))
+
+    def test_sqlite_try_lock__held_in_process(self):
+        backend = SQLiteBackend()
+        self.assertTrue(backend.try_lock(None, 'leader'))
+        self.assertFalse(backend.try_lock(None, 'leader'))
+        backend.release_lock(None, 'leader')
+        self.assertTrue(backend.try_lock(None, 'leader'))
+
+    def test_get_backend__unknown(self):
+        self.assertIsInstance(get_backend('sqlite'), SQLiteBackend)
+        self.assertRaises(ValueError, get_backend, 'oracle')
+
+    def test_backend__incomplete_backend_cannot_be_created(self):
+        class ConnectOnlyBackend(Backend):
+            def connect(self, database=None, autocommit=False):
+                pass
+        self.assertRaisesRegex(TypeError, 'table_names', ConnectOnlyBackend)
+
+    def test_sqlite_query__placeholders_and_escapes(self):
+        self.assertEqual("SELECT * FROM t WHERE a = ? AND b LIKE 'F%'", sqlite_query(
+            "SELECT * FROM t WHERE a = %s AND b LIKE 'F%%'"))
+
+    def test_adapt_value__timestamps_as_utc_text(self):
+        self.assertEqual('2021-10-16 20:55:14', adapt_value('2021-10-16T21:55:14+01:00'))
+        self.assertEqual('2021-10-16 21:55:14', adapt_value(datetime(2021, 10, 16, 21, 55, 14)))
+        self.assertEqual('10.50', adapt_value(Decimal('10.50')))
+        self.assertEqual('Norway Win', adapt_value('Norway Win'))
+
+    def test_sqlite_table_ddl__emulates_on_update(self):
+        ddl = SQLiteBackend().table_ddl(EVENTS_TABLE, EVENTS_VALUES)
+        self.assertNotIn('ON UPDATE', ddl[0])
+        self.assertIn('actual_start TIMESTAMP,', ddl[0])
+        self.assertTrue(ddl[1].startswith('CREATE TRIGGER events_actual_start_on_update AFTER UPDATE ON events'))
+
+
+class SQLiteBackendUnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.database = self.id().rsplit('.', 1)[-1]
+        self.backend = SQLiteBackend()
+        with patch('builtins.print'):
+            setup_db(self.database, backend=self.backend)
+        self.db = DBConnection(self.database, pool_config={'size': 2}, backend=self.backend)
+
+    def tearDown(self):
+        self.db.drop_database()
+
+    def test_setup_db__schema_and_types(self):
+        event = self.db.repository(EVENTS_TABLE).select_all_from_table()[0]
+        self.assertEqual('World Cup 2022', event['name'])
+        self.assertIsInstance(event['scheduled_start'], datetime)
+        self.assertIsNone(event['actual_start'])
+        selection = self.db.repository(SELECTIONS_TABLE).select_all_from_table_by_key_value('name', 'Norway Win')
+        self.assertEqual(Decimal('10.00'), selection[0]['price'])
+
+    def test_update_row__sets_on_update_timestamp(self):
+        self.db.repository(EVENTS_TABLE).update_row({'status': 1, 'type': 1}, 'name', 'World Cup 2022')
+        event = self.db.repository(EVENTS_TABLE).select_all_from_table()[0]
+        self.assertEqual(1, event['status'])
+        self.assertIsInstance(event['actual_start'], datetime)
+
+    def test_search__like_and_regexp(self):
+        for regex, expected in [('^Nor', 1), ('^Nor_', 0), ('n.*WIN$', 1), ('^x', 0)]:
+            query, params = query_builder(regex, ['0'], '')
+            self.assertEqual(expected, len(self.db.execute_query(
+                query, database=self.database, result_req=True, params=params)), regex)
+
+    def test_search__prefix_branches_return_each_row_once_in_order(self):
+        mgr = ActivityMgr(self.db, name='Norway v Spain', sport='Football')
+        mgr.set_activity_type()
+        mgr.create_activity()
+        mgr = ActivityMgr(self.db, name='Norway Draw', event='Norway v Spain')
+        mgr.set_activity_type()
+        mgr.create_activity()
+        query, params = query_builder('^Nor', ['0'], '')
+        rows = self.db.execute_query(query, database=self.database, result_req=True, params=params)
+        self.assertListEqual([('Norway v Spain', 'Norway Draw'), ('World Cup 2022', 'Norway Win')],
+                             [(row['event'], row['selection']) for row in rows])
+
+    def test_select_page__keyset_on_row_values(self):
+        seed_dataset(self.database, sports=1, events=3, selections=1, backend=self.backend)
+        events = self.db.repository(EVENTS_TABLE)
+        first = events.select_page(['name', 'scheduled_start'], ['scheduled_start', 'name'], 2)
+        after = [first[-1]['scheduled_start'].isoformat(), first[-1]['name']]
+        rest = events.select_page(['name', 'scheduled_start'], ['scheduled_start', 'name'], 10, after=after)
+        self.assertEqual(4, len(first) + len(rest))
+        self.assertFalse({row['name'] for row in first} & {row['name'] for row in rest})
+
+    def test_update_rows_by_key__case_update(self):
+        self.db.repository(SELECTIONS_TABLE).update_rows_by_key('price', 'name', {'Norway Win': '2.50', 'x': '1'},
+                                                               filters={'active': 1})
+        selection = self.db.repository(SELECTIONS_TABLE).select_all_from_table()[0]
+        self.assertEqual(Decimal('2.50'), selection['price'])
+
+    def test_select_between__range_of_timestamps(self):
+        events = self.db.repository(EVENTS_TABLE)
+        start = events.select_all_from_table()[0]['scheduled_start']
+        rows = events.select_between(['name'], 'scheduled_start', start - timedelta(minutes=1), start,
+                                     filters={'status': 0, 'active': 1})
+        self.assertListEqual([{'name': 'World Cup 2022'}], rows)
+        events.update_rows_by_key_values({'status': 1}, 'name', ['World Cup 2022', 'x'], filters={'status': 0})
+        self.assertListEqual([], events.select_between(['name'], 'scheduled_start', start, start,
+                                                       filters={'status': 0, 'active': 1}))
+
+    def test_transaction__rolls_back(self):
+        with self.assertRaises(ValueError):
+            with self.db.transaction():
+                self.db.repository(SELECTIONS_TABLE).delete_row('name', 'Norway Win')
+                raise ValueError('fail')
+        self.assertEqual(1, len(self.db.repository(SELECTIONS_TABLE).select_all_from_table()))
+
+    def test_activity_mgr__cascades_and_foreign_keys(self):
+        ActivityMgr(self.db, name='Norway Win', outcome=2).disable_selection()
+        self.assertEqual(0, self.db.repository(EVENTS_TABLE).select_all_from_table()[0]['active'])
+        self.assertEqual(0, self.db.repository(SPORTS_TABLE).select_all_from_table()[0]['active'])
+        with patch('builtins.print'):
+            self.assertRaises(DB_ERRORS, self.db.repository(SPORTS_TABLE).delete_row, 'name', 'Football')
+        mgr = ActivityMgr(self.db, name='Football')
+        mgr.set_activity_type()
+        mgr.delete_activity()
+        self.assertEqual([], self.db.repository(SELECTIONS_TABLE).select_all_from_table())
+
+    def test_activity_mgr__records_roll_ups_and_cascades(self):
+        mgr = ActivityMgr(self.db, name='Norway Win', outcome=2)
+        mgr.set_activity_type()
+        mgr.end_activity()
+        self.assertListEqual([('event', 'World Cup 2022'), ('sport', 'Football')],
+                             [(change['activity'], change['name']) for change in mgr.changes])
+        mgr = ActivityMgr(self.db, name='Football')
+        mgr.set_activity_type()
+        mgr.delete_activity()
+        self.assertListEqual([('event', 'World Cup 2022'), ('selection', 'Norway Win')],
+                             [(change['activity'], change['name']) for change in mgr.changes])
+
+    def test_activity_mgr__records_selections_of_inactive_events_disabled_by_sport(self):
+        self.db.repository(EVENTS_TABLE).update_row({'active': 0}, 'name', 'World Cup 2022')
+        mgr = ActivityMgr(self.db, name='Football')
+        mgr.set_activity_type()
+        mgr.end_activity()
+        self.assertListEqual([('selection', 'Norway Win', 'World Cup 2022')],
+                             [(change['activity'], change['name'], change['event']) for change in mgr.changes])
+        self.assertEqual(0, self.db.repository(SELECTIONS_TABLE).select_all_from_table()[0]['active'])
+
+    def test_insert_rows__failed_batch_is_atomic(self):
+        with patch('builtins.print'):
+            self.assertRaises(DB_ERRORS, self.db.repository(SPORTS_TABLE).insert_rows,
+                              ['name', 'slug', 'active'], [('Golf', 'golf', 1), ('Football', 'football', 1)])
+        self.assertEqual(1, len(self.db.repository(SPORTS_TABLE).select_all_from_table()))
+
+    def test_read_only__rejects_writes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, '{database}.db')
+            with patch('builtins.print'):
+                setup_db(self.database, backend=SQLiteBackend(path=path))
+            connection = SQLiteBackend(path=path, read_only=True).connect(self.database)
+            cursor = connection.cursor()
+            cursor.execute("SELECT name FROM selections")
+            self.assertEqual([('Norway Win',)], cursor.fetchall())
+            self.assertRaises(DB_ERRORS, cursor.execute, "DELETE FROM selections")
+            connection.close()
+
+    def test_concurrent_writers__wait_for_the_write_lock(self):
+        seed_dataset(self.database, sports=1, events=1, selections=8, backend=self.backend)
+        db = DBConnection(self.database, pool_config={'size': 4, 'max_overflow': 4}, backend=self.backend)
+        errors = []
+
+        def write(number):
+            try:
+                for price in range(1, 26):
+                    PriceUpdater(db).update({f"Sel 0-0-{number}": f"{price}.00"})
+                    db.repository(SELECTIONS_TABLE).select_all_from_table_by_key_value('name', f"Sel 0-0-{number}")
+            except DB_ERRORS as e:
+                errors.append(e)
+        threads = [threading.Thread(target=write, args=(number,)) for number in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertListEqual([], errors)
+        rows = db.repository(SELECTIONS_TABLE).select_by_key_values(
+            ['price'], 'name', [f"Sel 0-0-{number}" for number in range(8)])
+        self.assertListEqual([Decimal('25.00')] * 8, [row['price'] for row in rows])
+
+    def test_is_connected(self):
+        connection = self.backend.connect(self.database)
+        self.assertTrue(connection.is_connected())
+        connection.close()
+        self.assertFalse(connection.is_connected())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,65 @@
+import unittest
+
+from mock import Mock, patch
+
+from lib.bulk_loader import BulkLoader, parse_ndjson
+from lib.db import Error
+
+
+class BulkLoaderUnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Mock()
+        self.repos = {}
+        self.db.repository.side_effect = lambda table: self.repos.setdefault(table, Mock())
+        self.loader = BulkLoader(self.db, chunk_size=2)
+
+    def test_parse_ndjson__keeps_bad_lines(self):
+        items = parse_ndjson('{"name": "Golf"}\n\nnot json\n')
+        self.assertListEqual([{'name': 'Golf'}, 'not json'], items)
+
+    @patch('lib.activity_mgr.slugify', return_value="slug")
+    def test_load__inserts_parents_first_in_chunks(self, _):
+        items = [{'name': 'Sel', 'event': 'Race'}, {'name': 'A'}, {'name': 'B'}, {'name': 'C'}]
+        self.db.repository('events').ids_by_name.return_value = {'Race': 7}
+        self.db.repository('events').select_by_key_values.return_value = [{'name': 'Race', 'sport': 'Horses'}]
+        result = self.loader.load(items)
+        self.assertEqual({'created': 4, 'errors': []}, result)
+        self.assertEqual(2, self.repos['sports'].insert_rows.call_count)
+        self.repos['sports'].insert_rows.assert_any_call(
+            ['name', 'slug', 'active'], [('A', 'slug', 1), ('B', 'slug', 1)])
+        self.repos['selections'].insert_rows.assert_called_once_with(
+            ['name', 'active', 'price', 'event_id'], [('Sel', 1, '0.00', 7)])
+        self.assertListEqual([
+            {'activity': 'sport', 'name': 'A', 'sport': 'A', 'event': None},
+            {'activity': 'sport', 'name': 'B', 'sport': 'B', 'event': None},
+            {'activity': 'sport', 'name': 'C', 'sport': 'C', 'event': None},
+            {'activity': 'selection', 'name': 'Sel', 'sport': 'Horses', 'event': 'Race'}], self.loader.changes)
+
+    @patch('lib.activity_mgr.slugify', return_value="slug")
+    def test_load__reports_unknown_parents(self, _):
+        self.db.repository('sports').ids_by_name.return_value = {}
+        result = self.loader.load([{'name': 'Race', 'sport': 'Golf'}])
+        self.assertEqual(0, result['created'])
+        self.assertIn('Unknown sport: Golf', result['errors'][0]['error'])
+        self.assertFalse(self.repos['events'].insert_rows.called)
+
+    def test_load__reports_validation_errors(self):
+        result = self.loader.load([{'event': 'Race'}, 'not json', {'name': 'Sel', 'event': 'Race', 'price': 'x'}])
+        self.assertEqual(0, result['created'])
+        self.assertListEqual([0, 1, 2], [error['index'] for error in result['errors']])
+        self.assertFalse(any(repo.insert_rows.called for repo in self.repos.values()))
+
+    @patch('lib.activity_mgr.slugify', return_value="slug")
+    def test_load__retries_failed_chunk_row_by_row(self, _):
+        sports = self.db.repository('sports')
+        sports.insert_rows.side_effect = [Error('Duplicate entry'), None, Error('Duplicate entry')]
+        result = self.loader.load([{'name': 'A'}, {'name': 'B'}])
+        self.assertEqual(1, result['created'])
+        self.assertEqual(1, result['errors'][0]['index'])
+        self.assertEqual(3, sports.insert_rows.call_count)
+        self.assertListEqual([{'activity': 'sport', 'name': 'A', 'sport': 'A', 'event': None}], self.loader.changes)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,64 @@
+import unittest
+
+from mock import patch
+
+from lib.cache import LRUCache
+
+
+class CacheUnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = LRUCache(max_size=2, ttl=10)
+
+    def test_get__miss_then_hit(self):
+        self.assertEqual((False, None), self.cache.get('key'))
+        self.cache.set('key', ['row'], ['sports'])
+        self.assertEqual((True, ['row']), self.cache.get('key'))
+        stats = self.cache.stats()
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(1, stats['misses'])
+
+    def test_set__evicts_least_recently_used(self):
+        self.cache.set('a', 1, ['sports'])
+        self.cache.set('b', 2, ['sports'])
+        self.cache.get('a')
+        self.cache.set('c', 3, ['sports'])
+        self.assertEqual((False, None), self.cache.get('b'))
+        self.assertEqual((True, 1), self.cache.get('a'))
+        self.assertEqual(1, self.cache.stats()['evictions'])
+
+    @patch('lib.cache.time.monotonic')
+    def test_get__expires_after_ttl(self, mock_time):
+        mock_time.return_value = 0
+        self.cache.set('key', 1, ['sports'])
+        mock_time.return_value = 11
+        self.assertEqual((False, None), self.cache.get('key'))
+        self.assertEqual(1, self.cache.stats()['expirations'])
+        self.assertEqual(0, self.cache.stats()['size'])
+
+    def test_invalidate__drops_only_matching_table(self):
+        self.cache.set('a', 1, ['sports'])
+        self.cache.set('b', 2, ['events'])
+        self.cache.invalidate('sports')
+        self.assertEqual((False, None), self.cache.get('a'))
+        self.assertEqual((True, 2), self.cache.get('b'))
+        self.assertEqual(1, self.cache.stats()['invalidations'])
+
+    def test_set__skips_value_read_before_invalidation(self):
+        generation = self.cache.generation(['sports'])
+        self.cache.invalidate('sports')
+        self.assertFalse(self.cache.set('a', 1, ['sports'], generation=generation))
+        self.assertEqual((False, None), self.cache.get('a'))
+        self.assertTrue(self.cache.set('a', 1, ['sports'], generation=self.cache.generation(['sports'])))
+        generation = self.cache.generation(['sports'])
+        self.cache.invalidate('events')
+        self.assertTrue(self.cache.set('b', 2, ['sports'], generation=generation))
+
+    def test_clear__drops_everything(self):
+        self.cache.set('a', 1, ['sports'])
+        self.cache.clear()
+        self.assertEqual(0, self.cache.stats()['size'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
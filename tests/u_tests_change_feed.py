@@ -0,0 +1,60 @@
+import threading
+import unittest
+
+from lib.change_feed import RESET, ChangeFeed, iter_feed_ndjson, iter_sse, matches
+
+
+class ChangeFeedUnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.feed = ChangeFeed(capacity=3)
+
+    def test_changes_since__resumes_after_sequence(self):
+        for name in ('a', 'b', 'c'):
+            self.feed.publish('create', 'sport', name, sport=name)
+        self.assertListEqual(['b', 'c'], [change['name'] for change in self.feed.changes_since(1)])
+        self.assertListEqual([], self.feed.changes_since(3))
+
+    def test_changes_since__resets_client_behind_buffer_or_ahead_of_restart(self):
+        for name in ('a', 'b', 'c', 'd', 'e'):
+            self.feed.publish('create', 'sport', name, sport=name)
+        self.assertListEqual([{'seq': 5, 'change': RESET}], self.feed.changes_since(1))
+        self.assertListEqual(['c', 'd', 'e'], [change['name'] for change in self.feed.changes_since(2)])
+        self.assertListEqual([{'seq': 5, 'change': RESET}], self.feed.changes_since(9))
+
+    def test_changes_since__waits_for_publish(self):
+        timer = threading.Timer(0.05, self.feed.publish, ('start', 'event', 'Race'), {'sport': 'Horses'})
+        timer.start()
+        changes = self.feed.changes_since(0, timeout=5)
+        timer.join()
+        self.assertEqual('Race', changes[0]['name'])
+        self.assertListEqual([], self.feed.changes_since(1, timeout=0.01))
+
+    def test_subscribe__filters_and_heartbeats(self):
+        changes = self.feed.subscribe(sport='Horses', event='Race', heartbeat=0.01)
+        self.feed.publish('price', 'selection', 'Win', sport='Football', event='Cup')
+        self.feed.publish('price', 'selection', 'No 10', sport='Horses', event='Race', price='2.00')
+        self.feed.publish('inactive', 'sport', 'Horses', sport='Horses')
+        self.assertEqual('No 10', next(changes)['name'])
+        self.assertEqual('Horses', next(changes)['name'])
+        self.assertIsNone(next(changes))
+
+    def test_matches__event_subscribers_see_sport_changes(self):
+        sport_change = {'activity': 'sport', 'name': 'Horses', 'sport': 'Horses', 'event': None}
+        self.assertTrue(matches(sport_change, sport='Horses', event='Race'))
+        self.assertFalse(matches(sport_change, event='Race'))
+        self.assertFalse(matches({'activity': 'event', 'name': 'Cup', 'sport': 'Horses', 'event': 'Cup'},
+                                 sport='Horses', event='Race'))
+
+    def test_iter_sse__event_per_change(self):
+        lines = list(iter_sse([{'seq': 7, 'change': 'start', 'name': 'Race'}, None]))
+        self.assertEqual('retry: 2000\n\n', lines[0])
+        self.assertEqual('id: 7\nevent: start\ndata: {"change":"start","name":"Race","seq":7}\n\n', lines[1])
+        self.assertTrue(lines[2].startswith(': heartbeat'))
+
+    def test_iter_feed_ndjson__line_per_change(self):
+        self.assertListEqual(['\n', '{"seq":1}\n', '\n'], list(iter_feed_ndjson([{'seq': 1}, None])))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
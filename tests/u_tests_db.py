@@ -2,7 +2,10 @@ import unittest
 
 from mock import patch, Mock
 
-from lib.db import DBConnection, Error
+from lib.cache import LRUCache
+from lib.db import DBConnection, Error, page_query, read_source
+from lib.metrics import Metrics
+from lib.versions import TableVersions
 
 
 class DBUnitTests(unittest.TestCase):
@@ -12,7 +15,7 @@ class DBUnitTests(unittest.TestCase):
         self.columns = ['name', 'active']
         self.query = "query"
 
-    @patch('lib.db.connect')
+    @patch('lib.backends.connect')
     def test_execute_query__creates_database(self, mock_connect):
         self.db.execute_query(self.query)
         self.assertEqual(1, mock_connect.call_count)
@@ -22,7 +25,7 @@ class DBUnitTests(unittest.TestCase):
         self.assertEqual(1, mock_connect.return_value.cursor.return_value.close.call_count)
         self.assertEqual(1, mock_connect.return_value.close.call_count)
 
-    @patch('lib.db.connect')
+    @patch('lib.backends.connect')
     def test_execute_query__commits_to_database(self, mock_connect):
         self.db.execute_query(self.query, database='db', commit=True)
         self.assertEqual(1, mock_connect.call_count)
@@ -34,7 +37,7 @@ class DBUnitTests(unittest.TestCase):
         self.assertEqual(1, mock_connect.return_value.close.call_count)
         self.assertEqual(1, mock_connect.return_value.commit.call_count)
 
-    @patch('lib.db.connect')
+    @patch('lib.backends.connect')
     @patch('lib.db.DBConnection.get_result')
     def test_execute_query__returns_result(self, mock_get_result, mock_connect):
         self.db.execute_query(self.query, database='db', result_req=True)
@@ -47,9 +50,270 @@ class DBUnitTests(unittest.TestCase):
         self.assertEqual(1, mock_connect.return_value.close.call_count)
         self.assertEqual(1, mock_get_result.call_count)
 
-    @patch('lib.db.connect', side_effect=Error('Some SQL Error'))
+    @patch('lib.backends.connect', side_effect=Error('Some SQL Error'))
     def test_execute_query__raises_error(self, _):
-        self.assertRaises(AttributeError, self.db.execute_query, self.query)
+        self.assertRaises(Error, self.db.execute_query, self.query)
+
+    def test_repository__bound_to_table_and_shares_state(self):
+        db = DBConnection('test', pool_config={'size': 2}, cache=LRUCache())
+        events = db.repository('events')
+        self.assertEqual('events', events.table)
+        self.assertIsNone(db.table)
+        self.assertIs(events, db.repository('events'))
+        self.assertIs(db.pool, events.pool)
+        self.assertIs(db.cache, events.cache)
+        self.assertIs(db._local, events._local)
+        self.assertEqual('sports', events.repository('sports').table)
+
+    @patch('lib.backends.connect')
+    def test_transaction__spans_repositories(self, mock_connect):
+        db = DBConnection('test', pool_config={'size': 2})
+        with db.transaction():
+            db.repository('events').delete_row('name', 'Race')
+            db.repository('selections').delete_row('event', 'Race')
+        self.assertEqual(1, mock_connect.call_count)
+        self.assertEqual(1, mock_connect.return_value.commit.call_count)
+
+    @patch('lib.backends.connect')
+    def test_execute_query__reuses_pooled_connection(self, mock_connect):
+        db = DBConnection('test', 'test_table', pool_config={'size': 2})
+        db.execute_query(self.query, database='test')
+        db.execute_query(self.query, database='test')
+        self.assertEqual(1, mock_connect.call_count)
+        mock_connect.assert_called_with(
+            user='root', password='p@ssw0rd', host='mysqldb', raise_on_warnings=True, database='test', autocommit=True)
+        self.assertEqual(2, mock_connect.return_value.cursor.return_value.execute.call_count)
+        self.assertEqual(0, mock_connect.return_value.close.call_count)
+        self.assertEqual(1, db.pool_stats()['reused'])
+
+    @patch('lib.backends.connect')
+    def test_execute_query__pooled_error_discards_broken_connection(self, mock_connect):
+        db = DBConnection('test', 'test_table', pool_config={'size': 2})
+        mock_connect.return_value.cursor.return_value.execute.side_effect = Error('Lost connection')
+        mock_connect.return_value.is_connected.return_value = False
+        self.assertRaises(Error, db.execute_query, self.query, database='test')
+        self.assertEqual(1, mock_connect.return_value.close.call_count)
+        self.assertEqual(0, db.pool_stats()['idle'])
+
+    @patch('lib.backends.connect')
+    def test_transaction__commits_once_on_one_connection(self, mock_connect):
+        with self.db.transaction():
+            self.db.execute_query(self.query, database='test', commit=True)
+            self.db.execute_query(self.query, database='test', commit=True)
+        self.assertEqual(1, mock_connect.call_count)
+        self.assertEqual(1, mock_connect.return_value.start_transaction.call_count)
+        self.assertEqual(2, mock_connect.return_value.cursor.return_value.execute.call_count)
+        self.assertEqual(1, mock_connect.return_value.commit.call_count)
+        self.assertEqual(1, mock_connect.return_value.close.call_count)
+
+    @patch('lib.backends.connect')
+    def test_transaction__rolls_back_on_error(self, mock_connect):
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.db.execute_query(self.query, database='test', commit=True)
+                raise RuntimeError('Failure')
+        self.assertEqual(0, mock_connect.return_value.commit.call_count)
+        self.assertEqual(1, mock_connect.return_value.rollback.call_count)
+        self.assertEqual(1, mock_connect.return_value.close.call_count)
+
+    @patch('lib.backends.connect')
+    def test_transaction__nested_joins_outer(self, mock_connect):
+        with self.db.transaction():
+            with self.db.transaction():
+                self.db.execute_query(self.query, database='test')
+        self.assertEqual(1, mock_connect.call_count)
+        self.assertEqual(1, mock_connect.return_value.commit.call_count)
+
+    @patch('lib.backends.connect')
+    def test_transaction__releases_pooled_connection(self, mock_connect):
+        db = DBConnection('test', 'test_table', pool_config={'size': 2})
+        with db.transaction():
+            db.execute_query(self.query, database='test')
+        self.assertEqual(1, mock_connect.return_value.commit.call_count)
+        self.assertEqual(0, mock_connect.return_value.close.call_count)
+        self.assertEqual(1, db.pool_stats()['idle'])
+
+    @patch('lib.backends.connect')
+    def test_stream_query__yields_rows_in_batches(self, mock_connect):
+        cursor = mock_connect.return_value.cursor.return_value
+        cursor.description = [('name',), ('active',)]
+        cursor.fetchmany.side_effect = [[('Test1', 1), ('Test2', 1)], [('Test3', 0)], []]
+        rows = list(self.db.stream_query(self.query, batch_size=2))
+        self.assertListEqual(['Test1', 'Test2', 'Test3'], [row['name'] for row in rows])
+        mock_connect.return_value.cursor.assert_called_with(buffered=False)
+        cursor.fetchmany.assert_called_with(2)
+        self.assertEqual(1, cursor.close.call_count)
+        self.assertEqual(1, mock_connect.return_value.close.call_count)
+
+    @patch('lib.backends.connect')
+    def test_stream_query__discards_partially_read_pooled_connection(self, mock_connect):
+        db = DBConnection('test', 'test_table', pool_config={'size': 2})
+        cursor = mock_connect.return_value.cursor.return_value
+        cursor.description = [('name',)]
+        cursor.fetchmany.return_value = [('Test1',), ('Test2',)]
+        rows = db.stream_query(self.query)
+        next(rows)
+        rows.close()
+        self.assertEqual(1, mock_connect.return_value.close.call_count)
+        self.assertEqual(0, db.pool_stats()['idle'])
+
+    @patch('lib.db.DBConnection.execute_query', return_value=["Some Output"])
+    def test_read_through__serves_repeat_reads_from_cache(self, mock_execute):
+        db = DBConnection('test', 'test_table', cache=LRUCache())
+        db.select_all_from_table()
+        self.assertListEqual(["Some Output"], db.select_all_from_table())
+        self.assertEqual(1, mock_execute.call_count)
+        self.assertEqual(1, db.cache_stats()['hits'])
+
+    def test_read_through__does_not_cache_read_overtaken_by_write(self):
+        db = DBConnection('test', 'test_table', cache=LRUCache())
+
+        def loader():
+            db.invalidate('test_table')
+            return ["Stale Output"]
+        self.assertListEqual(["Stale Output"], db.read_through('read', (), loader))
+        self.assertEqual(0, db.cache_stats()['size'])
+        self.assertListEqual(["Fresh Output"], db.read_through('read', (), lambda: ["Fresh Output"]))
+        self.assertEqual(1, db.cache_stats()['size'])
+
+    def test_read_through__parent_write_invalidates_child_reads(self):
+        db = DBConnection('test', 'events', cache=LRUCache())
+        db.read_through('read', (), lambda: ["Some Output"])
+        db.invalidate('sports')
+        self.assertEqual(0, db.cache_stats()['size'])
+
+    def test_read_source__joins_parent_name_of_children(self):
+        self.assertEqual('sports', read_source('sports'))
+        self.assertEqual(
+            "(SELECT c.*, p.name AS event FROM selections c LEFT JOIN events p ON p.id = c.event_id) selections",
+            read_source('selections'))
+        query, params = page_query('selections', ['name', 'event'], ['name'], 10, filters={'active': 1})
+        self.assertEqual(f"SELECT name, event FROM {read_source('selections')} WHERE active = %s ORDER BY name "
+                         f"LIMIT %s", query)
+        self.assertEqual((1, 10), params)
+
+    @patch('lib.backends.connect')
+    def test_execute_query__write_invalidates_table_cache(self, mock_connect):
+        db = DBConnection('test', 'test_table', cache=LRUCache())
+        db.cache.set('read', ["Some Output"], ['test_table'])
+        db.cache.set('other', ["Some Output"], ['other_table'])
+        db.delete_row('key', 'value')
+        self.assertEqual((False, None), db.cache.get('read'))
+        self.assertEqual((True, ["Some Output"]), db.cache.get('other'))
+
+    @patch('lib.backends.connect')
+    def test_transaction__invalidates_cache_on_commit_only(self, mock_connect):
+        db = DBConnection('test', 'test_table', cache=LRUCache())
+        db.cache.set('read', ["Some Output"], ['test_table'])
+        with db.transaction():
+            db.delete_row('key', 'value')
+            self.assertEqual((True, ["Some Output"]), db.cache.get('read'))
+        self.assertEqual((False, None), db.cache.get('read'))
+        db.cache.set('read', ["Some Output"], ['test_table'])
+        with self.assertRaises(RuntimeError):
+            with db.transaction():
+                db.delete_row('key', 'value')
+                raise RuntimeError('Failure')
+        self.assertEqual((True, ["Some Output"]), db.cache.get('read'))
+
+    @patch('lib.backends.connect')
+    def test_write__bumps_table_versions_once_committed(self, mock_connect):
+        db = DBConnection('test', versions=TableVersions())
+        db.repository('events').update_row({'active': 0}, 'name', 'Race')
+        with db.transaction():
+            db.repository('selections').delete_row('event', 'Race')
+            db.repository('selections').delete_row('event', 'Race 2')
+            self.assertEqual(0, db.versions.version('selections'))
+        self.assertEqual((1, 1, 0), tuple(db.versions.version(table) for table in ('events', 'selections', 'sports')))
+        with self.assertRaises(RuntimeError):
+            with db.transaction():
+                db.repository('sports').delete_row('name', 'Football')
+                raise RuntimeError('Failure')
+        self.assertEqual(0, db.versions.version('sports'))
+
+    @patch('lib.db.DBConnection.execute_query', return_value=[{'name': 'Football', 'id': 1}])
+    def test_ids_by_name__cached_until_table_written(self, mock_execute):
+        db = DBConnection('test', name_ids=LRUCache())
+        sports = db.repository('sports')
+        self.assertDictEqual({'Football': 1}, sports.ids_by_name(['Football', 'Golf', 'Football']))
+        mock_execute.assert_called_with("SELECT name, id FROM sports WHERE name IN (%s, %s)", database='test',
+                                        result_req=True, params=('Football', 'Golf'))
+        self.assertEqual(1, sports.id_by_name('Football'))
+        self.assertEqual(1, mock_execute.call_count)
+        db.invalidate('sports')
+        self.assertEqual(1, sports.id_by_name('Football'))
+        self.assertEqual(2, mock_execute.call_count)
+        self.assertEqual(1, db.name_id_stats()['hits'])
+
+    @patch('lib.backends.connect')
+    def test_transaction__reads_bypass_cache(self, mock_connect):
+        db = DBConnection('test', 'test_table', cache=LRUCache())
+        with db.transaction():
+            db.select_all_from_table()
+        self.assertEqual(0, db.cache_stats()['size'])
+
+    @patch('lib.backends.connect')
+    def test_execute_query__prepares_parameterized_statement_once(self, mock_connect):
+        db = DBConnection('test', 'test_table', pool_config={'size': 1})
+        prepared = mock_connect.return_value.cursor.return_value
+        prepared.with_rows = False
+        db.delete_row('name', 'a')
+        db.delete_row('name', 'b')
+        mock_connect.return_value.cursor.assert_called_once_with(prepared=True)
+        self.assertEqual(2, prepared.execute.call_count)
+        self.assertEqual(0, prepared.close.call_count)
+        self.assertEqual({'hits': 1, 'misses': 1, 'evictions': 0}, db.pool._idle[0].statements.stats)
+
+    @patch('lib.backends.connect')
+    def test_execute_query__unparameterized_statement_not_prepared(self, mock_connect):
+        db = DBConnection('test', 'test_table', pool_config={'size': 1})
+        db.execute_query(self.query, database='test')
+        db.execute_query("CREATE INDEX idx ON test_table (name)", database='test', params=())
+        self.assertEqual(2, mock_connect.return_value.cursor.call_count)
+        mock_connect.return_value.cursor.assert_called_with()
+        self.assertEqual(2, mock_connect.return_value.cursor.return_value.close.call_count)
+
+    @patch('lib.backends.connect')
+    def test_execute_query__failed_statement_discarded(self, mock_connect):
+        db = DBConnection('test', 'test_table', pool_config={'size': 1})
+        prepared = mock_connect.return_value.cursor.return_value
+        prepared.execute.side_effect = Error('Deadlock')
+        self.assertRaises(Error, db.delete_row, 'name', 'a')
+        self.assertEqual(1, prepared.close.call_count)
+        self.assertEqual(0, len(db.pool._idle[0].statements))
+
+    @patch('lib.backends.connect')
+    def test_execute_query__statement_cache_disabled(self, mock_connect):
+        db = DBConnection('test', 'test_table', pool_config={'size': 1}, statement_cache_size=0)
+        db.delete_row('name', 'a')
+        mock_connect.return_value.cursor.assert_called_once_with()
+
+    @patch('lib.backends.connect')
+    def test_execute_query__records_query_metrics(self, mock_connect):
+        metrics = Metrics()
+        db = DBConnection('test', 'test_table', pool_config={'size': 1}, metrics=metrics)
+        cursor = mock_connect.return_value.cursor.return_value
+        cursor.description = [('name',)]
+        cursor.fetchall.return_value = [('Test1',), ('Test2',)]
+        metrics.start_request()
+        db.select_all_from_table_by_key_value('name', 'Test1')
+        cursor.execute.side_effect = Error('Deadlock')
+        with patch('builtins.print'):
+            self.assertRaises(Error, db.delete_row, 'name', 'a')
+        self.assertEqual(2, metrics.end_request('GET', '/test', 200))
+        self.assertEqual(1, metrics.connect_duration.count())
+        self.assertEqual(1, metrics.query_duration.count('SELECT', 'test_table'))
+        self.assertEqual(1, metrics.query_rows.count('SELECT', 'test_table'))
+        self.assertEqual(1, metrics.query_errors.value('DELETE', 'test_table'))
+
+    @patch('lib.backends.connect')
+    @patch('lib.metrics.print')
+    def test_execute_query__logs_slow_query(self, mock_print, mock_connect):
+        metrics = Metrics(slow_query_threshold=0)
+        db = DBConnection('test', 'test_table', metrics=metrics)
+        db.delete_row('name', 'a')
+        self.assertEqual(1, metrics.slow_queries.value('DELETE', 'test_table'))
+        self.assertIn("DELETE FROM test_table WHERE name = %s, params: ('a',)", mock_print.call_args[0][0])
 
     def test_get_result__success(self):
         cursor = Mock()
@@ -66,6 +330,15 @@ class DBUnitTests(unittest.TestCase):
         mock_execute.assert_any_call("SET time_zone = '+00:00'")
         mock_execute.assert_called_with("CREATE DATABASE test")
 
+    @patch('lib.db.DBConnection.execute_query')
+    def test_create_database__exists_ok_skips_existing(self, mock_execute):
+        mock_execute.return_value = [{'schema_name': 'test'}]
+        self.db.create_database(exists_ok=True)
+        self.assertEqual(1, mock_execute.call_count)
+        mock_execute.return_value = []
+        self.db.create_database(exists_ok=True)
+        mock_execute.assert_called_with("CREATE DATABASE test")
+
     @patch('lib.db.DBConnection.execute_query')
     def test_drop_database__success(self, mock_execute):
         self.db.drop_database()
@@ -81,6 +354,12 @@ class DBUnitTests(unittest.TestCase):
         self.assertEqual(1, mock_execute.call_count)
         mock_execute.assert_called_with(expected, database='test')
 
+    @patch('lib.db.DBConnection.execute_query')
+    def test_create_index__success(self, mock_execute):
+        self.db.create_index('idx_test', ['name', 'active'])
+        self.assertEqual(1, mock_execute.call_count)
+        mock_execute.assert_called_with("CREATE INDEX idx_test ON test_table (name, active)", database='test')
+
     @patch('lib.db.DBConnection.execute_query')
     def test_drop_table__success(self, mock_execute):
         self.db.drop_table()
@@ -91,9 +370,25 @@ class DBUnitTests(unittest.TestCase):
     def test_insert_into_table__success(self, mock_execute):
         values = [('Test1', False), ('Test2', True), ('Test3', True)]
         self.db.insert_into_table(self.columns, values)
-        expected = "INSERT INTO test_table (name, active) VALUES ('Test1', False), ('Test2', True), ('Test3', True)"
+        expected = "INSERT INTO test_table (name, active) VALUES (%s, %s), (%s, %s), (%s, %s)"
+        self.assertEqual(1, mock_execute.call_count)
+        mock_execute.assert_called_with(
+            expected, database='test', commit=True, params=('Test1', False, 'Test2', True, 'Test3', True))
+
+    @patch('lib.db.DBConnection.execute_query')
+    def test_insert_rows__success(self, mock_execute):
+        values = [('Test1', False), ('Test2', True)]
+        self.db.insert_rows(self.columns, values)
         self.assertEqual(1, mock_execute.call_count)
-        mock_execute.assert_called_with(expected, database='test', commit=True)
+        mock_execute.assert_called_with(
+            "INSERT INTO test_table (name, active) VALUES (%s, %s)", database='test', commit=True, params=values,
+            many=True)
+
+    @patch('lib.backends.connect')
+    def test_execute_query__executes_many(self, mock_connect):
+        self.db.execute_query(self.query, database='test', params=[(1,), (2,)], many=True)
+        mock_connect.return_value.cursor.return_value.executemany.assert_called_with(self.query, [(1,), (2,)])
+        self.assertEqual(0, mock_connect.return_value.cursor.return_value.execute.call_count)
 
     @patch('lib.db.DBConnection.execute_query')
     def test_update_row__success(self, mock_execute):
@@ -101,14 +396,87 @@ class DBUnitTests(unittest.TestCase):
         self.db.update_row(values, 'col', 'value')
         self.assertEqual(1, mock_execute.call_count)
         mock_execute.assert_called_with(
-            "UPDATE test_table SET key = '1', key1 = '2' WHERE col = 'value'", database='test', commit=True)
+            "UPDATE test_table SET key = %s, key1 = %s WHERE col = %s", database='test', commit=True,
+            params=(1, 2, 'value'))
 
     @patch('lib.db.DBConnection.execute_query')
     def test_update_rows_inactive__success(self, mock_execute):
         self.db.update_rows_inactive('key', 'value')
         self.assertEqual(1, mock_execute.call_count)
         mock_execute.assert_called_with(
-            "UPDATE test_table SET active = 0 WHERE key = 'value'", database='test', commit=True)
+            "UPDATE test_table SET active = 0 WHERE key = %s", database='test', commit=True, params=('value',))
+
+    @patch('lib.db.DBConnection.execute_query')
+    def test_update_active_rows__success(self, mock_execute):
+        self.db.update_active_rows({'active': 0, 'status': 3}, 'sport', 'value')
+        self.assertEqual(1, mock_execute.call_count)
+        mock_execute.assert_called_with(
+            "UPDATE test_table SET active = %s, status = %s WHERE sport = %s AND active = 1", database='test',
+            commit=True, params=(0, 3, 'value'))
+
+    @patch('lib.db.DBConnection.execute_query')
+    def test_update_rows_by_key__one_case_statement(self, mock_execute):
+        self.db.update_rows_by_key('price', 'name', {'a': '1.50', 'b': '2.00'}, filters={'active': 1})
+        mock_execute.assert_called_once_with(
+            "UPDATE test_table SET price = CASE name WHEN %s THEN %s WHEN %s THEN %s END WHERE name IN (%s, %s) "
+            "AND active = %s", database='test', commit=True, params=('a', '1.50', 'b', '2.00', 'a', 'b', 1))
+
+    @patch('lib.db.DBConnection.execute_query', return_value=["Some Output"])
+    def test_select_by_key_values__one_in_query(self, mock_execute):
+        self.assertListEqual(["Some Output"], self.db.select_by_key_values(['name'], 'event', ['a', 'b'],
+                                                                           filters={'active': 1}))
+        mock_execute.assert_called_once_with(
+            "SELECT name FROM test_table WHERE event IN (%s, %s) AND active = %s", database='test', result_req=True,
+            params=('a', 'b', 1))
+
+    @patch('lib.db.DBConnection.execute_query', return_value=["Some Output"])
+    def test_select_by_parent__parent_subquery(self, mock_execute):
+        self.assertListEqual(["Some Output"], self.db.select_by_parent(
+            ['name'], 'event_id', 'events', 'sport_id', 1, filters={'active': 1}))
+        mock_execute.assert_called_once_with(
+            "SELECT name FROM test_table WHERE event_id IN (SELECT id FROM events WHERE sport_id = %s) "
+            "AND active = %s", database='test', result_req=True, params=(1, 1))
+
+    @patch('lib.db.DBConnection.execute_query')
+    def test_update_rows_by_key__sets_constants(self, mock_execute):
+        self.db.update_rows_by_key('outcome', 'name', {'a': 3}, filters={'event': 'e'}, constants={'active': 0})
+        mock_execute.assert_called_once_with(
+            "UPDATE test_table SET outcome = CASE name WHEN %s THEN %s END, active = %s WHERE name IN (%s) "
+            "AND event = %s", database='test', commit=True, params=('a', 3, 0, 'a', 'e'))
+
+    @patch('lib.db.DBConnection.execute_query')
+    def test_update_rows_by_key_values__one_in_statement(self, mock_execute):
+        self.db.update_rows_by_key_values({'status': 1, 'type': 1}, 'name', ['a', 'b'], filters={'status': 0})
+        mock_execute.assert_called_once_with(
+            "UPDATE test_table SET status = %s, type = %s WHERE name IN (%s, %s) AND status = %s", database='test',
+            commit=True, params=(1, 1, 'a', 'b', 0))
+
+    @patch('lib.db.DBConnection.execute_query', return_value=["Some Output"])
+    def test_select_between__uncached_range_query(self, mock_execute):
+        db = DBConnection('test', 'test_table', cache=LRUCache())
+        self.assertListEqual(["Some Output"], db.select_between(['name'], 'start', 1, 2, filters={'status': 0}))
+        mock_execute.assert_called_once_with(
+            "SELECT name FROM test_table WHERE status = %s AND start BETWEEN %s AND %s ORDER BY start",
+            database='test', result_req=True, params=(0, 1, 2))
+        self.assertEqual(0, db.cache_stats()['size'])
+
+    @patch('lib.db.DBConnection.execute_query')
+    def test_update_active_rows_by_parent__success(self, mock_execute):
+        self.db.update_active_rows_by_parent({'active': 0}, 'event_id', 'events', 'sport_id', 1)
+        self.assertEqual(1, mock_execute.call_count)
+        mock_execute.assert_called_with(
+            "UPDATE test_table SET active = %s WHERE active = 1 AND event_id IN "
+            "(SELECT id FROM events WHERE sport_id = %s)", database='test', commit=True, params=(0, 1))
+
+    @patch('lib.db.DBConnection.execute_query')
+    def test_update_parent_if_children_inactive__success(self, mock_execute):
+        self.db.update_parent_if_children_inactive({'active': 0}, 'events', 'sport_id', 'id', 1)
+        self.assertEqual(1, mock_execute.call_count)
+        mock_execute.assert_called_with(
+            "UPDATE test_table SET active = %s WHERE active = 1 AND id IN "
+            "(SELECT sport_id FROM events WHERE id = %s) AND NOT EXISTS "
+            "(SELECT 1 FROM events WHERE events.sport_id = test_table.id AND events.active = 1)", database='test',
+            commit=True, params=(0, 1))
 
     @patch('lib.db.DBConnection.execute_query', return_value=["Some Output"])
     def test_select_all_from_table__success(self, mock_execute):
@@ -117,18 +485,48 @@ class DBUnitTests(unittest.TestCase):
         self.assertEqual(1, mock_execute.call_count)
         mock_execute.assert_called_with("SELECT * FROM test_table", database='test', result_req=True)
 
+    @patch('lib.db.DBConnection.stream_query')
+    def test_stream_all_from_table__success(self, mock_stream):
+        self.db.stream_all_from_table(batch_size=10)
+        mock_stream.assert_called_with("SELECT * FROM test_table", batch_size=10)
+
+    @patch('lib.db.DBConnection.execute_query', return_value=["Some Output"])
+    def test_select_page__first_page(self, mock_execute):
+        self.db.select_page(['name', 'active'], ['name'], 11)
+        mock_execute.assert_called_with(
+            "SELECT name, active FROM test_table ORDER BY name LIMIT %s", database='test', result_req=True,
+            params=(11,))
+
+    @patch('lib.db.DBConnection.execute_query', return_value=["Some Output"])
+    def test_select_page__after_cursor_with_filters(self, mock_execute):
+        self.db.select_page(['name'], ['scheduled_start', 'name'], 11, after=['2021-10-15', 'a'], filters={'active': 1})
+        mock_execute.assert_called_with(
+            "SELECT name FROM test_table WHERE active = %s AND (scheduled_start, name) > (%s, %s) "
+            "ORDER BY scheduled_start, name LIMIT %s", database='test', result_req=True,
+            params=(1, '2021-10-15', 'a', 11))
+
     @patch('lib.db.DBConnection.execute_query', return_value=["Some Output"])
     def test_select_all_from_table_by_key_value__success(self, mock_execute):
         res = self.db.select_all_from_table_by_key_value('key', 'val')
         self.assertIsNotNone(res)
         self.assertEqual(1, mock_execute.call_count)
-        mock_execute.assert_called_with("SELECT * FROM test_table WHERE key = 'val'", database='test', result_req=True)
+        mock_execute.assert_called_with(
+            "SELECT * FROM test_table WHERE key = %s", database='test', result_req=True, params=('val',))
 
     @patch('lib.db.DBConnection.execute_query')
     def test_delete_row__success(self, mock_execute):
         self.db.delete_row('key', 'value')
         self.assertEqual(1, mock_execute.call_count)
-        mock_execute.assert_called_with("DELETE FROM test_table WHERE key = 'value'", database='test', commit=True)
+        mock_execute.assert_called_with(
+            "DELETE FROM test_table WHERE key = %s", database='test', commit=True, params=('value',))
+
+    @patch('lib.db.DBConnection.execute_query')
+    def test_delete_rows_by_parent__success(self, mock_execute):
+        self.db.delete_rows_by_parent('event_id', 'events', 'sport_id', 1)
+        self.assertEqual(1, mock_execute.call_count)
+        mock_execute.assert_called_with(
+            "DELETE FROM test_table WHERE event_id IN (SELECT id FROM events WHERE sport_id = %s)", database='test',
+            commit=True, params=(1,))
 
 
 if __name__ == '__main__':
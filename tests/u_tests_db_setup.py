@@ -1,24 +1,50 @@
 import unittest
 
-from mock import patch
+from mock import MagicMock, patch
 
-from lib.db_setup import setup_db, SPORTS_VALUES, EVENTS_VALUES, SELECTIONS_VALUES
+from lib.db import DBConnection
+from lib.db_setup import (create_tables, setup_db, seed_dataset, with_parent_ids, EVENTS_TABLE, SPORTS_TABLE,
+                          SPORTS_VALUES, EVENTS_VALUES, SELECTIONS_VALUES, TABLE_INDEXES)
 
 
 class DbSetupUnitTests(unittest.TestCase):
 
+    @patch('lib.migrations.MigrationRunner.migrate')
     @patch('lib.db.DBConnection.drop_database')
-    @patch('lib.db.DBConnection.create_database')
-    @patch('lib.db.DBConnection.create_table')
-    @patch('lib.db.DBConnection.insert_into_table')
-    def test_setup_db__creates_all_tables(self, mock_insert, mock_create_table, mock_create_db, _):
+    def test_setup_db__drops_and_migrates_database(self, mock_drop_db, mock_migrate):
         setup_db('test')
-        self.assertEqual(1, mock_create_db.call_count)
+        self.assertEqual(1, mock_drop_db.call_count)
+        self.assertEqual(1, mock_migrate.call_count)
+
+    @patch('lib.db.DBConnection.create_table')
+    @patch('lib.db.DBConnection.create_index')
+    def test_create_tables__creates_all_tables(self, mock_create_index, mock_create_table):
+        create_tables(DBConnection('test'))
         self.assertEqual(3, mock_create_table.call_count)
         mock_create_table.assert_any_call(SPORTS_VALUES)
         mock_create_table.assert_any_call(EVENTS_VALUES)
         mock_create_table.assert_called_with(SELECTIONS_VALUES)
-        self.assertEqual(3, mock_insert.call_count)
+        self.assertEqual(sum(len(indexes) for indexes in TABLE_INDEXES.values()), mock_create_index.call_count)
+        mock_create_index.assert_any_call('idx_events_sport_id_active', ['sport_id', 'active'])
+
+    @patch('lib.db.DBConnection.ids_by_name', side_effect=lambda names: {name: 1 for name in names})
+    @patch('lib.db.DBConnection.insert_rows')
+    def test_seed_dataset__loads_every_level_in_chunks(self, mock_insert, mock_ids):
+        seed_dataset('test', sports=2, events=3, selections=4, chunk_size=10)
+        inserted = sum(len(call[0][1]) for call in mock_insert.call_args_list)
+        self.assertEqual(2 + 6 + 24, inserted)
+        self.assertEqual(1 + 1 + 3, mock_insert.call_count)
+        self.assertEqual(1 + 3, mock_ids.call_count)
+
+    def test_with_parent_ids__unknown_parent(self):
+        connection = MagicMock()
+        connection.repository.return_value.ids_by_name.return_value = {'Football': 1}
+        self.assertEqual(
+            (['name', 'sport_id', 'active'], [('Race', 1, 1)]),
+            with_parent_ids(connection, EVENTS_TABLE, ['name', 'sport', 'active'], [('Race', 'Football', 1)]))
+        connection.repository.assert_called_with(SPORTS_TABLE)
+        self.assertRaisesRegex(ValueError, 'Unknown sport: Golf', with_parent_ids, connection, EVENTS_TABLE,
+                               ['name', 'sport'], [('Race', 'Football'), ('Open', 'Golf')])
 
 
 if __name__ == '__main__':
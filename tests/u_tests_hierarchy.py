@@ -0,0 +1,62 @@
+import unittest
+from datetime import datetime
+from decimal import Decimal
+
+from lib.hierarchy import TREE_COLUMNS, TREE_ORDER, build_tree, tree_query
+
+START = datetime(2021, 10, 16, 20, 0, 0)
+
+
+def tree_row(sport, event=None, selection=None):
+    row = {'t_name': sport, 't_slug': sport.lower(), 't_active': 1}
+    for column in ('name', 'slug', 'active', 'type', 'status', 'scheduled_start', 'actual_start', 'sport'):
+        row[f"t1_{column}"] = None
+    for column in ('name', 'active', 'price', 'outcome', 'event'):
+        row[f"t2_{column}"] = None
+    if event:
+        row.update({'t1_name': event, 't1_slug': event.lower(), 't1_active': 1, 't1_type': 0, 't1_status': 0,
+                    't1_scheduled_start': START, 't1_sport': sport})
+    if selection:
+        row.update({'t2_name': selection, 't2_active': 0, 't2_price': Decimal('2.50'), 't2_outcome': 3,
+                    't2_event': event})
+    return row
+
+
+class HierarchyUnitTests(unittest.TestCase):
+
+    def test_tree_query__unscoped_outer_joins(self):
+        query, params = tree_query()
+        self.assertEqual(f"SELECT {TREE_COLUMNS} FROM sports t LEFT JOIN events t1 ON t1.sport_id = t.id "
+                         f"LEFT JOIN selections t2 ON t2.event_id = t1.id {TREE_ORDER}", query)
+        self.assertEqual((), params)
+        self.assertIn("t1.scheduled_start AS t1_scheduled_start", TREE_COLUMNS)
+
+    def test_tree_query__scoped_active_only(self):
+        query, params = tree_query(sport='Football', event='World Cup 2022', active=True)
+        self.assertIn("LEFT JOIN events t1 ON t1.sport_id = t.id AND t1.active = 1 "
+                      "LEFT JOIN selections t2 ON t2.event_id = t1.id AND t2.active = 1", query)
+        self.assertTrue(query.endswith(f"WHERE t.active = 1 AND t.name = %s AND t1.name = %s {TREE_ORDER}"))
+        self.assertEqual(('Football', 'World Cup 2022'), params)
+
+    def test_build_tree__groups_rows_in_order(self):
+        tree = build_tree([tree_row('Football', 'Cup', 'Norway Win'), tree_row('Football', 'Cup', 'Draw'),
+                           tree_row('Football', 'League'), tree_row('Golf')])
+        self.assertListEqual(['Football', 'Golf'], [sport['name'] for sport in tree])
+        football, golf = tree
+        self.assertEqual({'name': 'Football', 'slug': 'football', 'active': True}, {
+            key: value for key, value in football.items() if key != 'events'})
+        self.assertListEqual(['Cup', 'League'], [event['name'] for event in football['events']])
+        cup, league = football['events']
+        self.assertEqual(('Status.PENDING', 'EventType.PREPLAY', START),
+                         (cup['status'], cup['type'], cup['scheduled_start']))
+        selection = {'active': False, 'price': Decimal('2.50'), 'outcome': 'Outcome.WIN', 'event': 'Cup'}
+        self.assertListEqual([dict(selection, name='Norway Win'), dict(selection, name='Draw')], cup['selections'])
+        self.assertListEqual([], league['selections'])
+        self.assertListEqual([], golf['events'])
+
+    def test_build_tree__empty(self):
+        self.assertListEqual([], build_tree([]))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,68 @@
+import unittest
+
+from mock import patch
+
+from lib.metrics import Counter, Histogram, Metrics, query_labels
+
+
+class MetricsUnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = Metrics(slow_query_threshold=0.5)
+
+    def test_query_labels__statement_and_first_table(self):
+        self.assertEqual(('SELECT', 'sports'), query_labels("SELECT * FROM sports WHERE name = %s"))
+        self.assertEqual(('INSERT', 'events'), query_labels("INSERT INTO events (name) VALUES (%s)"))
+        self.assertEqual(('UPDATE', 'events'), query_labels(
+            "UPDATE events SET active = %s WHERE name IN (SELECT event FROM selections WHERE name = %s)"))
+        self.assertEqual(('DELETE', 'selections'), query_labels(
+            "DELETE FROM selections WHERE event IN (SELECT name FROM events WHERE sport = %s)"))
+        self.assertEqual(('SET', ''), query_labels("SET time_zone = '+00:00'"))
+
+    def test_histogram__cumulative_buckets(self):
+        histogram = Histogram('latency', 'Latency.', ('route',), buckets=(1, 5))
+        for value in (0.5, 3, 3, 10):
+            histogram.observe(value, '/sports')
+        self.assertListEqual([
+            '# HELP latency Latency.', '# TYPE latency histogram',
+            'latency_bucket{route="/sports",le="1"} 1', 'latency_bucket{route="/sports",le="5"} 3',
+            'latency_bucket{route="/sports",le="+Inf"} 4', 'latency_sum{route="/sports"} 16.5',
+            'latency_count{route="/sports"} 4'], histogram.render())
+
+    def test_counter__escapes_label_values(self):
+        counter = Counter('errors_total', 'Errors.', ('table',))
+        counter.inc('a"b')
+        counter.inc('a"b', amount=2)
+        self.assertEqual('errors_total{table="a\\"b"} 3', counter.render()[-1])
+
+    def test_end_request__counts_queries_of_request(self):
+        self.assertIsNone(self.metrics.end_request('GET', '/sports', 200))
+        self.metrics.start_request()
+        self.metrics.observe_query("SELECT * FROM sports", 0.01, rows=3)
+        self.metrics.observe_query("SELECT * FROM events", 0.01, rows=0)
+        self.assertEqual(2, self.metrics.end_request('GET', '/sports', 200))
+        self.assertEqual(1, self.metrics.request_duration.count('GET', '/sports', 200))
+        self.metrics.observe_query("SELECT * FROM sports", 0.01, rows=3)
+        self.assertEqual(1, self.metrics.request_queries.count('GET', '/sports'))
+        self.assertEqual(2, self.metrics.query_duration.count('SELECT', 'sports'))
+
+    @patch('lib.metrics.print')
+    def test_observe_query__logs_slow_query_above_threshold(self, mock_print):
+        self.metrics.observe_query("SELECT * FROM sports", 0.1)
+        mock_print.assert_not_called()
+        self.metrics.observe_query("SELECT * FROM sports WHERE name = %s", 0.75, params=('Football',))
+        mock_print.assert_called_once_with(
+            "Slow query: 750.0ms, SELECT * FROM sports WHERE name = %s, params: ('Football',)")
+        self.assertEqual(1, self.metrics.slow_queries.value('SELECT', 'sports'))
+
+    def test_render__exports_numeric_gauges(self):
+        self.metrics.observe_connect(0.002)
+        text = self.metrics.render({'db_pool_idle': 2, 'db_cache_ttl': None})
+        self.assertIn('db_connect_duration_seconds_count 1\n', text)
+        self.assertIn('# TYPE db_pool_idle gauge\ndb_pool_idle 2\n', text)
+        self.assertNotIn('db_cache_ttl', text)
+        self.assertTrue(text.endswith('\n'))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
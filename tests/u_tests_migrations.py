@@ -0,0 +1,127 @@
+import threading
+import unittest
+
+from mock import MagicMock, patch
+
+from lib.backends import SQLiteBackend
+from lib.db import DBConnection
+from lib.db_setup import create_tables, setup_db, EVENTS_TABLE, SELECTIONS_TABLE, SPORTS_TABLE
+from lib.migrations import (BASELINE_VERSION, MIGRATIONS, SCHEMA_TABLE, MigrationRunner, create_v1_tables,
+                            insert_v1_sample_data)
+
+NEXT_VERSION = MIGRATIONS[-1][0] + 1
+
+
+class MigrationRunnerUnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.database = self.id().rsplit('.', 1)[-1]
+        self.backend = SQLiteBackend()
+        self.db = DBConnection(self.database, pool_config={'size': 2}, backend=self.backend)
+
+    def tearDown(self):
+        self.db.drop_database()
+
+    def migrate(self, **kwargs):
+        with patch('builtins.print'):
+            return MigrationRunner(self.db, **kwargs).migrate()
+
+    def test_migrate__creates_schema_once(self):
+        self.assertListEqual([version for version, _, _ in MIGRATIONS], self.migrate())
+        self.assertEqual('World Cup 2022', self.db.repository(EVENTS_TABLE).select_all_from_table()[0]['name'])
+        with patch('lib.db.DBConnection.execute_query', wraps=self.db.execute_query) as mock_execute:
+            self.assertListEqual([], self.migrate())
+        self.assertEqual(1, mock_execute.call_count)
+        self.assertEqual(1, len(self.db.repository(SPORTS_TABLE).select_all_from_table()))
+
+    def test_migrate__applies_only_missing_steps(self):
+        self.migrate()
+        step = MagicMock()
+        migrations = MIGRATIONS + [(NEXT_VERSION, 'Add a column', step)]
+        self.assertListEqual([NEXT_VERSION], self.migrate(migrations=migrations))
+        step.assert_called_once_with(self.db)
+        self.assertEqual(NEXT_VERSION, MigrationRunner(self.db).current_version())
+
+    def test_migrate__records_existing_schema_as_baseline(self):
+        with patch('builtins.print'):
+            self.db.create_database()
+        create_v1_tables(self.db)
+        insert_v1_sample_data(self.db)
+        self.assertListEqual([version for version, _, _ in MIGRATIONS if version > BASELINE_VERSION], self.migrate())
+        self.assertEqual(MIGRATIONS[-1][0], MigrationRunner(self.db).current_version())
+        self.assertEqual(1, len(self.db.repository(SPORTS_TABLE).select_all_from_table()))
+
+    def test_migrate__database_from_setup_db_is_up_to_date(self):
+        with patch('builtins.print'):
+            setup_db(self.database, backend=self.backend)
+        self.assertListEqual([], self.migrate())
+        self.assertEqual(MIGRATIONS[-1][0], MigrationRunner(self.db).current_version())
+        self.assertEqual('Football', self.db.repository(EVENTS_TABLE).select_all_from_table()[0]['sport'])
+
+    def test_migrate__records_unversioned_schema_by_its_columns(self):
+        with patch('builtins.print'):
+            self.db.create_database()
+        create_tables(self.db)
+        self.assertListEqual([], self.migrate())
+        self.assertEqual(MIGRATIONS[-1][0], MigrationRunner(self.db).current_version())
+        self.assertNotIn(f"{EVENTS_TABLE}_rebuild", self.backend.table_names(self.db))
+
+    def test_add_surrogate_keys__keeps_rows_and_sets_parent_ids(self):
+        with patch('builtins.print'):
+            self.db.create_database()
+        create_v1_tables(self.db)
+        insert_v1_sample_data(self.db)
+        self.db.repository(SPORTS_TABLE).insert_into_table(['name', 'slug', 'active'], [('Golf', 'golf', 0)])
+        self.migrate()
+        sports = {row['name']: row['id'] for row in self.db.repository(SPORTS_TABLE).select_all_from_table()}
+        self.assertListEqual(['Football', 'Golf'], sorted(sports))
+        event = self.db.repository(EVENTS_TABLE).select_all_from_table()[0]
+        self.assertEqual((sports['Football'], 'Football'), (event['sport_id'], event['sport']))
+        selection = self.db.repository(SELECTIONS_TABLE).select_all_from_table()[0]
+        self.assertEqual((event['id'], 'World Cup 2022'), (selection['event_id'], selection['event']))
+        self.assertNotIn(f"{SPORTS_TABLE}_rebuild", self.backend.table_names(self.db))
+
+    def test_drop_parent_names__keeps_ids_and_reads_parent_names_by_id(self):
+        self.migrate(migrations=MIGRATIONS[:3])
+        self.db.repository(SPORTS_TABLE).insert_into_table(['name', 'slug', 'active'], [('Golf', 'golf', 1)])
+        self.db.repository(EVENTS_TABLE).update_row({'sport_id': 2}, 'name', 'World Cup 2022')
+        self.db.repository(SPORTS_TABLE).delete_row('name', 'Football')
+        self.migrate()
+        event = self.db.repository(EVENTS_TABLE).select_all_from_table()[0]
+        self.assertEqual((2, 'Golf'), (event['sport_id'], event['sport']))
+        rows = self.db.execute_query(f"SELECT * FROM {EVENTS_TABLE}", database=self.database, result_req=True)
+        self.assertNotIn('sport', rows[0])
+        selection = self.db.repository(SELECTIONS_TABLE).select_all_from_table()[0]
+        self.assertEqual((event['id'], 'World Cup 2022'), (selection['event_id'], selection['event']))
+
+    def test_migrate__failed_step_is_retried(self):
+        step = MagicMock(side_effect=[RuntimeError('fail'), None])
+        migrations = MIGRATIONS + [(NEXT_VERSION, 'Add a column', step)]
+        self.assertRaises(RuntimeError, self.migrate, migrations=migrations)
+        self.assertEqual(MIGRATIONS[-1][0], MigrationRunner(self.db).current_version())
+        self.assertListEqual([NEXT_VERSION], self.migrate(migrations=migrations))
+
+    def test_migrate__concurrent_runners_apply_steps_once(self):
+        step = MagicMock(side_effect=lambda db: threading.Event().wait(0.05))
+        migrations = MIGRATIONS + [(NEXT_VERSION, 'Slow step', step)]
+        results = []
+        with patch('builtins.print'):
+            threads = [threading.Thread(target=lambda: results.append(MigrationRunner(self.db, migrations).migrate()))
+                       for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(1, step.call_count)
+        self.assertEqual(1, sum(1 for applied in results if applied))
+        self.assertEqual(NEXT_VERSION, len(self.db.execute_query(
+            f"SELECT version FROM {SCHEMA_TABLE}", database=self.database, result_req=True)))
+
+    def test_migrate__times_out_waiting_for_lock(self):
+        self.backend.try_lock(None, 'schema_migrations')
+        self.assertRaisesRegex(RuntimeError, 'Timed out', self.migrate, lock_timeout=0.05, poll_seconds=0.01)
+        self.backend.release_lock(None, 'schema_migrations')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,59 @@
+import unittest
+from datetime import datetime
+
+from mock import Mock
+
+from lib.pagination import (InvalidPageRequest, decode_cursor, encode_cursor, fetch_page, is_page_request,
+                            parse_page_args)
+
+
+class PaginationUnitTests(unittest.TestCase):
+
+    def test_is_page_request__detects_paging_args(self):
+        self.assertTrue(is_page_request({'limit': '10'}))
+        self.assertFalse(is_page_request({'stream': 'json'}))
+
+    def test_cursor__round_trips(self):
+        row = {'scheduled_start': datetime(2021, 10, 15, 19, 30), 'name': 'Race'}
+        token = encode_cursor(row, ['scheduled_start', 'name'])
+        self.assertListEqual(['2021-10-15 19:30:00', 'Race'], decode_cursor(token, ['scheduled_start', 'name']))
+
+    def test_decode_cursor__rejects_bad_token(self):
+        self.assertRaises(InvalidPageRequest, decode_cursor, '!!!', ['name'])
+        self.assertRaises(InvalidPageRequest, decode_cursor, encode_cursor({'name': 'a'}, ['name']),
+                          ['scheduled_start', 'name'])
+
+    def test_parse_page_args__defaults(self):
+        page = parse_page_args('sports', {})
+        self.assertEqual({'columns': ['name', 'slug', 'active'], 'order_by': ['name'], 'limit': 100, 'after': None,
+                          'filters': {}, 'fields': ['name', 'slug', 'active']}, page)
+
+    def test_parse_page_args__projection_adds_order_columns(self):
+        page = parse_page_args('events', {'fields': 'status', 'order': 'scheduled_start', 'active': 'true'})
+        self.assertListEqual(['status', 'scheduled_start', 'name'], page['columns'])
+        self.assertListEqual(['status'], page['fields'])
+        self.assertEqual({'active': 1}, page['filters'])
+
+    def test_parse_page_args__rejects_invalid_args(self):
+        for args in [{'fields': 'password'}, {'limit': '0'}, {'limit': 'ten'}, {'order': 'price'},
+                     {'active': 'maybe'}]:
+            self.assertRaises(InvalidPageRequest, parse_page_args, 'selections', args)
+
+    def test_fetch_page__returns_next_cursor_when_more_rows(self):
+        db = Mock(table='selections')
+        db.select_page.return_value = [{'name': 'a', 'outcome': 0}, {'name': 'b', 'outcome': 3}]
+        rows, next_cursor = fetch_page(db, {'limit': '1', 'fields': 'outcome'})
+        db.select_page.assert_called_with(['outcome', 'name'], ['name'], 2, after=None, filters={})
+        self.assertListEqual([{'outcome': 'Outcome.UNSETTLED'}], rows)
+        self.assertListEqual(['a'], decode_cursor(next_cursor, ['name']))
+
+    def test_fetch_page__last_page_has_no_cursor(self):
+        db = Mock(table='sports')
+        db.select_page.return_value = [{'name': 'a', 'slug': 'a', 'active': 1}]
+        rows, next_cursor = fetch_page(db, {'limit': '5'})
+        self.assertListEqual([{'name': 'a', 'slug': 'a', 'active': True}], rows)
+        self.assertIsNone(next_cursor)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,71 @@
+import unittest
+
+from mock import Mock, patch
+
+from lib.pool import ConnectionPool, PoolExhaustedError
+
+
+class PoolUnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.factory = Mock(side_effect=lambda: Mock())
+        self.pool = ConnectionPool(self.factory, size=1, max_overflow=1, idle_timeout=60, checkout_timeout=0)
+
+    def test_acquire__creates_connection(self):
+        pooled = self.pool.acquire()
+        self.assertEqual(1, self.factory.call_count)
+        self.assertFalse(pooled.overflow)
+        self.assertEqual(1, self.pool.stats()['in_use'])
+
+    def test_acquire__reuses_released_connection(self):
+        pooled = self.pool.acquire()
+        self.pool.release(pooled)
+        self.assertIs(pooled, self.pool.acquire())
+        self.assertEqual(1, self.factory.call_count)
+        self.assertEqual(1, self.pool.stats()['reused'])
+
+    def test_acquire__discards_unhealthy_connection(self):
+        pooled = self.pool.acquire()
+        pooled.connection.is_connected.return_value = False
+        self.pool.release(pooled)
+        self.assertIsNot(pooled, self.pool.acquire())
+        self.assertEqual(1, pooled.connection.close.call_count)
+        self.assertEqual(1, self.pool.stats()['discarded'])
+
+    @patch('lib.pool.time.monotonic')
+    def test_acquire__expires_idle_connection(self, mock_time):
+        mock_time.return_value = 0
+        pooled = self.pool.acquire()
+        self.pool.release(pooled)
+        mock_time.return_value = 61
+        self.assertIsNot(pooled, self.pool.acquire())
+        self.assertEqual(1, self.pool.stats()['expired'])
+
+    def test_acquire__overflow_closed_on_release(self):
+        self.pool.acquire()
+        overflow = self.pool.acquire()
+        self.assertTrue(overflow.overflow)
+        self.pool.release(overflow)
+        self.assertEqual(1, overflow.connection.close.call_count)
+        self.assertEqual(0, self.pool.stats()['idle'])
+
+    def test_acquire__raises_when_exhausted(self):
+        self.pool.acquire()
+        self.pool.acquire()
+        self.assertRaises(PoolExhaustedError, self.pool.acquire)
+        self.assertEqual(1, self.pool.stats()['timeouts'])
+
+    def test_acquire__factory_error_frees_slot(self):
+        self.factory.side_effect = Exception('Connect Error')
+        self.assertRaises(Exception, self.pool.acquire)
+        self.assertEqual(0, self.pool.stats()['in_use'])
+
+    def test_release__discard_closes_connection(self):
+        pooled = self.pool.acquire()
+        self.pool.release(pooled, discard=True)
+        self.assertEqual(1, pooled.connection.close.call_count)
+        self.assertEqual(0, self.pool.stats()['idle'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,72 @@
+import unittest
+
+from mock import MagicMock
+
+from lib.change_feed import ChangeFeed
+from lib.price_updater import PriceUpdater, parse_price
+
+
+class PriceUpdaterUnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.db = MagicMock()
+        self.selections = self.db.repository.return_value
+        self.selections.select_by_key_values.side_effect = lambda columns, key, names, filters: [
+            {'name': name, 'event': 'Race'} for name in names if name != 'gone']
+        self.updater = PriceUpdater(self.db, chunk_size=2)
+
+    def test_parse_price__formats_and_validates(self):
+        self.assertEqual('2.50', parse_price('2.5'))
+        self.assertEqual('3.00', parse_price(3))
+        for price in ('x', '-1', 'NaN', 'Infinity', True, None, '100000000'):
+            self.assertRaises(ValueError, parse_price, price)
+
+    def test_update__chunks_in_name_order_in_one_transaction(self):
+        result = self.updater.update({'c': '3', 'a': '1', 'b': '2'})
+        self.assertEqual({'accepted': 3, 'errors': []}, result)
+        self.db.repository.assert_any_call('selections')
+        self.assertEqual(2, self.selections.select_by_key_values.call_count)
+        self.assertEqual(1, self.db.transaction.call_count)
+        calls = self.selections.update_rows_by_key.call_args_list
+        self.assertEqual([{'a': '1.00', 'b': '2.00'}, {'c': '3.00'}], [call[0][2] for call in calls])
+        self.assertEqual({'filters': {'active': 1}}, calls[0][1])
+
+    def test_update__reports_invalid_prices(self):
+        result = self.updater.update({'a': 'x', 'b': '2'})
+        self.assertEqual(1, result['accepted'])
+        self.assertListEqual([{'selection': 'a', 'error': "Invalid price: 'x'"}], result['errors'])
+
+    def test_update__reports_unknown_and_inactive_selections(self):
+        result = self.updater.update({'a': '3.00', 'gone': '1'})
+        self.assertEqual(1, result['accepted'])
+        self.assertListEqual([{'selection': 'gone', 'error': 'Unknown or inactive selection'}], result['errors'])
+        self.selections.update_rows_by_key.assert_called_once_with('price', 'name', {'a': '3.00'},
+                                                                   filters={'active': 1})
+        self.assertEqual(0, PriceUpdater(self.db).update({'gone': '1'})['accepted'])
+        self.assertEqual(1, self.selections.update_rows_by_key.call_count)
+
+    def test_update__nothing_valid_skips_transaction(self):
+        self.assertEqual(0, self.updater.update({'a': 'x'})['accepted'])
+        self.db.transaction.assert_not_called()
+        self.selections.update_rows_by_key.assert_not_called()
+
+    def test_update__publishes_active_selections_after_commit(self):
+        feed = ChangeFeed()
+        self.db.repository.side_effect = lambda table: {'selections': self.selections, 'events': events}[table]
+        events = MagicMock()
+        events.select_by_key_values.return_value = [{'name': 'Race', 'sport': 'Horses'}]
+        self.db.transaction.return_value.__exit__.side_effect = lambda *args: self.assertEqual(0, feed.last_seq)
+        PriceUpdater(self.db, feed=feed).update({'a': '1.5', 'gone': '2'})
+        self.selections.select_by_key_values.assert_called_once_with(
+            ['name', 'event'], 'name', ['a', 'gone'], filters={'active': 1})
+        events.select_by_key_values.assert_called_once_with(['name', 'sport'], 'name', ['Race'])
+        self.assertListEqual([{'seq': 1, 'change': 'price', 'activity': 'selection', 'name': 'a', 'sport': 'Horses',
+                               'event': 'Race', 'price': '1.50'}], feed.changes_since(0))
+
+    def test_update__failed_chunk_raises(self):
+        self.selections.update_rows_by_key.side_effect = [None, RuntimeError('Deadlock')]
+        self.assertRaises(RuntimeError, self.updater.update, {'a': '1', 'b': '2', 'c': '3'})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
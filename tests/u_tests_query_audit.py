@@ -0,0 +1,36 @@
+import unittest
+
+from mock import Mock
+
+from lib.query_audit import audit_queries, record_query_templates
+
+
+class QueryAuditUnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.queries = record_query_templates('test')
+
+    def test_record_query_templates__covers_db_and_search_queries(self):
+        labels = {query['label'] for query in self.queries}
+        for label in ['select_by_name', 'select_page:scheduled_start:active', 'update_active_rows_by_sport_id',
+                      'update_parent_of_selections', 'delete_rows_by_sport_id', 'search:0,1,2:^N', 'update_prices',
+                      'select_due_events', 'start_due_events', 'tree:event']:
+            self.assertIn(label, labels)
+        self.assertFalse(any(query['query'].startswith('INSERT') for query in self.queries))
+
+    def test_audit_queries__flags_full_scans_of_base_tables(self):
+        db = Mock(database='test')
+        db.execute_query.side_effect = [
+            [{'table': 'events', 'type': 'ref', 'key': 'idx_events_sport_active'}],
+            [{'table': 'sports', 'type': 'ALL', 'key': None}, {'table': '<subquery2>', 'type': 'ALL', 'key': None}]]
+        queries = [{'label': 'select_by_sport', 'table': 'events', 'query': 'SELECT 1', 'params': None},
+                   {'label': 'select_all_from_table', 'table': 'sports', 'query': 'SELECT 2', 'params': None}]
+        report = audit_queries(db, queries)
+        db.execute_query.assert_any_call("EXPLAIN SELECT 1", database='test', result_req=True, params=None)
+        self.assertListEqual([], report[0]['full_scans'])
+        self.assertListEqual(['sports'], report[1]['full_scans'])
+        self.assertTrue(report[1]['expected'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
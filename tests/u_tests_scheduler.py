@@ -0,0 +1,130 @@
+import unittest
+from datetime import datetime, timedelta
+
+from mock import MagicMock, patch
+
+from lib.change_feed import ChangeFeed
+from lib.db import Error
+from lib.scheduler import EventScheduler
+
+NOW = datetime(2022, 7, 14, 6, 35)
+
+
+class EventSchedulerUnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.db = MagicMock(database='test')
+        self.events = self.db.repository.return_value
+        self.events.select_by_key_values.side_effect = lambda columns, key, names, filters: [
+            {'name': name} for name in names]
+        self.feed = ChangeFeed()
+        self.now = NOW
+        self.scheduler = EventScheduler(self.db, feed=self.feed, batch_size=2, clock=lambda: self.now)
+
+    def test_refresh__loads_pending_events_in_window(self):
+        self.events.select_between.return_value = [
+            {'name': 'Late', 'scheduled_start': NOW - timedelta(minutes=1), 'sport': 'Golf'},
+            {'name': 'Soon', 'scheduled_start': NOW + timedelta(minutes=1), 'sport': 'Golf'}]
+        self.scheduler.refresh()
+        self.events.select_between.assert_called_once_with(
+            ['name', 'scheduled_start', 'sport'], 'scheduled_start', NOW - timedelta(hours=1),
+            NOW + timedelta(minutes=5), filters={'status': 0, 'active': 1})
+        self.assertEqual({'Late': 'Golf'}, self.scheduler.pop_due(NOW))
+        self.assertEqual({'Soon': 'Golf'}, self.scheduler.pop_due(NOW + timedelta(minutes=1)))
+
+    def test_schedule__ignores_beyond_horizon_and_cancelled(self):
+        self.scheduler._leader = MagicMock()
+        self.scheduler.schedule('Later', NOW + timedelta(hours=1))
+        self.scheduler.schedule('Cancelled', NOW)
+        self.scheduler.schedule('Moved', NOW)
+        self.scheduler.schedule('Moved', NOW + timedelta(minutes=2))
+        self.scheduler.cancel('Cancelled')
+        self.assertEqual({}, self.scheduler.pop_due(NOW + timedelta(minutes=1)))
+        self.assertEqual({'Moved': None}, self.scheduler.pop_due(NOW + timedelta(minutes=5)))
+
+    def test_schedule__ignores_overdue_beyond_catch_up(self):
+        self.scheduler._leader = MagicMock()
+        self.scheduler.schedule('Old Match', NOW - timedelta(hours=1, seconds=1))
+        self.scheduler.schedule('Late', NOW - timedelta(minutes=59))
+        self.assertEqual({'Late': None}, self.scheduler.pop_due(NOW))
+
+    def test_schedule__ignored_when_not_leading(self):
+        self.scheduler.schedule('Race', NOW)
+        self.assertEqual({}, self.scheduler.pop_due(NOW))
+        self.scheduler._leader = MagicMock()
+        self.scheduler.schedule('Race', NOW)
+        self.scheduler._leader = None
+        self.db.backend.try_lock.return_value = False
+        self.scheduler.run_once()
+        self.assertEqual({}, self.scheduler.pop_due(NOW))
+
+    def test_start_due__batched_updates_of_pending_events(self):
+        self.scheduler._leader = MagicMock()
+        for name in ('a', 'b', 'c'):
+            self.scheduler.schedule(name, NOW - timedelta(seconds=1), 'Golf')
+        self.scheduler.schedule('d', NOW + timedelta(seconds=1), 'Golf')
+        self.events.select_by_key_values.side_effect = [[{'name': 'a'}, {'name': 'b'}], [{'name': 'c'}]]
+        self.assertEqual(3, self.scheduler.start_due())
+        self.assertEqual(2, self.db.transaction.call_count)
+        self.events.update_rows_by_key_values.assert_any_call(
+            {'status': 1, 'type': 1}, 'name', ['a', 'b'], filters={'status': 0})
+        self.events.update_rows_by_key_values.assert_called_with(
+            {'status': 1, 'type': 1}, 'name', ['c'], filters={'status': 0})
+        self.assertListEqual(['a', 'b', 'c'], [change['name'] for change in self.feed.changes_since(0)])
+
+    def test_start_due__skips_events_no_longer_pending(self):
+        self.scheduler._leader = MagicMock()
+        self.scheduler.schedule('a', NOW)
+        self.events.select_by_key_values.side_effect = [[]]
+        self.assertEqual(0, self.scheduler.start_due())
+        self.events.update_rows_by_key_values.assert_not_called()
+        self.assertEqual(0, self.feed.last_seq)
+
+    def test_track__schedules_stored_pending_events(self):
+        self.scheduler.track('Race')
+        self.events.select_by_key_values.assert_not_called()
+        self.scheduler._leader = MagicMock()
+        self.events.select_by_key_values.side_effect = None
+        self.events.select_by_key_values.return_value = [
+            {'name': 'Race', 'scheduled_start': NOW, 'sport': 'Horses'},
+            {'name': 'Chase', 'scheduled_start': NOW, 'sport': 'Horses'}]
+        self.scheduler.track('Race', 'Chase')
+        self.events.select_by_key_values.assert_called_once_with(
+            ['name', 'scheduled_start', 'sport'], 'name', ['Race', 'Chase'], filters={'status': 0, 'active': 1})
+        self.assertEqual({'Chase': 'Horses', 'Race': 'Horses'}, self.scheduler.pop_due(NOW))
+
+    def test_run_once__only_leader_starts_events(self):
+        self.db.backend.try_lock.return_value = False
+        self.assertEqual(30, self.scheduler.run_once())
+        self.events.select_between.assert_not_called()
+        self.assertEqual(1, self.db.backend.connect.return_value.close.call_count)
+        self.db.backend.try_lock.return_value = True
+        self.events.select_between.return_value = [
+            {'name': 'Soon', 'scheduled_start': NOW + timedelta(seconds=10), 'sport': 'Golf'}]
+        self.assertEqual(10, self.scheduler.run_once())
+        self.assertTrue(self.scheduler.is_leader)
+        self.assertEqual(1, self.events.select_between.call_count)
+        self.db.backend.connect.assert_called_with('test', autocommit=True)
+
+    @patch('lib.scheduler.print')
+    def test_lead__lost_connection_resigns_and_retries(self, _):
+        self.db.backend.try_lock.return_value = True
+        self.scheduler.lead()
+        leader = self.db.backend.connect.return_value
+        leader.is_connected.return_value = False
+        self.db.backend.release_lock.side_effect = Error('Lost connection')
+        self.db.backend.try_lock.return_value = False
+        self.assertFalse(self.scheduler.lead())
+        self.assertFalse(self.scheduler.is_leader)
+
+    def test_stop__releases_lock(self):
+        self.db.backend.try_lock.return_value = True
+        self.events.select_between.return_value = []
+        self.scheduler.start()
+        self.scheduler.stop(timeout=5)
+        self.db.backend.release_lock.assert_called_once_with(self.db.backend.connect.return_value, 'event_scheduler')
+        self.assertFalse(self.scheduler.is_leader)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
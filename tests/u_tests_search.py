@@ -0,0 +1,46 @@
+import unittest
+from datetime import datetime
+
+from mock import patch
+
+from lib.search import BASE_QUERY, MAX_SEARCH_LIMIT, SEARCH_ORDER, name_filter, query_builder
+
+
+class SearchUnitTests(unittest.TestCase):
+
+    def test_name_filter__literal_prefix_uses_like_branch_per_table(self):
+        like = "LIKE %s ESCAPE '!'"
+        self.assertListEqual([
+            (f"t.name {like}", ('No!_1%',)),
+            (f"t1.name {like} AND t.name NOT {like}", ('No!_1%',) * 2),
+            (f"t2.name {like} AND t.name NOT {like} AND t1.name NOT {like}", ('No!_1%',) * 3)], name_filter('^No_1'))
+
+    def test_name_filter__pattern_uses_regexp(self):
+        self.assertListEqual([("((t.name REGEXP %s) OR (t1.name REGEXP %s) OR (t2.name REGEXP %s))",
+                               ('N.*Win$',) * 3)], name_filter('N.*Win$'))
+
+    @patch('lib.search.datetime')
+    def test_query_builder__union_of_prefix_branches(self, mock_datetime):
+        mock_datetime.utcnow.return_value = datetime(2021, 10, 16, 12, 0, 0)
+        cutoff = datetime(2021, 10, 15, 12, 0, 0)
+        query, params = query_builder('^N', ['0', '1', '2'], '', limit=10)
+        branches = query.split(" UNION ALL ")
+        self.assertEqual(3, len(branches))
+        for branch in branches:
+            self.assertTrue(branch.startswith(BASE_QUERY))
+            self.assertIn("JOIN events t1 ON t1.sport_id = t.id JOIN selections t2 ON t2.event_id = t1.id", branch)
+            self.assertIn("AND t1.scheduled_start >= %s AND t2.outcome = %s", branch)
+        self.assertTrue(query.endswith(f"t2.outcome = %s {SEARCH_ORDER} LIMIT %s"))
+        self.assertEqual(('N%', cutoff, 3) + ('N%',) * 2 + (cutoff, 3) + ('N%',) * 3 + (cutoff, 3, 10), params)
+
+    def test_query_builder__escapes_expression_and_caps_limit(self):
+        query, params = query_builder('^N', ['2'], "t.name LIKE 'F%'", limit=10 ** 6)
+        self.assertEqual(f"{BASE_QUERY} (t.name LIKE 'F%%') AND t2.outcome = %s {SEARCH_ORDER} LIMIT %s", query)
+        self.assertEqual((3, MAX_SEARCH_LIMIT), params)
+
+    def test_query_builder__raises_without_criteria(self):
+        self.assertRaises(RuntimeError, query_builder, '^N', ['7'], '')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,48 @@
+import json
+import unittest
+from datetime import datetime
+from decimal import Decimal
+
+from lib.activities import Sport, Event, Selection
+from lib.serializers import ROW_ENCODERS, dumps, encode_json_object, iter_json_object, iter_ndjson
+
+SPORT_ROW = {'name': 'Football', 'slug': 'football', 'active': 1}
+EVENT_ROW = {'name': 'World Cup "22"', 'slug': 'world-cup', 'active': 0, 'type': 1, 'status': 2,
+             'scheduled_start': datetime(2021, 10, 15, 19, 30, 39), 'actual_start': None, 'sport': 'Football'}
+SELECTION_ROW = {'name': 'Norway Win \u00e9', 'active': 1, 'price': Decimal('10.00'), 'outcome': 3,
+                 'event': 'World Cup 2022'}
+
+
+class SerializersUnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.items = [{'name': f"Test{_}", 'active': True} for _ in range(5)]
+
+    def test_dumps__encodes_db_types_like_jsonify(self):
+        encoded = dumps({'price': Decimal('10.00'), 'start': datetime(2021, 10, 15, 19, 30, 39)})
+        self.assertEqual('{"price":"10.00","start":"Fri, 15 Oct 2021 19:30:39 GMT"}', encoded)
+
+    def test_iter_json_object__valid_json_in_chunks(self):
+        chunks = list(iter_json_object('All', iter(self.items), chunk_rows=2))
+        self.assertEqual(5, len(chunks))
+        self.assertEqual({'All': self.items}, json.loads(''.join(chunks)))
+
+    def test_iter_json_object__empty(self):
+        self.assertEqual({'All': []}, json.loads(''.join(iter_json_object('All', iter([])))))
+
+    def test_row_encoder__matches_model_serialization(self):
+        for table, model, row in [('sports', Sport, SPORT_ROW), ('events', Event, EVENT_ROW),
+                                  ('selections', Selection, SELECTION_ROW)]:
+            self.assertEqual(dumps(model(**row).to_dict()), ROW_ENCODERS[table].encode(row))
+
+    def test_encode_json_object__encodes_rows(self):
+        body = encode_json_object('All', [SPORT_ROW, SPORT_ROW], encode=ROW_ENCODERS['sports'].encode)
+        self.assertEqual({'All': [Sport(**SPORT_ROW).to_dict()] * 2}, json.loads(body))
+
+    def test_iter_ndjson__one_object_per_line(self):
+        body = ''.join(iter_ndjson(iter(self.items), chunk_rows=2))
+        self.assertListEqual(self.items, [json.loads(line) for line in body.splitlines()])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
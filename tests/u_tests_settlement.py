@@ -0,0 +1,66 @@
+import unittest
+
+from mock import MagicMock
+
+from lib.settlement import Settlement, parse_outcome
+
+
+class SettlementUnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.db = MagicMock()
+        self.repos = {table: MagicMock() for table in ('sports', 'events', 'selections')}
+        self.db.repository.side_effect = lambda table: self.repos[table]
+        self.sports, self.events, self.selections = (self.repos[table] for table in ('sports', 'events', 'selections'))
+        self.events.select_all_from_table_by_key_value.return_value = [
+            {'id': 4, 'name': 'Race', 'sport': 'Horses', 'active': 1}]
+        self.selections.select_by_key_values.return_value = [{'name': name} for name in ('a', 'b', 'c')]
+        self.settlement = Settlement(self.db, chunk_size=2)
+
+    def test_parse_outcome__value_or_name(self):
+        self.assertEqual(3, parse_outcome('win'))
+        self.assertEqual(1, parse_outcome(1))
+        for outcome in ('UNSETTLED', 0, 7, 'x', True, None):
+            self.assertRaises(ValueError, parse_outcome, outcome)
+
+    def test_settle__one_transaction_chunked_updates_and_rollup(self):
+        self.sports.select_by_key_values.side_effect = [[{'active': 1}], [{'active': 0}]]
+        self.events.select_by_key_values.return_value = [{'active': 0}]
+        result = self.settlement.settle('Race', {'c': 'LOSE', 'a': 'WIN', 'b': 2})
+        self.assertEqual(1, self.db.transaction.call_count)
+        self.selections.select_by_key_values.assert_called_once_with(['name'], 'event_id', [4], filters={'active': 1})
+        self.assertListEqual([
+            (('outcome', 'name', {'a': 3, 'b': 2}), {'filters': {'event_id': 4}, 'constants': {'active': 0}}),
+            (('outcome', 'name', {'c': 2}), {'filters': {'event_id': 4}, 'constants': {'active': 0}})],
+            [(call[0], call[1]) for call in self.selections.update_rows_by_key.call_args_list])
+        self.events.update_parent_if_children_inactive.assert_called_once_with(
+            {'active': 0, 'status': 2}, 'selections', 'event_id', 'event_id', 4)
+        self.sports.update_parent_if_children_inactive.assert_called_once_with(
+            {'active': 0}, 'events', 'sport_id', 'id', 4)
+        changes = [{'activity': 'event', 'name': 'Race', 'sport': 'Horses', 'event': 'Race', 'status': 2},
+                   {'activity': 'sport', 'name': 'Horses', 'sport': 'Horses', 'event': None}]
+        self.assertEqual({'settled': 3, 'active': 0, 'sport': 'Horses', 'outcomes': {'a': 3, 'b': 2, 'c': 2},
+                          'changes': changes},
+                         {key: value for key, value in result.items() if key != 'timings_ms'})
+        self.assertListEqual(['validate', 'read', 'selections', 'rollup', 'commit', 'total'],
+                             list(result['timings_ms']))
+
+    def test_settle__records_only_parents_closed(self):
+        self.sports.select_by_key_values.return_value = [{'active': 1}]
+        self.events.select_by_key_values.return_value = [{'active': 1}]
+        self.assertListEqual([], self.settlement.settle('Race', {'a': 3})['changes'])
+
+    def test_settle__rejects_selections_of_other_events(self):
+        with self.assertRaisesRegex(ValueError, 'Not active selections of Race: x'):
+            self.settlement.settle('Race', {'a': 3, 'x': 2})
+        self.selections.update_rows_by_key.assert_not_called()
+
+    def test_settle__rejects_unknown_event_and_status(self):
+        self.assertRaises(ValueError, self.settlement.settle, 'Race', {'a': 3}, status=9)
+        self.assertRaises(ValueError, self.settlement.settle, 'Race', {})
+        self.events.select_all_from_table_by_key_value.return_value = []
+        self.assertRaisesRegex(ValueError, 'Unknown event: Race', self.settlement.settle, 'Race', {'a': 3})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
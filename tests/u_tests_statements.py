@@ -0,0 +1,50 @@
+import unittest
+
+from mock import Mock
+
+from lib.statements import StatementCache, is_preparable
+
+
+class StatementCacheUnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = Mock()
+        self.connection.cursor.side_effect = lambda prepared: Mock()
+        self.cache = StatementCache(self.connection, max_size=2)
+
+    def test_is_preparable(self):
+        self.assertTrue(is_preparable(" select * FROM t WHERE a = %s", (1,), False))
+        self.assertTrue(is_preparable("UPDATE t SET a = %s", (1,), False))
+        self.assertFalse(is_preparable("SELECT * FROM t", None, False))
+        self.assertFalse(is_preparable("INSERT INTO t VALUES (%s)", [(1,), (2,)], True))
+        self.assertFalse(is_preparable("EXPLAIN SELECT * FROM t WHERE a = %s", (1,), False))
+
+    def test_statement__returns_same_cursor_and_query_object(self):
+        cursor, query = self.cache.statement("SELECT %s")
+        self.assertEqual((cursor, query), self.cache.statement("".join(["SELECT ", "%s"])))
+        self.assertIs(query, self.cache.statement("SELECT %s")[1])
+        self.connection.cursor.assert_called_once_with(prepared=True)
+        self.assertEqual({'hits': 2, 'misses': 1, 'evictions': 0}, self.cache.stats)
+
+    def test_statement__evicts_and_closes_least_recently_used(self):
+        first, _ = self.cache.statement("SELECT 1")
+        self.cache.statement("SELECT 2")
+        self.cache.statement("SELECT 1")
+        second, _ = self.cache._statements["SELECT 2"]
+        self.cache.statement("SELECT 3")
+        self.assertEqual(1, second.close.call_count)
+        self.assertEqual(0, first.close.call_count)
+        self.assertEqual(2, len(self.cache))
+        self.assertEqual(1, self.cache.stats['evictions'])
+
+    def test_close__closes_every_statement(self):
+        first, _ = self.cache.statement("SELECT 1")
+        first.close.side_effect = Exception('gone')
+        second, _ = self.cache.statement("SELECT 2")
+        self.cache.close()
+        self.assertEqual(1, second.close.call_count)
+        self.assertEqual(0, len(self.cache))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,39 @@
+import unittest
+
+from lib.versions import TableVersions
+
+
+class TableVersionsUnitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.versions = TableVersions()
+
+    def test_bump__per_table(self):
+        self.versions.bump('events', 'selections')
+        self.versions.bump('events')
+        self.assertEqual(2, self.versions.version('events'))
+        self.assertEqual(1, self.versions.version('selections'))
+        self.assertEqual(0, self.versions.version('sports'))
+
+    def test_etag__changes_with_any_table(self):
+        etag = self.versions.etag('sports', 'events')
+        self.assertEqual(f"{self.versions.epoch}-0-0", etag)
+        self.versions.bump('selections')
+        self.assertEqual(etag, self.versions.etag('sports', 'events'))
+        self.versions.bump('events')
+        self.assertEqual(f"{self.versions.epoch}-0-1", self.versions.etag('sports', 'events'))
+
+    def test_etag__expires_with_time_bucket(self):
+        now = [59.0]
+        versions = TableVersions(max_age=30, clock=lambda: now[0])
+        etag = versions.etag('events')
+        self.assertEqual(f"{versions.epoch}-1-0", etag)
+        now[0] = 60.0
+        self.assertNotEqual(etag, versions.etag('events'))
+
+    def test_etag__unique_per_process(self):
+        self.assertNotEqual(self.versions.etag('sports'), TableVersions().etag('sports'))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)